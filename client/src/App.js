@@ -7,6 +7,14 @@ import TopicConfigManager from './components/TopicConfigManager';
 import AlmanacAnalysis from './components/AlmanacAnalysis';
 import { renderSafeMarkdown, sanitizeHighlightHtml } from './utils/html';
 
+// Fields the diary views use; the paged entries API trims everything else
+const ENTRY_FIELDS = 'id,content,createdAt,moods';
+const ENTRY_PAGE_SIZE = 200;
+
+// Local calendar date as YYYY-MM-DD, the format of the entries API's from/to
+const formatDay = (date) =>
+  `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+
 function App() {
   const [entries, setEntries] = useState([]);
   const [content, setContent] = useState('');
@@ -40,21 +48,34 @@ function App() {
 
   // No static themes - all topics should come from actual diary entries
 
-  const fetchEntries = async () => {
+  // Entries of the month around `date`, fetched page by page from the
+  // range API so the client never downloads the whole diary
+  const fetchEntries = async (date = selectedDate) => {
     try {
       console.log('Fetching entries...');
       let data = [];
 
       try {
         // First try the API endpoint
-        const response = await fetch('http://localhost:3001/api/entries');
-
-        if (response.ok) {
-          data = await response.json();
-          console.log('Entries fetched from API:', data.length);
-        } else {
-          throw new Error('API not available');
-        }
+        const params = new URLSearchParams({
+          from: formatDay(new Date(date.getFullYear(), date.getMonth(), 1)),
+          to: formatDay(new Date(date.getFullYear(), date.getMonth() + 1, 0)),
+          order: 'asc',
+          limit: String(ENTRY_PAGE_SIZE),
+          fields: ENTRY_FIELDS
+        });
+        let cursor = null;
+        do {
+          if (cursor) params.set('cursor', cursor);
+          const response = await fetch(`http://localhost:3001/api/entries?${params}`);
+          if (!response.ok) {
+            throw new Error('API not available');
+          }
+          const page = await response.json();
+          data = data.concat(page.entries);
+          cursor = page.next_cursor;
+        } while (cursor);
+        console.log('Entries fetched from API:', data.length);
       } catch (apiError) {
         console.log('API not available, using default entries');
         // Instead of loading from a file, we keep entries in the app's state
@@ -88,15 +109,16 @@ function App() {
     setCurrentPage(1);
   }, [entries]);
 
+  const selectedYear = selectedDate.getFullYear();
+  const selectedMonth = selectedDate.getMonth();
   useEffect(() => {
-    // Initialize data fetch
-    fetchEntries();
-  }, []);
+    // Fetch the selected month, again whenever another month is picked
+    fetchEntries(new Date(selectedYear, selectedMonth, 1));
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [selectedYear, selectedMonth]);
 
   useEffect(() => {
-    if (entries.length > 0) {
-      filterEntriesByDate(selectedDate);
-    }
+    filterEntriesByDate(selectedDate);
   }, [entries, selectedDate, filterEntriesByDate]);
 
   const handleDateSelect = (date) => {
@@ -1028,7 +1050,7 @@ function App() {
         <aside className="calendar-container">
           <h2 className="calendar-title">日历</h2>
           <DiaryCalendar
-            entries={entries}
+            refreshKey={entries}
             onDateSelect={handleDateSelect}
             selectedDate={selectedDate}
             onTabChange={handleTabChange}
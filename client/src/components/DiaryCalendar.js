@@ -4,20 +4,49 @@ import { SolarDay } from 'tyme4ts';
 import 'react-calendar/dist/Calendar.css';
 import '../styles/DiaryCalendar.css';
 
-function DiaryCalendar({ entries, onDateSelect, selectedDate, onTabChange }) {
-  // 创建日期条目的映射
-  const datesWithEntries = entries.reduce((acc, entry) => {
-    if (entry && entry.createdAt) {
-      try {
-        const entryDate = new Date(entry.createdAt);
-        const dateKey = `${entryDate.getFullYear()}-${entryDate.getMonth() + 1}-${entryDate.getDate()}`;
-        acc[dateKey] = true;
-      } catch (error) {
-        console.error('处理日期条目时出错:', error);
-      }
-    }
-    return acc;
-  }, {});
+function DiaryCalendar({ refreshKey, onDateSelect, selectedDate, onTabChange }) {
+  // Month the calendar shows; paging through months does not change selectedDate
+  const [activeMonth, setActiveMonth] = useState(
+    () => new Date(selectedDate.getFullYear(), selectedDate.getMonth(), 1)
+  );
+  // Bit per day of activeMonth (bit 0 = day 1), set when the day has entries
+  const [entryDays, setEntryDays] = useState(0);
+
+  const selectedYear = selectedDate.getFullYear();
+  const selectedMonth = selectedDate.getMonth();
+  useEffect(() => {
+    setActiveMonth(new Date(selectedYear, selectedMonth, 1));
+  }, [selectedYear, selectedMonth]);
+
+  // Days with entries in the shown month, from /api/calendar; refreshKey
+  // changes whenever the entries were written or refetched
+  const activeYear = activeMonth.getFullYear();
+  const activeMonthNumber = activeMonth.getMonth() + 1;
+  useEffect(() => {
+    let cancelled = false;
+    fetch(`http://localhost:3001/api/calendar/${activeYear}/${activeMonthNumber}`)
+      .then(response => {
+        if (!response.ok) {
+          throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+      })
+      .then(data => {
+        if (!cancelled) setEntryDays(data.days);
+      })
+      .catch(error => {
+        console.error('获取日历数据失败:', error);
+        if (!cancelled) setEntryDays(0);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [activeYear, activeMonthNumber, refreshKey]);
+
+  const hasEntriesOn = (date) =>
+    date.getFullYear() === activeYear &&
+    date.getMonth() + 1 === activeMonthNumber &&
+    ((entryDays >> (date.getDate() - 1)) & 1) === 1;
   
   // 获取农历日期和干支文本
   const getLunarDayText = (date) => {
@@ -66,9 +95,7 @@ function DiaryCalendar({ entries, onDateSelect, selectedDate, onTabChange }) {
   const tileContent = ({ date, view }) => {
     if (view !== 'month') return null;
     
-    // 获取公历日期的键
-    const dateKey = `${date.getFullYear()}-${date.getMonth() + 1}-${date.getDate()}`;
-    const hasEntries = datesWithEntries[dateKey];
+    const hasEntries = hasEntriesOn(date);
     
     // 获取农历信息 (流日和干支)
     const lunarText = getLunarDayText(date);
@@ -169,6 +196,9 @@ function DiaryCalendar({ entries, onDateSelect, selectedDate, onTabChange }) {
       <Calendar 
         onChange={onDateSelect}
         value={selectedDate}
+        onActiveStartDateChange={({ activeStartDate, view }) => {
+          if (view === 'month' && activeStartDate) setActiveMonth(activeStartDate);
+        }}
         tileContent={tileContent}
         tileClassName={tileClassName}
         formatShortWeekday={(locale, date) => ['日', '一', '二', '三', '四', '五', '六'][date.getDay()]}
@@ -0,0 +1,135 @@
+"""
+Group-committed writes of the JSON topic documents.
+
+Each document file (``topic_graph.json``, ``topics.json``,
+``topic_config.json``, ``topic_suggestions.json``) gets one
+``DocumentWriter``. Request handlers and the background topic threads all
+go through it:
+
+- mutations are serialized by a per-document lock; the backend's
+  ``editing()`` holds it across a whole read-modify-write so concurrent
+  edits cannot overwrite each other,
+- the committed document is kept in memory as its serialized JSON, so
+  readers parse the latest snapshot without taking any lock or touching
+  the disk,
+- the file is rewritten at most once per ``commit_delay`` seconds, with
+  every change made in that window folded into one atomic write
+  (temp file, fsync, rename). ``flush()`` forces it, e.g. at shutdown.
+
+A file changed by hand while nothing is pending is picked up on the next
+read, as before, and moves ``version()`` on so caches and ETags derived from
+the document are invalidated too.
+"""
+import atexit
+import json
+import os
+import threading
+
+# Seconds between the first pending change and the write that commits it
+COMMIT_DELAY = float(os.getenv("DOCUMENT_COMMIT_DELAY", "1.0"))
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DocumentWriter:
+    """Serialized, coalesced writes and lock-free reads of one JSON document file"""
+
+    def __init__(self, path, commit_delay=COMMIT_DELAY):
+        self.path = path
+        self.commit_delay = commit_delay
+        # Held across a read-modify-write and by every write
+        self.edit_lock = threading.RLock()
+        # Guards the fields below; never held during disk I/O
+        self.state_lock = threading.Lock()
+        # One flush at a time, so files are written in commit order
+        self.flush_lock = threading.Lock()
+        self._text = None
+        self._signature = None
+        self._dirty = False
+        self._timer = None
+        # Bumped by every write and by every change picked up from the file
+        self.generation = 0
+        self.writes = 0
+        atexit.register(self.flush)
+
+    def exists(self):
+        return self._text is not None or self.path.exists()
+
+    def _snapshot(self):
+        text = self._text
+        if text is not None and (self._dirty or self._signature == _file_signature(self.path)):
+            return text
+        with self.state_lock:
+            if self._dirty:
+                return self._text
+            with open(self.path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            json.loads(text)  # Only cache valid documents; raises JSONDecodeError like before
+            if self._text is not None and text != self._text:
+                self.generation += 1
+            self._text = text
+            self._signature = _file_signature(self.path)
+            return text
+
+    def version(self):
+        """Changes whenever the document does, including edits made to the file by hand"""
+        with self.state_lock:
+            if not self._dirty and self._text is not None and self._signature != _file_signature(self.path):
+                # Re-read on the next access
+                self._text = None
+                self.generation += 1
+            return self.generation
+
+    def read(self):
+        """A private, mutable copy of the last committed document"""
+        return json.loads(self._snapshot())
+
+    def write(self, data):
+        """Commit ``data`` as the new document; it reaches the disk with the next group write"""
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        with self.edit_lock:
+            with self.state_lock:
+                self._text = text
+                self._dirty = True
+                self.generation += 1
+                if self._timer is None:
+                    self._timer = threading.Timer(self.commit_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def flush(self):
+        """Write the pending document to disk now (no-op if nothing is pending)"""
+        with self.flush_lock:
+            with self.state_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                text = self._text
+                self._dirty = False
+
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Error writing {self.path.name}: {e}")
+                with self.state_lock:
+                    # Keep it pending so the next commit or flush retries
+                    self._dirty = True
+                return
+            self.writes += 1
+
+            with self.state_lock:
+                if self._text is text:
+                    self._signature = _file_signature(self.path)
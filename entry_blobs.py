@@ -0,0 +1,224 @@
+"""
+Append-only, memory-mapped content store for diary entries.
+
+The JSON backend keeps entry content out of the month partitions, in two
+files next to them:
+
+- ``content.blob``: the UTF-8 content of every written entry version, back
+  to back,
+- ``content.idx``: one fixed-width little-endian record per version
+  (entry id int64, offset uint64, length uint32, createdAt epoch
+  microseconds int64), so row ``n`` starts at byte ``n * 28``.
+
+Partition records refer to their content by index row (``ContentRef``).
+Both files are memory-mapped: opening the store reads nothing, a row is
+located with one ``unpack_from`` and its bytes are sliced out of the map
+without copying (``view``) or decoded on demand (``read``). The last
+``READ_CACHE_ROWS`` decoded rows are kept, so a caller reading one entry's
+content a few times in a row decodes it once; rows never change, so the
+cache needs no invalidation. Work that only needs entry metadata (calendar
+counts, date filters, content lengths) never touches the blob.
+
+A write appends the content and fsyncs it before the index records are
+appended (and fsynced), so an index row never points past durable content;
+a torn index tail left by a crash is cut off when the store is opened.
+Writers hold an exclusive ``flock`` on the index file and take the offsets
+of a batch from the file sizes at that point, so several processes can
+append to the same store. Content of superseded versions is not reclaimed.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+INDEX_RECORD = struct.Struct('<qQIq')
+INDEX_DTYPE = np.dtype([('id', '<i8'), ('offset', '<u8'), ('length', '<u4'), ('ts', '<i8')])
+
+# ``ts`` of entries without a usable createdAt
+UNDATED = np.iinfo(np.int64).min
+
+# Decoded contents kept by ``read``; the least recently read is dropped first
+READ_CACHE_ROWS = 128
+
+
+def _map(path):
+    """Read-only map of a whole file (None while it is empty)"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+
+class ContentRef:
+    """The content of one entry version, stored at ``row`` of a ContentBlobStore"""
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def read(self):
+        return self.store.read(self.row)
+
+    def length(self):
+        """UTF-8 byte length of the content, from the index alone"""
+        return self.store.locate(self.row)[2]
+
+
+class ContentBlobStore:
+    """Entry contents in one blob file, located through a fixed-width index"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.blob_path = self.directory / 'content.blob'
+        self.index_path = self.directory / 'content.idx'
+        self.lock = threading.Lock()
+        # (index map, blob map, rows); replaced as a whole after every append
+        self._maps = None
+        self._blob_file = None
+        self._index_file = None
+        # row -> decoded content, least recently read first
+        self._decoded = OrderedDict()
+        self._decoded_lock = threading.Lock()
+
+    def exists(self):
+        return self.index_path.exists()
+
+    def initialize(self):
+        """Create the (empty) files if they do not exist yet and map them"""
+        self._current_maps()
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._blob_file = open(self.blob_path, 'ab')
+        self._index_file = open(self.index_path, 'ab')
+        with self._exclusive():
+            # Under the lock, so an append in progress elsewhere is not mistaken for a torn tail
+            self._index_size()
+            blob_size = os.fstat(self._blob_file.fileno()).st_size
+            self._remap()
+
+        index = self.index()
+        if len(index) and int((index['offset'] + index['length']).max()) > blob_size:
+            print(f"Warning: {self.blob_path.name} is shorter than {self.index_path.name} expects")
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the cross-process write lock (an flock on the index file)"""
+        fcntl.flock(self._index_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._index_file.fileno(), fcntl.LOCK_UN)
+
+    def _index_size(self):
+        """Size of the index file, cutting off a torn tail first; caller holds the write lock"""
+        size = os.fstat(self._index_file.fileno()).st_size
+        if size % INDEX_RECORD.size:
+            # Half-written record from a crash mid-append; its entry was never committed
+            print(f"Dropping a torn record at the end of {self.index_path.name}")
+            size -= size % INDEX_RECORD.size
+            self._index_file.truncate(size)
+        return size
+
+    def _remap(self):
+        index_map, blob_map = _map(self.index_path), _map(self.blob_path)
+        rows = len(index_map) // INDEX_RECORD.size if index_map is not None else 0
+        self._maps = (index_map, blob_map, rows)
+
+    def _current_maps(self, row=None):
+        maps = self._maps
+        if maps is None or (row is not None and row >= maps[2]):
+            with self.lock:
+                if self._maps is None:
+                    self._open()
+                elif row is not None and row >= self._maps[2]:
+                    # Written by another store instance since we mapped the files
+                    self._remap()
+                maps = self._maps
+        return maps
+
+    def index(self):
+        """The index as a NumPy structured array (a view of the map, no copy)"""
+        index_map, _, rows = self._current_maps()
+        if not rows:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.frombuffer(index_map, dtype=INDEX_DTYPE, count=rows)
+
+    def locate(self, row):
+        """(entry id, offset, length, createdAt epoch microseconds) of an index row"""
+        index_map, _, rows = self._current_maps(row)
+        if row >= rows:
+            raise IndexError(f"Row {row} is not in {self.index_path.name}")
+        return INDEX_RECORD.unpack_from(index_map, row * INDEX_RECORD.size)
+
+    def view(self, row):
+        """Zero-copy memoryview of the UTF-8 content stored at ``row``"""
+        index_map, blob_map, rows = self._current_maps(row)
+        if row >= rows:
+            raise IndexError(f"Row {row} is not in {self.index_path.name}")
+        _, offset, length, _ = INDEX_RECORD.unpack_from(index_map, row * INDEX_RECORD.size)
+        if not length or blob_map is None:
+            # Empty content; the blob file may not even have been mapped
+            return memoryview(b'')
+        return memoryview(blob_map)[offset:offset + length]
+
+    def read(self, row):
+        """The content stored at ``row`` as a str"""
+        with self._decoded_lock:
+            text = self._decoded.get(row)
+            if text is not None:
+                self._decoded.move_to_end(row)
+                return text
+        text = str(self.view(row), 'utf-8')
+        with self._decoded_lock:
+            self._decoded[row] = text
+            if len(self._decoded) > READ_CACHE_ROWS:
+                self._decoded.popitem(last=False)
+        return text
+
+    def append_many(self, items):
+        """
+        Durably store (entry id, createdAt epoch microseconds or UNDATED, content)
+        items with one fsync per file; returns the index row of the first one,
+        the others follow in order. Non-integer ids are indexed as 0.
+        """
+        chunks, records = [], []
+        with self.lock:
+            if self._maps is None:
+                self._open()
+            with self._exclusive():
+                # Another process may have appended since we opened the files, so
+                # offsets and rows come from the current sizes, not our own positions
+                first_row = self._index_size() // INDEX_RECORD.size
+                offset = os.fstat(self._blob_file.fileno()).st_size
+                for entry_id, ts, content in items:
+                    data = content.encode('utf-8')
+                    records.append(INDEX_RECORD.pack(
+                        entry_id if isinstance(entry_id, int) else 0, offset, len(data), ts))
+                    chunks.append(data)
+                    offset += len(data)
+
+                self._blob_file.write(b''.join(chunks))
+                self._blob_file.flush()
+                os.fsync(self._blob_file.fileno())
+
+                self._index_file.write(b''.join(records))
+                self._index_file.flush()
+                os.fsync(self._index_file.fileno())
+            self._remap()
+        return first_row
+
+    def close(self):
+        with self.lock:
+            for f in (self._blob_file, self._index_file):
+                if f is not None:
+                    f.close()
+            self._blob_file = self._index_file = None
+            self._maps = None
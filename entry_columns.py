@@ -0,0 +1,137 @@
+"""
+Columnar NumPy view of the entry metadata.
+
+``EntryColumns`` holds one array per field, row ``i`` describing entry ``i``
+of an ``EntryStore`` snapshot, so analytics can filter and group with
+vectorized operations instead of looping over dicts:
+
+- ``ts``: int64 epoch seconds (``UNDATED`` when createdAt is unusable)
+- ``day``: int32 local epoch day
+- ``month``: int32 ``year * 12 + month - 1`` of the local date
+- ``hour`` / ``weekday``: int8 local hour and weekday (0 = Monday)
+- ``moods``: uint16 bitmask over ``MOOD_FLAGS``; ``mood_count``: number of moods
+- ``length``: int32 UTF-8 byte length of the content (taken from the blob
+  index for content in the blob file, which is not decoded);
+  ``lang``: int8 code from ``LANGUAGE_CODES``
+
+The store keeps the columns in sync on writes (``with_rows`` copies the
+arrays and patches only the changed rows) and rebuilds them on reload.
+"""
+import numpy as np
+
+from entry_record import EntryRecord
+
+# Mood values offered by the client, in flag-bit order
+MOOD_FLAGS = ['happy', 'relaxed', 'tired', 'anxious', 'sad', 'angry', 'thoughtful', 'confident']
+MOOD_BITS = {mood: 1 << i for i, mood in enumerate(MOOD_FLAGS)}
+
+LANGUAGE_CODES = {'unknown': 0, 'chinese': 1, 'english': 2}
+
+UNDATED = np.iinfo(np.int64).min
+
+COLUMN_TYPES = (
+    ('ts', np.int64),
+    ('day', np.int32),
+    ('month', np.int32),
+    ('hour', np.int8),
+    ('weekday', np.int8),
+    ('moods', np.uint16),
+    ('mood_count', np.int16),
+    ('length', np.int32),
+    ('lang', np.int8),
+)
+
+
+def mood_mask(moods):
+    """Bitmask of the MOOD_FLAGS in a list of moods"""
+    bits = 0
+    for mood in moods or []:
+        bits |= MOOD_BITS.get(mood, 0)
+    return bits
+
+
+def _content_length(entry):
+    if isinstance(entry, EntryRecord):
+        return entry.content_length()
+    content = entry.get('content')
+    return len(content.encode('utf-8')) if isinstance(content, str) else 0
+
+
+def _row(entry, meta):
+    moods = entry.get('moods') or []
+    if meta['ts'] is None:
+        ts, day, month, hour, weekday = UNDATED, 0, 0, 0, 0
+    else:
+        ts = int(meta['ts'])
+        day, hour, weekday = meta['day'], meta['hour'], meta['weekday']
+        month = int(meta['month'][:4]) * 12 + int(meta['month'][5:]) - 1
+    return (
+        ts, day, month, hour, weekday,
+        mood_mask(moods), len(moods), _content_length(entry),
+        LANGUAGE_CODES.get(meta['lang'], 0),
+    )
+
+
+class EntryColumns:
+    """Parallel NumPy arrays of per-entry metadata (read-only once built)"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        for name, _ in COLUMN_TYPES:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, entries, metas):
+        rows = [_row(entry, meta) for entry, meta in zip(entries, metas)]
+        arrays = {}
+        for i, (name, dtype) in enumerate(COLUMN_TYPES):
+            arrays[name] = np.fromiter((row[i] for row in rows), dtype=dtype, count=len(rows))
+        return cls(arrays)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def with_rows(self, changes, size):
+        """
+        Copy with the rows in ``changes`` ({row: (entry, meta)}) replaced and
+        the arrays grown to ``size`` rows for appended entries.
+        """
+        arrays = {}
+        for name, dtype in COLUMN_TYPES:
+            array = np.empty(size, dtype=dtype)
+            array[:len(self)] = self.arrays[name]
+            arrays[name] = array
+        for index, (entry, meta) in changes.items():
+            for (name, _), value in zip(COLUMN_TYPES, _row(entry, meta)):
+                arrays[name][index] = value
+        return EntryColumns(arrays)
+
+    @property
+    def dated(self):
+        return self.ts != UNDATED
+
+    def mask(self, start_ts=None, end_ts=None, with_moods=False):
+        """Boolean row mask: dated entries in [start_ts, end_ts], optionally only those with moods"""
+        mask = self.dated
+        if start_ts is not None:
+            mask &= self.ts >= start_ts
+        if end_ts is not None:
+            mask &= self.ts <= end_ts
+        if with_moods:
+            mask &= self.mood_count > 0
+        return mask
+
+    def group_counts(self, column, mask=None):
+        """{value: row count} of a column over the masked rows"""
+        values = getattr(self, column)
+        if mask is not None:
+            values = values[mask]
+        keys, counts = np.unique(values, return_counts=True)
+        return dict(zip(keys.tolist(), counts.tolist()))
+
+    def count_by(self, column, mask=None, minlength=0):
+        """Histogram of an integer column over the masked rows"""
+        values = getattr(self, column)
+        if mask is not None:
+            values = values[mask]
+        return np.bincount(values.astype(np.int64), minlength=minlength)
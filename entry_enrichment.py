@@ -0,0 +1,159 @@
+"""
+Write-time enrichment of diary entries.
+
+``enrich_entry`` derives the values the read paths need over and over
+(the parsed timestamp and local day, language, a token estimate, a
+content hash and the new-topic heuristic). ``EntryStore`` computes them
+once when an entry is written or loaded and keeps them next to the
+resident entry, so analytics read cached fields instead of re-parsing
+``createdAt`` per query. Content itself is not copied into them; mention
+checks lowercase it on demand (``entry_text``).
+
+``simhash`` fingerprints content so the topic pipeline can tell a re-saved,
+barely changed entry from a real edit.
+"""
+import functools
+import hashlib
+import re
+import sys
+
+import numpy as np
+
+from entry_store import local_epoch_day, parse_created_at
+
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+CAPITALIZED_PATTERN = re.compile(r'\b[A-Z][a-z]+\b')
+CHINESE_TERM_PATTERN = re.compile(r'[\u4e00-\u9fff]{2,4}')
+
+# Latin words and runs of CJK characters (split into bigrams) are the search and simhash tokens
+FEATURE_PATTERN = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]+')
+SIMHASH_BITS = 64
+_SIMHASH_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+PROJECT_INDICATORS = ['项目', '系统', '平台', '应用', 'project', 'system', 'platform', 'app']
+PERSON_INDICATORS = ['老师', '同事', '朋友', '客户', 'teacher', 'colleague', 'friend', 'client']
+
+
+def detect_language(text: str) -> str:
+    """Simple language detection based on character analysis"""
+    if not text or not text.strip():
+        return "unknown"
+
+    # Count Chinese characters (CJK Unified Ideographs)
+    chinese_chars = len(CJK_PATTERN.findall(text))
+    total_chars = sum(map(str.isalpha, text))
+
+    if total_chars == 0:
+        return "unknown"
+
+    chinese_ratio = chinese_chars / total_chars
+
+    # If more than 30% Chinese characters, consider it Chinese
+    if chinese_ratio > 0.3:
+        return "chinese"
+    else:
+        return "english"
+
+
+def estimate_tokens(text):
+    """Rough LLM token count: one per CJK character, ~1.3 per latin word"""
+    cjk = len(CJK_PATTERN.findall(text))
+    words = len(WORD_PATTERN.findall(text))
+    return cjk + round(words * 1.3)
+
+
+def has_potential_new_topics(content, lowered=None):
+    """Heuristic: does the content look like it names new projects, people or terms?"""
+    if not content:
+        return False
+    lowered = lowered if lowered is not None else content.lower()
+
+    # Capitalized words might be names or projects; runs of Chinese characters names/terms
+    capitalized_words = CAPITALIZED_PATTERN.findall(content)
+    chinese_names = CHINESE_TERM_PATTERN.findall(content)
+
+    has_project_terms = any(indicator in lowered for indicator in PROJECT_INDICATORS)
+    has_person_terms = any(indicator in lowered for indicator in PERSON_INDICATORS)
+
+    return (len(capitalized_words) >= 2 or len(chinese_names) >= 2 or
+            has_project_terms or has_person_terms)
+
+
+def text_tokens(lowered):
+    """Latin words and CJK character bigrams (lone CJK characters as is) of lowercased text"""
+    tokens = []
+    for run in FEATURE_PATTERN.findall(lowered):
+        if '\u4e00' <= run[0] <= '\u9fff' and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _feature_digest(feature):
+    # Diary vocabulary repeats a lot, so most features are hashed only once
+    return hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+
+
+def simhash(text):
+    """64-bit SimHash of a text; near-identical texts differ in only a few bits"""
+    features = set(text_tokens((text or '').lower()))
+    if not features:
+        return 0
+
+    # One big-endian 64-bit hash per feature, then a per-bit majority vote
+    digests = b''.join(map(_feature_digest, features))
+    values = np.frombuffer(digests, dtype='>u8')
+    ones = ((values[:, None] >> _SIMHASH_SHIFTS) & 1).sum(axis=0)
+    return int.from_bytes(np.packbits(ones * 2 > len(values), bitorder='little').tobytes(), 'little')
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two fingerprints"""
+    return (a ^ b).bit_count()
+
+
+def entry_text(entry):
+    """
+    Lowercased content for case-insensitive matching. Computed on demand:
+    metas keep no second copy of every body.
+    """
+    return (entry.get('content') or '').lower()
+
+
+def enrich_entry(entry):
+    """
+    Derived metadata for an entry:
+    ts (epoch seconds), day (local epoch day), date ('YYYY-MM-DD'), month
+    ('YYYY-MM'), hour, weekday (0 = Monday), lang, tokens, hash (sha256 of
+    the content) and topic_hint (has_potential_new_topics).
+    Date fields are None when createdAt is missing or unparseable.
+    """
+    content = entry.get('content') or ''
+
+    ts = day = local_date = month = hour = weekday = None
+    try:
+        dt = parse_created_at(entry['createdAt']).astimezone()
+        ts = dt.timestamp()
+        day = local_epoch_day(dt)
+        local_date = sys.intern(dt.strftime('%Y-%m-%d'))
+        month = sys.intern(f"{dt.year}-{dt.month:02d}")
+        hour = dt.hour
+        weekday = dt.weekday()
+    except (KeyError, TypeError, ValueError, AttributeError):
+        pass
+
+    return {
+        'ts': ts,
+        'day': day,
+        'date': local_date,
+        'month': month,
+        'hour': hour,
+        'weekday': weekday,
+        'lang': detect_language(content),
+        'tokens': estimate_tokens(content),
+        'hash': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+        'topic_hint': has_potential_new_topics(content),
+    }
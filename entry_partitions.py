@@ -0,0 +1,618 @@
+"""
+Month-partitioned entry log for the JSON storage backend.
+
+Entries are stored under ``data/entries/`` as one JSONL file per local
+calendar month of their ``createdAt`` (``2026-10.jsonl``), plus
+``undated.jsonl`` for entries without a usable date and a small
+``manifest.json`` listing the partitions.
+
+Each line of a partition is a record: ``{"op": "put", "entry": ...}``
+creates or replaces the first entry with that id, ``{"op": "add", ...}``
+appends unconditionally (written by compaction so duplicate ids survive)
+and ``{"op": "del", "id": ...}`` removes the first entry with that id.
+Every write appends to the partition of the entry's month; an update that
+moves ``createdAt`` to another month also appends a ``del`` to the
+partition that held it. A partition whose file has accumulated many
+superseded records is rewritten on its own.
+
+Parsed partitions are cached together with their file signature, so after
+an external change only the partitions that actually changed are re-read,
+and ``read_range`` (bounded date queries reaching into old months) only
+opens the partitions overlapping the requested days. Cold partitions read
+that way are parsed for the one read and not cached.
+
+Content lives outside the partitions, in the memory-mapped blob file of an
+``entry_blobs.ContentBlobStore`` (``content.blob`` / ``content.idx``): a
+record stores the entry with ``"content": null`` and the index row of its
+text in ``"blob"``, and the parsed entry holds a ``ContentRef`` that is only
+decoded when the content is read. Partitions therefore stay small and
+loading them parses metadata only. Records written before the blob file
+existed keep their inline content and are moved out when their partition
+is next rewritten (every partition is, once, on the first start).
+
+Tiering: once a month is older than ``cold_after_days`` its partition is
+frozen into a gzip-compressed segment (``2025-01.jsonl.gz``) and dropped
+from the cache. Cold segments are only decompressed when a read needs that
+month; later updates to an old entry append to a small uncompressed tail
+(``2025-01.jsonl``) that is replayed after the segment.
+"""
+import gzip
+import json
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from entry_blobs import UNDATED as NO_TIMESTAMP, ContentBlobStore, ContentRef
+from entry_record import EntryRecord
+from entry_store import EPOCH_ORDINAL, _write_temp, local_epoch_day, parse_created_at
+
+UNDATED = 'undated'
+
+
+def partition_key(entry):
+    """'YYYY-MM' of the entry's local creation date, or 'undated'"""
+    try:
+        dt = parse_created_at(entry['createdAt'])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return UNDATED
+    return dt.astimezone().strftime('%Y-%m')
+
+
+def partition_days(key):
+    """(first epoch day, last epoch day) covered by a month partition"""
+    year, month = int(key[:4]), int(key[5:7])
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return first.toordinal() - EPOCH_ORDINAL, following.toordinal() - EPOCH_ORDINAL - 1
+
+
+def _file_signature(path):
+    try:
+        stat = path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+
+def _read_legacy(snapshot_path, journal_path):
+    """
+    Entries of the pre-partitioning layout, in creation order: the
+    ``entries.json`` snapshot with the ``put`` records of its JSONL journal
+    applied (an update replaces the first entry with its id), including a
+    ``.compacting`` journal left by an interrupted compaction. Returns
+    (entries, the files that exist).
+    """
+    compacting_path = journal_path.with_name(journal_path.name + '.compacting')
+    entries = []
+    if snapshot_path.exists():
+        try:
+            with open(snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            entries = snapshot if isinstance(snapshot, list) else []
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error reading entries snapshot: {e}")
+
+    positions = {}
+    for index, entry in enumerate(entries):
+        positions.setdefault(entry.get('id'), index)
+    for path in (compacting_path, journal_path):
+        if not path.exists():
+            continue
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-append
+                    print(f"Skipping corrupt journal record in {path.name}")
+                    continue
+                if record.get('op') == 'put':
+                    entry = record['entry']
+                    index = positions.get(entry.get('id'))
+                    if index is None:
+                        positions[entry.get('id')] = len(entries)
+                        entries.append(entry)
+                    else:
+                        entries[index] = entry
+    return entries, [path for path in (snapshot_path, compacting_path, journal_path) if path.exists()]
+
+
+def _epoch_micros(entry):
+    """createdAt as epoch microseconds for the blob index (NO_TIMESTAMP if unusable)"""
+    try:
+        return round(parse_created_at(entry['createdAt']).timestamp() * 1_000_000)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return NO_TIMESTAMP
+
+
+class _Partition:
+    """Parsed contents of one partition: an optional cold segment plus a JSONL tail"""
+
+    def __init__(self, key, directory, blobs, cold=False):
+        self.key = key
+        self.blobs = blobs
+        self.path = directory / f"{key}.jsonl"
+        self.archive_path = directory / f"{key}.jsonl.gz"
+        self.cold = cold
+        self.loaded = False
+        self.entries = []
+        self.positions = {}
+        self.records = 0
+        self.signature = None
+
+    def file_signature(self):
+        return (_file_signature(self.archive_path), _file_signature(self.path))
+
+    def apply(self, op, entry):
+        entry = EntryRecord.from_entry(entry)
+        index = self.positions.get(entry.id) if op == 'put' else None
+        if index is None:
+            self.positions.setdefault(entry.id, len(self.entries))
+            self.entries.append(entry)
+        else:
+            self.entries[index] = entry
+        self.records += 1
+
+    def remove(self, entry_id):
+        index = self.positions.get(entry_id)
+        if index is not None:
+            del self.entries[index]
+            positions = {}
+            for i, entry in enumerate(self.entries):
+                positions.setdefault(entry.id, i)
+            self.positions = positions
+        self.records += 1
+
+    def _replay(self, f, name):
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from a crash mid-append
+                print(f"Skipping corrupt record in {name}")
+                continue
+            if record.get('op') in ('put', 'add'):
+                entry = record['entry']
+                if record.get('blob') is not None:
+                    entry['content'] = ContentRef(self.blobs, record['blob'])
+                self.apply(record['op'], entry)
+            elif record.get('op') == 'del':
+                self.remove(record.get('id'))
+
+    def load(self):
+        self.entries, self.positions, self.records = [], {}, 0
+        self.signature = self.file_signature()
+        if self.archive_path.exists():
+            with gzip.open(self.archive_path, 'rb') as f:
+                self._replay(f, self.archive_path.name)
+        if self.path.exists():
+            with open(self.path, 'rb') as f:
+                self._replay(f, self.path.name)
+        self.loaded = True
+
+    def unload(self):
+        self.entries, self.positions, self.records = [], {}, 0
+        self.signature = None
+        self.loaded = False
+
+
+class PartitionedEntryLog:
+    """Entries split into per-month JSONL partitions with a manifest"""
+
+    def __init__(self, directory, compact_threshold=200, cold_after_days=None):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / 'manifest.json'
+        self.compact_threshold = compact_threshold
+        # Months that ended more than this many days ago are kept compressed
+        # and only loaded on demand; None keeps everything hot
+        self.cold_after_days = cold_after_days
+        self.lock = threading.RLock()
+        self.tiering_lock = threading.Lock()
+        self.blobs = ContentBlobStore(self.directory)
+        self.partitions = {}
+        # Partition holding each entry id (first occurrence) among the loaded
+        # partitions, so updates go back to the file that already has the entry
+        self.locations = {}
+        self.manifest_signature = None
+        self._files = {}
+
+    # Manifest
+
+    def exists(self):
+        return self.manifest_path.exists()
+
+    def _ordered_keys(self):
+        # Month keys sort chronologically; undated entries come last
+        return sorted(self.partitions, key=lambda key: (key == UNDATED, key))
+
+    def _read_manifest(self):
+        tiers = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    for item in json.load(f).get('partitions', []):
+                        tiers[item['month']] = item.get('tier', 'hot')
+            except (json.JSONDecodeError, OSError, KeyError, TypeError, AttributeError) as e:
+                # Rebuild the list from the partition files themselves
+                print(f"Entry manifest is invalid ({e}); rescanning {self.directory}")
+                tiers = {}
+                for path in self.directory.glob('*.jsonl*'):
+                    key = path.name.split('.')[0]
+                    if path.name.endswith('.gz') or key not in tiers:
+                        tiers[key] = 'cold' if path.name.endswith('.gz') else 'hot'
+
+        for key, tier in tiers.items():
+            partition = self.partitions.get(key)
+            if partition is None or partition.cold != (tier == 'cold'):
+                self.partitions[key] = _Partition(key, self.directory, self.blobs, cold=tier == 'cold')
+        for key in list(self.partitions):
+            if key not in tiers:
+                del self.partitions[key]
+        self.manifest_signature = _file_signature(self.manifest_path)
+
+    def _write_manifest(self):
+        manifest = {
+            'format': 1,
+            'partitions': [
+                {
+                    'month': key,
+                    'file': (partition.archive_path if partition.cold else partition.path).name,
+                    'tier': 'cold' if partition.cold else 'hot',
+                }
+                for key, partition in ((key, self.partitions[key]) for key in self._ordered_keys())
+            ],
+        }
+        data = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+        os.replace(_write_temp(self.manifest_path, data), self.manifest_path)
+        self.manifest_signature = _file_signature(self.manifest_path)
+
+    def initialize(self):
+        """Create an empty partition directory and manifest if there is none, then apply tiering"""
+        with self.lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if not self.manifest_path.exists():
+                self._write_manifest()
+            self.blobs.initialize()
+        self.apply_tiering()
+
+    # Reading
+
+    def _refresh_manifest(self):
+        if _file_signature(self.manifest_path) != self.manifest_signature:
+            self._read_manifest()
+
+    def _refresh(self, keys):
+        """Load the given partitions if they are not cached or their files changed"""
+        self._refresh_manifest()
+        refreshed = False
+        for key in keys:
+            partition = self.partitions.get(key)
+            if partition is not None and (not partition.loaded or partition.file_signature() != partition.signature):
+                partition.load()
+                refreshed = True
+        if refreshed:
+            locations = {}
+            for key in self._ordered_keys():
+                for entry_id in self.partitions[key].positions:
+                    locations.setdefault(entry_id, key)
+            self.locations = locations
+
+    def changed_externally(self):
+        """True if the manifest or any cached partition changed behind our back"""
+        with self.lock:
+            if _file_signature(self.manifest_path) != self.manifest_signature:
+                return True
+            return any(
+                partition.file_signature() != partition.signature
+                for partition in self.partitions.values() if partition.loaded
+            )
+
+    def hot_from_day(self):
+        """First epoch day not covered by a cold partition, or None if nothing is cold"""
+        with self.lock:
+            self._refresh_manifest()
+            cold_ends = [partition_days(key)[1] for key, p in self.partitions.items() if p.cold]
+        return max(cold_ends) + 1 if cold_ends else None
+
+    def read_all(self, first_day=None):
+        """
+        All entries (partitions in month order, file order within each), or
+        only those of months ending on/after ``first_day`` plus undated ones.
+        """
+        with self.lock:
+            self._refresh_manifest()
+            keys = [
+                key for key in self._ordered_keys()
+                if first_day is None or key == UNDATED or partition_days(key)[1] >= first_day
+            ]
+            self._refresh(keys)
+            entries = []
+            for key in keys:
+                entries.extend(self.partitions[key].entries)
+        return entries
+
+    def keys_for_days(self, first_day=None, last_day=None):
+        """Month partitions that can hold entries dated in [first_day, last_day]"""
+        with self.lock:
+            self._refresh_manifest()
+            keys = []
+            for key in self._ordered_keys():
+                if key == UNDATED:
+                    continue
+                start, end = partition_days(key)
+                if (first_day is None or end >= first_day) and (last_day is None or start <= last_day):
+                    keys.append(key)
+        return keys
+
+    def _partition_for_read(self, key):
+        """
+        Parsed contents of one partition. A cold partition that is not cached
+        is parsed into a throwaway copy, so reading the archive does not keep
+        it in memory.
+        """
+        self._refresh_manifest()
+        partition = self.partitions.get(key)
+        if partition is None or not partition.cold or partition.loaded:
+            self._refresh([key])
+            return partition
+        transient = _Partition(key, self.directory, self.blobs, cold=True)
+        transient.load()
+        return transient
+
+    def iter_months(self, first_day=None, last_day=None):
+        """
+        Yield (month key, entries) of the month partitions overlapping
+        [first_day, last_day], oldest first, one month at a time; the lock is
+        not held while the caller works through a month.
+        """
+        for key in self.keys_for_days(first_day, last_day):
+            with self.lock:
+                partition = self._partition_for_read(key)
+                if partition is None:
+                    continue
+                entries = list(partition.entries)
+            yield key, entries
+
+    def read_range(self, first_day=None, last_day=None):
+        """Entries dated in [first_day, last_day], opening only the overlapping partitions"""
+        entries = []
+        for _, month in self.iter_months(first_day, last_day):
+            for entry in month:
+                try:
+                    day = local_epoch_day(parse_created_at(entry['createdAt']))
+                except (KeyError, TypeError, ValueError):
+                    # Undated by an update written before updates moved entries
+                    continue
+                if (first_day is None or day >= first_day) and (last_day is None or day <= last_day):
+                    entries.append(entry)
+        return entries
+
+    # Writing
+
+    def _encode(self, op, entries):
+        """
+        [(record line, entry as stored)] for ``entries``. String content is
+        appended to the blob file (one append for the whole batch) and the
+        stored entry refers to it; content already in the blob file is not
+        copied again. Other content (None) stays inline.
+        """
+        rows = []
+        pending = []
+        for entry in entries:
+            content = entry.content if isinstance(entry, EntryRecord) else entry.get('content')
+            if type(content) is ContentRef and content.store is not self.blobs:
+                content = content.read()
+            if type(content) is ContentRef:
+                rows.append(content.row)
+            elif isinstance(content, str):
+                rows.append(None)
+                pending.append((entry.get('id'), _epoch_micros(entry), content))
+            else:
+                rows.append(False)
+        if pending:
+            row = self.blobs.append_many(pending)
+            for i, existing in enumerate(rows):
+                if existing is None:
+                    rows[i] = row
+                    row += 1
+
+        encoded = []
+        for entry, row in zip(entries, rows):
+            if row is False:
+                record = {'op': op, 'entry': dict(entry)}
+                stored = entry
+            else:
+                fields = {key: None if key == 'content' else entry[key] for key in entry}
+                record = {'op': op, 'entry': fields, 'blob': row}
+                if isinstance(entry, EntryRecord) and type(entry.content) is ContentRef:
+                    stored = entry
+                else:
+                    stored = dict(fields, content=ContentRef(self.blobs, row))
+            encoded.append((json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n', stored))
+        return encoded
+
+    def _open_partition(self, key):
+        f = self._files.get(key)
+        if f is None:
+            f = open(self.partitions[key].path, 'ab')
+            self._files[key] = f
+        return f
+
+    def append_many(self, entries, previous=None):
+        """
+        Durably record created/updated entries, one fsync per touched
+        partition. ``previous`` maps ids to the entries they replace; it tells
+        which partition to remove a re-dated entry from when that partition
+        is not cached.
+        """
+        if not entries:
+            return
+
+        with self.lock:
+            self._refresh_manifest()
+            # Content first: records only ever point at durable blob rows
+            encoded = self._encode('put', entries)
+            batches = {}
+            for entry, (line, stored) in zip(entries, encoded):
+                entry_id = entry.get('id')
+                key = partition_key(entry)
+                old_key = self.locations.get(entry_id)
+                if old_key is None and previous and entry_id in previous:
+                    old_key = partition_key(previous[entry_id])
+                if old_key is not None and old_key != key and old_key in self.partitions:
+                    # createdAt moved to another month: the entry moves with it
+                    tombstone = json.dumps({'op': 'del', 'id': entry_id}).encode('utf-8') + b'\n'
+                    batches.setdefault(old_key, []).append((tombstone, 'del', entry_id))
+                self.locations[entry_id] = key
+                batches.setdefault(key, []).append((line, 'put', stored))
+
+            new_keys = [key for key in batches if key not in self.partitions]
+            for key in new_keys:
+                partition = _Partition(key, self.directory, self.blobs)
+                partition.load()
+                self.partitions[key] = partition
+
+            for key, batch in batches.items():
+                partition = self.partitions[key]
+                f = self._open_partition(key)
+                f.write(b''.join(line for line, _, _ in batch))
+                f.flush()
+                os.fsync(f.fileno())
+                # A partition that is not cached just gets read with the new
+                # records the next time it is needed
+                if partition.loaded:
+                    for _, op, value in batch:
+                        if op == 'del':
+                            partition.remove(value)
+                        else:
+                            partition.apply('put', value)
+                    partition.signature = partition.file_signature()
+
+            if new_keys:
+                self._write_manifest()
+
+            for key in batches:
+                partition = self.partitions[key]
+                if partition.loaded and partition.records - len(partition.entries) >= self.compact_threshold:
+                    self.compact_partition(key)
+
+        if new_keys and self.cold_after_days is not None:
+            # A new month started; older months may now be due for the cold tier
+            threading.Thread(target=self.apply_tiering, daemon=True).start()
+
+    def compact_partition(self, key):
+        """Rewrite one partition with only its current entries (into its segment if cold)"""
+        with self.lock:
+            partition = self.partitions[key]
+            if not partition.loaded:
+                partition.load()
+            f = self._files.pop(key, None)
+            if f is not None:
+                f.close()
+            folded = partition.records - len(partition.entries)
+            encoded = self._encode('add', partition.entries)
+            data = b''.join(line for line, _ in encoded)
+            if partition.cold:
+                os.replace(_write_temp(partition.archive_path, gzip.compress(data)), partition.archive_path)
+                if partition.path.exists():
+                    partition.path.unlink()
+            else:
+                os.replace(_write_temp(partition.path, data), partition.path)
+            # Entries whose inline content just moved to the blob file drop their copy
+            partition.entries = [EntryRecord.from_entry(entry) for _, entry in encoded]
+            partition.records = len(partition.entries)
+            partition.signature = partition.file_signature()
+        if folded:
+            print(f"Compacted partition {key}: dropped {folded} superseded records")
+
+    def freeze_partition(self, key):
+        """Move a partition to the cold tier and drop it from the cache"""
+        with self.lock:
+            partition = self.partitions[key]
+            partition.cold = True
+            self.compact_partition(key)
+            self._write_manifest()
+            partition.unload()
+            self.locations = {
+                entry_id: location for entry_id, location in self.locations.items() if location != key
+            }
+
+    def apply_tiering(self, today=None):
+        """Freeze every hot month that ended more than ``cold_after_days`` ago"""
+        if self.cold_after_days is None or not self.tiering_lock.acquire(blocking=False):
+            return
+        try:
+            today = today if today is not None else local_epoch_day(datetime.now().astimezone())
+            with self.lock:
+                self._refresh_manifest()
+                due = [
+                    key for key, partition in self.partitions.items()
+                    if key != UNDATED and not partition.cold
+                    and partition_days(key)[1] < today - self.cold_after_days
+                ]
+            for key in sorted(due):
+                self.freeze_partition(key)
+            if due:
+                print(f"Moved {len(due)} monthly partitions to the compressed cold tier")
+        except Exception as e:
+            print(f"Error applying entry tiering: {e}")
+        finally:
+            self.tiering_lock.release()
+
+    def import_entries(self, entries):
+        """Write ``entries`` as the complete contents of a fresh partition set"""
+        with self.lock:
+            self.close()
+            batches = {}
+            for entry in entries:
+                batches.setdefault(partition_key(entry), []).append(entry)
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in self.directory.glob('*.jsonl*'):
+                path.unlink()
+            self.partitions = {}
+            for key, batch in batches.items():
+                partition = _Partition(key, self.directory, self.blobs)
+                data = b''.join(line for line, _ in self._encode('add', batch))
+                os.replace(_write_temp(partition.path, data), partition.path)
+                self.partitions[key] = partition
+            self._write_manifest()
+            self.locations = {}
+        self.apply_tiering()
+
+    def import_legacy(self, snapshot_path, journal_path):
+        """Split a legacy entries.json (+ journal) into partitions and set the old files aside"""
+        snapshot_path, journal_path = Path(snapshot_path), Path(journal_path)
+        entries, paths = _read_legacy(snapshot_path, journal_path)
+        self.import_entries(entries)
+        for path in paths:
+            os.replace(path, path.with_name(path.name + '.migrated'))
+        print(f"Split {len(entries)} entries from {snapshot_path.name} into {len(self.partitions)} monthly partitions")
+
+    def externalize_content(self):
+        """Rewrite every partition with its inline content moved to the blob file (one-time upgrade)"""
+        with self.lock:
+            self._refresh_manifest()
+            keys = self._ordered_keys()
+            for key in keys:
+                partition = self.partitions[key]
+                was_loaded = partition.loaded
+                self.compact_partition(key)
+                if not was_loaded:
+                    partition.unload()
+            # Creating the blob files marks the upgrade as done
+            self.blobs.initialize()
+        if keys:
+            print(f"Moved entry content of {len(keys)} partitions into {self.blobs.blob_path.name}")
+
+    def close(self):
+        with self.lock:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+            self.blobs.close()
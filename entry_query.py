@@ -0,0 +1,205 @@
+"""
+Structured entry queries over posting lists.
+
+A filter is a small JSON document::
+
+    {"and": [
+        {"topic": "topic_3f2a"}, {"person": "person_9c1d"},
+        {"mood": "anxious"},
+        {"from": "2026-03-01", "to": "2026-03-31"}
+    ]}
+
+Leaf keys are ``mood``, ``lang``, ``type``, ``month`` ('YYYY-MM'),
+``mention`` (case-insensitive text), ``topic`` / ``person`` (ids, resolved to
+their names by the caller) and ``from`` / ``to`` (local dates, inclusive).
+A list value matches any of its items, several keys in one object must all
+match, and ``and`` / ``or`` / ``not`` combine sub-filters.
+
+``PostingLists`` keeps, for every (field, value) pair, the set of store rows
+(positions in the ``EntryStore`` snapshot) that carry it, and is updated per
+changed row on writes. A query turns each leaf into a sorted row array and
+combines them with NumPy set operations, so its cost follows the size of
+the postings it touches rather than the number of entries; date ranges come
+from the store's sorted date index. Only ``not`` needs the full row range.
+Mention postings are built by one scan the first time a term is queried and
+maintained incrementally afterwards (for up to ``MAX_TERMS`` terms).
+"""
+import bisect
+from collections import OrderedDict
+
+import numpy as np
+
+from entry_enrichment import entry_text
+from entry_store import epoch_day_from_param
+
+INDEXED_FIELDS = ('mood', 'lang', 'type', 'month')
+LEAF_FIELDS = INDEXED_FIELDS + ('mention', 'topic', 'person')
+
+# Mention terms whose postings are kept up to date, least recently queried dropped first
+MAX_TERMS = 256
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def parse_filter(spec, resolve_topic=None):
+    """
+    Validate a filter document and turn it into a query tree of tuples:
+    ('and', [...]), ('or', [...]), ('not', node), ('field', name, value),
+    ('term', text), ('days', first_day, last_day) or ('none',).
+    ``resolve_topic(kind, id)`` maps topic/person ids to names (None if unknown).
+    Raises ValueError on malformed filters.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("a filter must be a JSON object")
+    if not spec:
+        return ('and', [])
+
+    parts = []
+    for key, value in spec.items():
+        if key in ('and', 'or'):
+            if not isinstance(value, list):
+                raise ValueError(f"'{key}' takes a list of filters")
+            parts.append((key, [parse_filter(item, resolve_topic) for item in value]))
+        elif key == 'not':
+            parts.append(('not', parse_filter(value, resolve_topic)))
+        elif key in ('from', 'to'):
+            continue
+        elif key in LEAF_FIELDS:
+            options = []
+            for item in _as_list(value):
+                if not isinstance(item, str) or not item:
+                    raise ValueError(f"'{key}' values must be non-empty strings")
+                if key in ('topic', 'person'):
+                    name = resolve_topic(key, item) if resolve_topic else None
+                    options.append(('term', name.lower()) if name else ('none',))
+                elif key == 'mention':
+                    options.append(('term', item.lower()))
+                else:
+                    options.append(('field', key, item))
+            parts.append(options[0] if len(options) == 1 else ('or', options))
+        else:
+            raise ValueError(f"Unknown filter key '{key}'")
+
+    if 'from' in spec or 'to' in spec:
+        try:
+            first_day = epoch_day_from_param(spec['from']) if spec.get('from') else None
+            last_day = epoch_day_from_param(spec['to']) if spec.get('to') else None
+        except (TypeError, ValueError):
+            raise ValueError("'from' and 'to' must be dates (YYYY-MM-DD)")
+        parts.append(('days', first_day, last_day))
+
+    return parts[0] if len(parts) == 1 else ('and', parts)
+
+
+class PostingLists:
+    """Row sets per indexed value of one EntryStore snapshot (mutated only under the store lock)"""
+
+    def __init__(self):
+        self._sets = {}
+        self._arrays = {}
+        self._terms = OrderedDict()
+
+    @classmethod
+    def build(cls, entries, metas):
+        postings = cls()
+        for row, (entry, meta) in enumerate(zip(entries, metas)):
+            postings.add(row, entry, meta)
+        return postings
+
+    @staticmethod
+    def _keys(entry, meta):
+        for mood in entry.get('moods') or []:
+            yield ('mood', mood)
+        yield ('lang', meta['lang'])
+        yield ('type', entry.get('type'))
+        if meta['month'] is not None:
+            yield ('month', meta['month'])
+
+    def add(self, row, entry, meta):
+        for key in self._keys(entry, meta):
+            self._sets.setdefault(key, set()).add(row)
+            self._arrays.pop(key, None)
+        text = entry_text(entry) if self._terms else ''
+        for term, rows in self._terms.items():
+            if term in text:
+                rows.add(row)
+                self._arrays.pop(('term', term), None)
+
+    def remove(self, row, entry, meta):
+        for key in self._keys(entry, meta):
+            rows = self._sets.get(key)
+            if rows is not None:
+                rows.discard(row)
+                self._arrays.pop(key, None)
+        for term, rows in self._terms.items():
+            if row in rows:
+                rows.discard(row)
+                self._arrays.pop(('term', term), None)
+
+    def _array(self, key, rows):
+        array = self._arrays.get(key)
+        if array is None:
+            array = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            array.sort()
+            self._arrays[key] = array
+        return array
+
+    def rows(self, field, value):
+        """Sorted rows whose ``field`` has ``value``"""
+        rows = self._sets.get((field, value))
+        return self._array((field, value), rows) if rows else _EMPTY
+
+    def term_rows(self, term, entries):
+        """Sorted rows whose lowercased content contains ``term``"""
+        rows = self._terms.get(term)
+        if rows is None:
+            rows = {row for row, entry in enumerate(entries) if term in entry_text(entry)}
+            self._terms[term] = rows
+            if len(self._terms) > MAX_TERMS:
+                dropped, _ = self._terms.popitem(last=False)
+                self._arrays.pop(('term', dropped), None)
+        else:
+            self._terms.move_to_end(term)
+        return self._array(('term', term), rows)
+
+    def select(self, node, entries, date_index, size):
+        """Sorted rows matching a parsed query tree"""
+        kind = node[0]
+        if kind == 'field':
+            return self.rows(node[1], node[2])
+        if kind == 'term':
+            return self.term_rows(node[1], entries)
+        if kind == 'none':
+            return _EMPTY
+        if kind == 'days':
+            _, first_day, last_day = node
+            lo = 0 if first_day is None else bisect.bisect_left(date_index, (first_day,))
+            hi = len(date_index) if last_day is None else bisect.bisect_left(date_index, (last_day + 1,))
+            rows = np.fromiter((key[2] for key in date_index[lo:hi]), dtype=np.int64, count=max(hi - lo, 0))
+            rows.sort()
+            return rows
+        if kind == 'not':
+            return np.setdiff1d(np.arange(size, dtype=np.int64),
+                                self.select(node[1], entries, date_index, size), assume_unique=True)
+        if kind == 'and':
+            if not node[1]:
+                return np.arange(size, dtype=np.int64)
+            # Intersect the smallest postings first
+            results = sorted((self.select(child, entries, date_index, size) for child in node[1]), key=len)
+            rows = results[0]
+            for other in results[1:]:
+                if not len(rows):
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            return rows
+        if kind == 'or':
+            rows = _EMPTY
+            for child in node[1]:
+                rows = np.union1d(rows, self.select(child, entries, date_index, size))
+            return rows
+        raise ValueError(f"Unknown query node {kind!r}")
+
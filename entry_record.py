@@ -0,0 +1,138 @@
+"""
+Compact in-memory representation of a diary entry.
+
+``EntryRecord`` replaces the plain dict the JSON parser produces: the
+well-known fields live in ``__slots__``, ``type`` and mood lists are
+interned so entries share one copy of each string and mood combination,
+and ``createdAt`` / ``updatedAt`` are kept as integer microseconds whenever
+the original string can be reproduced exactly from them (plain
+``datetime.isoformat()`` output and JavaScript ``toISOString()`` values;
+anything else stays a string). Content written to the JSON backend's blob
+file is held as an ``entry_blobs.ContentRef`` and only decoded when
+``content`` is read. The record does not keep the decoded text: each read
+returns a fresh str, apart from the few rows the blob store keeps decoded.
+Code that needs the text several times should read it once into a local.
+Code that only needs its size should use ``content_length()``, which takes
+it from the blob index.
+
+A record is a read-only ``Mapping`` with the same keys, key order and
+values as the dict it was built from, so ``entry['content']``,
+``entry.get('moods')``, ``dict(entry)`` and FastAPI's JSON encoding keep
+working and the API shape does not change. Use ``dict(entry)`` to get a
+mutable copy.
+"""
+import sys
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from entry_blobs import ContentRef
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# How a packed timestamp is rendered back to its original string
+RAW, NAIVE_ISO, JS_UTC = 0, 1, 2
+
+# Shared key-order and mood tuples, one per distinct layout / mood combination
+_key_orders = {}
+_mood_sets = {}
+
+
+def _render_timestamp(micros, fmt):
+    dt = _EPOCH + timedelta(microseconds=micros)
+    if fmt == NAIVE_ISO:
+        return dt.isoformat()
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"
+
+
+def pack_timestamp(value):
+    """(microseconds, format) for a timestamp string that round-trips exactly, else (value, RAW)"""
+    if not isinstance(value, str):
+        return value, RAW
+    try:
+        if value.endswith('Z'):
+            dt, fmt = datetime.fromisoformat(value[:-1]), JS_UTC
+        else:
+            dt, fmt = datetime.fromisoformat(value), NAIVE_ISO
+    except ValueError:
+        return value, RAW
+    if dt.tzinfo is not None:
+        return value, RAW
+    micros = (dt - _EPOCH) // _MICROSECOND
+    if _render_timestamp(micros, fmt) != value:
+        return value, RAW
+    return micros, fmt
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class EntryRecord(Mapping):
+    """Immutable, slotted, dict-compatible diary entry"""
+
+    __slots__ = ('_keys', 'id', 'content', 'type', 'moods', 'version', '_created', '_created_fmt',
+                 '_updated', '_updated_fmt', '_extra')
+
+    FIELDS = ('id', 'content', 'type', 'createdAt', 'moods', 'version', 'updatedAt')
+
+    def __init__(self, entry):
+        keys = tuple(entry)
+        self._keys = _key_orders.setdefault(keys, keys)
+        self.id = entry.get('id')
+        self.content = entry.get('content')
+        self.type = _intern(entry.get('type'))
+        moods = entry.get('moods')
+        if isinstance(moods, list):
+            moods = tuple(_intern(mood) for mood in moods)
+            moods = _mood_sets.setdefault(moods, moods) if len(_mood_sets) < 4096 else moods
+        self.moods = moods
+        self.version = entry.get('version')
+        self._created, self._created_fmt = pack_timestamp(entry.get('createdAt'))
+        self._updated, self._updated_fmt = pack_timestamp(entry.get('updatedAt'))
+        extra = {key: value for key, value in entry.items() if key not in self.FIELDS}
+        self._extra = extra or None
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Record for ``entry`` (returned unchanged if it already is one)"""
+        return entry if isinstance(entry, cls) else cls(entry)
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key == 'id':
+            return self.id
+        if key == 'content':
+            content = self.content
+            return content.read() if type(content) is ContentRef else content
+        if key == 'type':
+            return self.type
+        if key == 'createdAt':
+            return self._created if self._created_fmt == RAW else _render_timestamp(self._created, self._created_fmt)
+        if key == 'moods':
+            return list(self.moods) if isinstance(self.moods, tuple) else self.moods
+        if key == 'version':
+            return self.version
+        if key == 'updatedAt':
+            return self._updated if self._updated_fmt == RAW else _render_timestamp(self._updated, self._updated_fmt)
+        return self._extra[key]
+
+    def content_length(self):
+        """UTF-8 byte length of the content (0 if there is none), without decoding it"""
+        content = self.content
+        if type(content) is ContentRef:
+            return content.length()
+        return len(content.encode('utf-8')) if isinstance(content, str) else 0
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __repr__(self):
+        return f"EntryRecord({dict(self)!r})"
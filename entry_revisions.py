@@ -0,0 +1,213 @@
+"""
+Delta-compressed revision history of diary entries.
+
+Each edited entry gets an append-only ``revisions/<id>.jsonl`` file with one
+line per version::
+
+    {"v": 3, "at": "...", "moods": [...], "snapshot": "full text"}
+    {"v": 4, "at": "...", "moods": [...], "delta": [120, -14, "new words", 37]}
+
+A delta rebuilds a version from the one before it: a positive int copies
+that many characters of the previous text, a negative int skips that many
+and a string is inserted as is. Every ``SNAPSHOT_EVERY`` revisions (and
+whenever a delta would not be smaller than the text itself, e.g. after an
+LLM rewrite) the full text is stored instead, so rebuilding any version
+applies at most ``SNAPSHOT_EVERY - 1`` deltas to the nearest snapshot.
+
+Entries that were never edited have no file; the first edit records the
+previous text as a snapshot before the delta for the new one.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from difflib import SequenceMatcher
+from pathlib import Path
+
+SNAPSHOT_EVERY = 16
+
+# Replaced line blocks longer than this are stored as delete + insert
+# instead of being diffed character by character
+CHAR_DIFF_LIMIT = 20000
+
+
+def _append_op(ops, op):
+    """Add an op, merging it into the previous one when they are of the same kind"""
+    if ops:
+        last = ops[-1]
+        if isinstance(op, str) and isinstance(last, str):
+            ops[-1] = last + op
+            return
+        if isinstance(op, int) and isinstance(last, int) and (op > 0) == (last > 0):
+            ops[-1] = last + op
+            return
+    ops.append(op)
+
+
+def _diff_chars(old, new, ops):
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            _append_op(ops, i2 - i1)
+            continue
+        if i2 > i1:
+            _append_op(ops, -(i2 - i1))
+        if j2 > j1:
+            _append_op(ops, new[j1:j2])
+
+
+def make_delta(old, new):
+    """Delta ops turning ``old`` into ``new`` (line diff, refined per character inside changed blocks)"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old_block = ''.join(old_lines[i1:i2])
+        new_block = ''.join(new_lines[j1:j2])
+        if tag == 'equal':
+            _append_op(ops, len(old_block))
+        elif tag == 'replace' and len(old_block) + len(new_block) <= CHAR_DIFF_LIMIT:
+            _diff_chars(old_block, new_block, ops)
+        else:
+            if old_block:
+                _append_op(ops, -len(old_block))
+            if new_block:
+                _append_op(ops, new_block)
+    return ops
+
+
+def apply_delta(old, ops):
+    """Rebuild the text a delta was made for"""
+    parts = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.append(old[position:position + op])
+            position += op
+        else:
+            position -= op
+    return ''.join(parts)
+
+
+class RevisionLog:
+    """Per-entry revision files under one directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.lock = threading.Lock()
+
+    def _path(self, entry_id):
+        return self.directory / f"{int(entry_id)}.jsonl"
+
+    def _read(self, entry_id):
+        try:
+            with open(self._path(entry_id), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        revisions = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                revisions.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-append; the rest is intact
+                print(f"Skipping unreadable revision line for entry {entry_id}")
+        return revisions
+
+    def _append(self, entry_id, records):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path(entry_id), 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, previous, current):
+        """
+        Log ``current`` as the revision following ``previous`` (both full
+        entries of the same id, ``current`` carrying the new version).
+        """
+        entry_id = current['id']
+        version = current.get('version') or 0
+        content = current.get('content') or ''
+        previous_content = previous.get('content') or ''
+        # The time the new version was written, so the log agrees with the entry itself
+        now = current.get('updatedAt') or datetime.now().isoformat()
+
+        with self.lock:
+            revisions = self._read(entry_id)
+            records = []
+            since_snapshot = 0
+            if not revisions or revisions[-1]['v'] != version - 1:
+                # Start (or restart, after a gap) the chain from the previous text
+                records.append({
+                    'v': version - 1,
+                    'at': previous.get('updatedAt') or previous.get('createdAt'),
+                    'moods': previous.get('moods') or [],
+                    'snapshot': previous_content,
+                })
+            else:
+                for revision in reversed(revisions):
+                    if 'snapshot' in revision:
+                        break
+                    since_snapshot += 1
+
+            record = {'v': version, 'at': now, 'moods': current.get('moods') or []}
+            if since_snapshot + 1 >= SNAPSHOT_EVERY:
+                record['snapshot'] = content
+            else:
+                delta = make_delta(previous_content, content)
+                if len(json.dumps(delta, ensure_ascii=False)) < len(content):
+                    record['delta'] = delta
+                else:
+                    record['snapshot'] = content
+            records.append(record)
+            self._append(entry_id, records)
+
+    def list(self, entry_id):
+        """Revision summaries (version, time, storage kind and size), oldest first"""
+        summaries = []
+        for revision in self._read(entry_id):
+            kind = 'snapshot' if 'snapshot' in revision else 'delta'
+            payload = revision[kind]
+            summaries.append({
+                'version': revision['v'],
+                'at': revision.get('at'),
+                'kind': kind,
+                'stored_chars': len(payload) if kind == 'snapshot' else sum(
+                    len(op) if isinstance(op, str) else 1 for op in payload),
+            })
+        return summaries
+
+    def get(self, entry_id, version):
+        """{'version', 'at', 'moods', 'content'} of one revision, or None if it is not logged"""
+        revisions = self._read(entry_id)
+        target = None
+        for index, revision in enumerate(revisions):
+            if revision['v'] == version:
+                target = index
+        if target is None:
+            return None
+
+        start = target
+        while start >= 0 and 'snapshot' not in revisions[start]:
+            start -= 1
+        if start < 0:
+            return None
+        content = revisions[start]['snapshot']
+        for revision in revisions[start + 1:target + 1]:
+            content = apply_delta(content, revision['delta']) if 'delta' in revision else revision['snapshot']
+
+        revision = revisions[target]
+        return {
+            'version': version,
+            'at': revision.get('at'),
+            'moods': revision.get('moods') or [],
+            'content': content,
+        }
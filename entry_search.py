@@ -0,0 +1,271 @@
+"""
+Local BM25 full-text search and TF-IDF "related entries" over diary entries.
+
+``SearchIndex`` is an inverted index over the rows of an ``EntryStore``
+snapshot. Content is tokenized with ``entry_enrichment.text_tokens``
+(latin words, CJK character bigrams), each term keeps its postings as
+compact (rows, term frequencies) arrays sorted by row, so a changed row is
+found by binary search and patched in place on writes, and the NumPy
+copies used for scoring are cached per term until that term changes. Scoring a query touches only the postings of its terms;
+``search`` returns the top rows by BM25 with the usual k1/b defaults.
+
+``related`` ranks rows by cosine similarity of their TF-IDF vectors to a
+given entry, reusing the same postings (1 + log tf weights, smoothed IDF,
+per-row norms kept next to the document lengths), so similar entries need
+no second matrix and no network.
+
+``snippet`` cuts a window of an entry around the first query match and
+reports the matched ranges so the client can highlight them.
+"""
+import bisect
+import math
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from entry_enrichment import entry_text, text_tokens
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Distinctive terms of an entry matched when looking for related entries
+RELATED_TERMS = 32
+
+SNIPPET_BEFORE = 40
+SNIPPET_LENGTH = 160
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking (mutated only under the store lock)"""
+
+    def __init__(self):
+        # term -> (rows, term frequencies) as compact typed arrays
+        self._postings = {}
+        self._arrays = {}
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        # Euclidean norm of each row's TF-IDF vector, for related()
+        self._norms = np.zeros(1024, dtype=np.float32)
+        self._docs = 0
+        self._total_length = 0
+        # Document count the norms were last computed for in bulk
+        self._norms_docs = 0
+
+    @classmethod
+    def build(cls, entries):
+        index = cls()
+        for row, entry in enumerate(entries):
+            index.add(row, entry, with_norm=False)
+        index._compute_norms()
+        return index
+
+    def catch_up(self, built_from, entries):
+        """Patch an index built from the ``built_from`` entries to match ``entries`` (changed rows only)"""
+        for row, entry in enumerate(entries):
+            if row < len(built_from):
+                if built_from[row] is entry:
+                    continue
+                self.remove(row, built_from[row])
+            self.add(row, entry)
+        for row in range(len(entries), len(built_from)):
+            self.remove(row, built_from[row])
+
+    def _grow(self, row):
+        if row >= len(self._lengths):
+            size = max(row + 1, len(self._lengths) * 2)
+            for name in ('_lengths', '_norms'):
+                grown = np.zeros(size, dtype=np.float32)
+                old = getattr(self, name)
+                grown[:len(old)] = old
+                setattr(self, name, grown)
+
+    def _idf(self, document_frequency):
+        """Smoothed IDF for the TF-IDF vectors behind related()"""
+        return math.log((self._docs + 1) / (document_frequency + 1)) + 1
+
+    def add(self, row, entry, with_norm=True):
+        tokens = text_tokens(entry_text(entry))
+        self._grow(row)
+        self._lengths[row] = len(tokens)
+        self._docs += 1
+        self._total_length += len(tokens)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('q'), array('H'))
+            rows, frequencies = postings
+            if not rows or rows[-1] < row:
+                rows.append(row)
+                frequencies.append(min(count, 65535))
+            else:
+                # A rewritten row goes back to its place, keeping the rows sorted
+                position = bisect.bisect_left(rows, row)
+                rows.insert(position, row)
+                frequencies.insert(position, min(count, 65535))
+            self._arrays.pop(term, None)
+        if with_norm:
+            # Uses today's document frequencies; rows keep the norm they were written with
+            self._norms[row] = math.sqrt(sum(
+                ((1 + math.log(count)) * self._idf(len(self._postings[term][0]))) ** 2
+                for term, count in counts.items()))
+
+    def remove(self, row, entry):
+        tokens = text_tokens(entry_text(entry))
+        self._docs -= 1
+        self._total_length -= len(tokens)
+        self._lengths[row] = 0
+        self._norms[row] = 0
+        for term in set(tokens):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            rows, frequencies = postings
+            position = bisect.bisect_left(rows, row)
+            if position == len(rows) or rows[position] != row:
+                continue
+            del rows[position]
+            del frequencies[position]
+            self._arrays.pop(term, None)
+            if not rows:
+                del self._postings[term]
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            rows, frequencies = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.frombuffer(rows, dtype=np.int64).copy(),
+                np.frombuffer(frequencies, dtype=np.uint16).astype(np.float32),
+            )
+        return arrays
+
+    def _compute_norms(self):
+        """All TF-IDF norms at once from the postings (after a bulk build)"""
+        all_rows, all_squares = [], []
+        for term in self._postings:
+            rows, frequencies = self._term_arrays(term)
+            weights = (1 + np.log(frequencies)) * self._idf(len(rows))
+            all_rows.append(rows)
+            all_squares.append(weights * weights)
+        squares = np.bincount(np.concatenate(all_rows), weights=np.concatenate(all_squares),
+                              minlength=len(self._norms)) if all_rows else np.zeros(len(self._norms))
+        self._norms = np.sqrt(squares).astype(np.float32)
+        self._norms_docs = self._docs
+
+    def search(self, query, limit=20, offset=0):
+        """(total matching rows, [(row, score)] best first) for a free-text query"""
+        terms = [term for term in dict.fromkeys(text_tokens(query.lower())) if term in self._postings]
+        if not terms or not self._docs:
+            return 0, []
+
+        average_length = self._total_length / self._docs
+        all_rows, all_scores = [], []
+        for term in terms:
+            rows, frequencies = self._term_arrays(term)
+            idf = math.log(1 + (self._docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[rows] / average_length)
+            all_rows.append(rows)
+            all_scores.append(idf * frequencies * (BM25_K1 + 1) / (frequencies + norm))
+
+        return self._top(all_rows, all_scores, limit, offset)
+
+    def related(self, row, entry, k=5):
+        """
+        [(row, cosine similarity)] of the ``k`` rows whose TF-IDF vectors are
+        closest to ``entry``'s text, excluding ``row`` itself. Only the
+        ``RELATED_TERMS`` highest-weighted terms of the text are matched, which
+        keeps the candidate postings small and drops terms too common to matter.
+        """
+        if abs(self._docs - self._norms_docs) > max(100, self._norms_docs // 10):
+            # Norms of rows written since the last bulk pass used older IDFs; refresh them
+            self._compute_norms()
+
+        counts = Counter(text_tokens(entry_text(entry)))
+        weights = {
+            term: (1 + math.log(count)) * self._idf(len(self._postings[term][0]))
+            for term, count in counts.items() if term in self._postings
+        }
+        if not weights:
+            return []
+        query_norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        terms = sorted(weights, key=weights.get, reverse=True)[:RELATED_TERMS]
+
+        all_rows, all_scores = [], []
+        for term in terms:
+            rows, frequencies = self._term_arrays(term)
+            idf = self._idf(len(rows))
+            all_rows.append(rows)
+            all_scores.append((1 + np.log(frequencies)) * (idf * weights[term]))
+
+        total_rows = np.concatenate(all_rows)
+        dots = np.bincount(total_rows, weights=np.concatenate(all_scores), minlength=len(self._norms))
+        dots[row] = 0
+        rows = np.flatnonzero(dots)
+        norms = self._norms[rows]
+        similarities = dots[rows] / (np.where(norms > 0, norms, 1) * query_norm)
+        _, hits = self._top([rows], [similarities], k, 0)
+        return hits
+
+    def _top(self, all_rows, all_scores, limit, offset):
+        """(candidate count, [(row, score)] of rank offset..offset+limit) from per-term contributions"""
+        if len(all_rows) == 1:
+            rows, scores = all_rows[0], all_scores[0]
+        else:
+            # Sum per row with one dense pass instead of sorting the concatenated postings
+            totals = np.bincount(np.concatenate(all_rows), weights=np.concatenate(all_scores),
+                                 minlength=len(self._lengths))
+            rows = np.flatnonzero(totals)
+            scores = totals[rows]
+
+        wanted = min(offset + limit, len(rows))
+        if wanted <= 0:
+            return len(rows), []
+        if wanted < len(rows):
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.lexsort((rows[top], -scores[top]))][offset:]
+        return len(rows), [(int(rows[i]), float(scores[i])) for i in top]
+
+
+def query_pattern(query):
+    """Case-insensitive regex matching the query's words and CJK bigrams in content"""
+    parts = []
+    for term in sorted(set(text_tokens(query.lower())), key=len, reverse=True):
+        if '\u4e00' <= term[0] <= '\u9fff':
+            parts.append(re.escape(term))
+        else:
+            parts.append(r'(?<![a-z0-9])' + re.escape(term) + r'(?![a-z0-9])')
+    return re.compile('|'.join(parts), re.IGNORECASE) if parts else None
+
+
+def snippet(content, pattern):
+    """(excerpt around the first match, [[start, end], ...] matched ranges within it)"""
+    content = content or ''
+    first = pattern.search(content) if pattern else None
+    start = max(0, first.start() - SNIPPET_BEFORE) if first else 0
+    end = min(len(content), start + SNIPPET_LENGTH)
+    excerpt = content[start:end]
+
+    highlights = []
+    if pattern:
+        # Search the window overlapping-ly so adjacent CJK bigrams merge into one range
+        position = 0
+        while True:
+            match = pattern.search(excerpt, position)
+            if match is None:
+                break
+            if highlights and match.start() <= highlights[-1][1]:
+                highlights[-1][1] = max(highlights[-1][1], match.end())
+            else:
+                highlights.append([match.start(), match.end()])
+            position = match.start() + 1
+
+    if start > 0:
+        excerpt = '…' + excerpt
+        highlights = [[s + 1, e + 1] for s, e in highlights]
+    if end < len(content):
+        excerpt += '…'
+    return excerpt, highlights
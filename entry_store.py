@@ -0,0 +1,720 @@
+"""
+Entry storage engine for the diary server.
+
+``EntryStore`` keeps the entries of a storage backend (``storage_backends``)
+resident so readers do not re-parse the files on every request, together
+with a sorted date index for range lookups. With a tiered backend only the
+hot months are loaded up front; a full scan pulls in the older ones, while a
+bounded date range that reaches back past them reads just the months it
+covers. Per-entry enrichment is derived the first time a row needs it, so
+with content kept in a blob file (JSON backend) loading reads metadata only.
+"""
+import bisect
+import itertools
+import os
+import threading
+from collections.abc import Sequence
+from datetime import date, datetime
+
+from entry_record import EntryRecord
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Locks the revision writes of compare_and_put are spread over, by entry id
+REVISION_LOCK_STRIPES = 64
+
+# Marks reads that only need the resident (hot) entries
+_HOT = object()
+
+
+def parse_created_at(value):
+    """
+    Parse an entry timestamp into an aware datetime.
+    Naive timestamps (written with datetime.now()) are taken as server local time.
+    """
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return dt
+
+
+def local_epoch_day(dt):
+    """Days since 1970-01-01 of the local calendar date of ``dt``"""
+    return dt.astimezone().date().toordinal() - EPOCH_ORDINAL
+
+
+def epoch_day_from_param(value):
+    """Epoch day for a query parameter given as YYYY-MM-DD or a full ISO timestamp"""
+    if len(value) == 10:
+        return date.fromisoformat(value).toordinal() - EPOCH_ORDINAL
+    return local_epoch_day(parse_created_at(value))
+
+
+def date_index_key(entry, position):
+    """Sort key (epoch day, epoch seconds, position) or None if the entry has no usable date"""
+    try:
+        dt = parse_created_at(entry['createdAt'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (local_epoch_day(dt), dt.timestamp(), position)
+
+
+def entry_version(entry):
+    """Per-entry version counter; entries written before versioning count as 0"""
+    return entry.get('version') or 0
+
+
+class VersionConflict(Exception):
+    """The stored entry is no longer at the version an update was based on"""
+
+    def __init__(self, current):
+        super().__init__(f"Entry {current.get('id')} is at version {entry_version(current)}")
+        self.current = current
+
+
+def _add_to_day(day_stats, day, entry, sign):
+    """Add (sign=1) or remove (sign=-1) ``entry`` from the aggregate of ``day``"""
+    count, moods = day_stats.get(day, (0, {}))
+    count += sign
+    moods = dict(moods)
+    for mood in entry.get('moods') or []:
+        moods[mood] = moods.get(mood, 0) + sign
+        if moods[mood] <= 0:
+            del moods[mood]
+    if count > 0:
+        day_stats[day] = (count, moods)
+    else:
+        day_stats.pop(day, None)
+
+
+class LazyMetas(Sequence):
+    """
+    Enrichment of each row of an entry list, computed the first time the row
+    is read and kept afterwards, so loading the store does not read content.
+    """
+
+    __slots__ = ('_entries', '_enrich', '_cache')
+
+    def __init__(self, entries, enrich, cache=None):
+        self._entries = entries
+        self._enrich = enrich
+        self._cache = cache if cache is not None else [None] * len(entries)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __getitem__(self, index):
+        meta = self._cache[index]
+        if meta is None:
+            meta = self._cache[index] = self._enrich(self._entries[index])
+        return meta
+
+    def __iter__(self):
+        for index in range(len(self._cache)):
+            yield self[index]
+
+    def copy(self, entries):
+        """Copy for ``entries``, a copy of this list about to be changed (shares the metas computed so far)"""
+        return LazyMetas(entries, self._enrich, list(self._cache))
+
+    def append(self, meta):
+        self._cache.append(meta)
+
+    def __setitem__(self, index, meta):
+        self._cache[index] = meta
+
+
+def _write_temp(path, data):
+    """Write ``data`` next to ``path`` and fsync it; returns the temp path"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
+
+
+class EntryStore:
+    """
+    Process-wide resident view of all diary entries.
+
+    The parsed entries are kept in memory and only re-read when the backing
+    storage changes outside of this store (e.g. an mtime/size mismatch).
+    Writes go through the backend and update the resident list copy-on-write,
+    so a list handed out by ``all()`` is never mutated afterwards and readers
+    never block.
+
+    Backends with a cold tier (``hot_from_day``) are loaded from the hot
+    boundary only. Scans (``all``, ``iter_entries``, mention lookups) and
+    bounded day ranges read the months before it from the backend
+    (``read_range``) without keeping them. The indexes over the whole
+    history (query, search, related entries), ``between`` and ``get`` of an
+    id that is not resident extend the resident range.
+    """
+
+    def __init__(self, backend, enrich=None, columnar=None, revisions=None, postings=None, search=None):
+        # Any storage backend exposing read_all/append_many/changed_externally/search_mentions
+        self.backend = backend
+        # Derives per-entry metadata (see entry_enrichment.enrich_entry); the
+        # result for each entry is kept in _metas, parallel to _entries and
+        # computed on first use
+        self.enrich = enrich
+        self._metas = []
+        # Columnar view class (entry_columns.EntryColumns), built on first use
+        # from the metas and then patched on every write
+        self.columnar = columnar
+        self._columns = None
+        # Revision history (entry_revisions.RevisionLog) fed by compare_and_put;
+        # a striped lock per entry id keeps its writes in version order
+        self.revisions = revisions
+        self._revision_locks = [threading.Lock() for _ in range(REVISION_LOCK_STRIPES)]
+        # Posting list class (entry_query.PostingLists), built on the first
+        # query and then updated per changed row under the lock
+        self.postings = postings
+        self._postings = None
+        # Full-text index class (entry_search.SearchIndex), maintained the same way
+        self.search_index = search
+        self._search = None
+        self._search_build_lock = threading.Lock()
+        self.lock = threading.RLock()
+        self.version = 0
+        self._entries = None
+        self._positions = {}
+        # Sorted (epoch day, epoch seconds, position) keys plus the key of
+        # each position, so a rewritten entry can be moved in the index
+        self._date_index = []
+        self._date_keys = {}
+        # First epoch day held resident; None once the whole history is loaded
+        self._loaded_from = None
+        # Per-day aggregates: epoch day -> (entry count, {mood: count}).
+        # Values are replaced, never mutated, so readers see whole days
+        self._day_stats = {}
+
+    def _reload(self, from_day=None):
+        entries = self.backend.read_all() if from_day is None else self.backend.read_all(from_day)
+        # Resident entries are compact records (a no-op for backends that already cache records)
+        entries = [EntryRecord.from_entry(entry) for entry in entries]
+        positions = {}
+        date_keys = {}
+        for index, entry in enumerate(entries):
+            positions.setdefault(entry.get('id'), index)
+            key = date_index_key(entry, index)
+            if key is not None:
+                date_keys[index] = key
+        self._entries = entries
+        self._metas = LazyMetas(entries, self.enrich) if self.enrich else []
+        self._columns = None
+        self._postings = None
+        self._search = None
+        self._positions = positions
+        self._date_index = sorted(date_keys.values())
+        self._date_keys = date_keys
+        self._loaded_from = from_day
+        day_stats = {}
+        for index, key in date_keys.items():
+            _add_to_day(day_stats, key[0], entries[index], 1)
+        self._day_stats = day_stats
+        self.version += 1
+        scope = "" if from_day is None else f" from epoch day {from_day}"
+        print(f"Loaded {len(entries)} entries{scope} into the entry store (version {self.version})")
+
+    def _needs_older(self, first_day):
+        return self._loaded_from is not None and (first_day is None or first_day < self._loaded_from)
+
+    def _ensure_loaded(self, first_day=_HOT):
+        """
+        Load or refresh the resident entries. ``first_day`` is the oldest epoch
+        day the caller needs (None for the whole history); by default only the
+        hot range is required.
+        """
+        older = first_day is not _HOT
+        if self._entries is None or self.backend.changed_externally() or (older and self._needs_older(first_day)):
+            with self.lock:
+                if self._entries is None:
+                    hot_from_day = getattr(self.backend, 'hot_from_day', None)
+                    self._reload(hot_from_day() if hot_from_day else None)
+                elif self.backend.changed_externally():
+                    self._reload(self._loaded_from)
+                if older and self._needs_older(first_day):
+                    self._reload(first_day)
+
+    def current_version(self):
+        """Version of the resident data, after picking up any external change"""
+        self._ensure_loaded()
+        return self.version
+
+    def resident_count(self):
+        """(number of resident entries, True if older months are left out of them); never loads the cold tier"""
+        self._ensure_loaded()
+        with self.lock:
+            return len(self._entries), self._loaded_from is not None
+
+    def all(self):
+        """
+        Return all entries in creation order; treat the list as read-only.
+        Months before the resident range are read for this call and not kept.
+        """
+        older, entries = self._history()
+        older = list(older)
+        return older + entries if older else entries
+
+    def _history(self):
+        """
+        (iterator over the entries of the months before the resident range,
+        resident entries) of one snapshot. The older months are
+        read from the backend one at a time as the iterator is consumed and
+        are not made resident.
+        """
+        older_last, _ = self._older_span(None, None)
+        with self.lock:
+            entries, positions = self._entries, self._positions
+        if older_last is None:
+            return iter(()), entries
+        # Resident copies (e.g. an old entry edited since) win
+        older = (
+            entry for _, entry in self._iter_older(None, older_last)
+            if entry.get('id') not in positions
+        )
+        return older, entries
+
+    def iter_entries(self, first_day=None, last_day=None):
+        """
+        Yield entries one at a time without building a new list: creation
+        order, or date order when a day range is given. Months before the
+        resident range come first and are read from the backend one month at
+        a time, so streaming the archive never makes it resident.
+        """
+        if first_day is None and last_day is None:
+            older, entries = self._history()
+            yield from older
+            yield from entries
+            return
+
+        older_last, resident_first = self._older_span(first_day, last_day)
+        if older_last is not None:
+            for _, entry in self._iter_older(first_day, older_last):
+                yield entry
+        entries, date_index, _, _ = self._date_view()
+        lo = 0 if resident_first is None else bisect.bisect_left(date_index, (resident_first,))
+        hi = len(date_index) if last_day is None else bisect.bisect_left(date_index, (last_day + 1,))
+        for i in range(lo, hi):
+            yield entries[date_index[i][2]]
+
+    def get(self, entry_id):
+        """Return the entry with ``entry_id`` or None"""
+        self._ensure_loaded()
+        if entry_id not in self._positions and self._loaded_from is not None:
+            # Possibly an old entry that is still in the cold tier
+            self._ensure_loaded(None)
+        entries, positions = self._entries, self._positions
+        index = positions.get(entry_id)
+        return entries[index] if index is not None else None
+
+    def meta(self, entry):
+        """Cached enrichment of a resident entry (computed on the spot for any other dict)"""
+        with self.lock:
+            entries, metas, positions = self._entries, self._metas, self._positions
+        if entries is not None and metas:
+            index = positions.get(entry.get('id'))
+            if index is not None and entries[index] is entry:
+                return metas[index]
+        return self.enrich(entry)
+
+    def columns_for(self, entries):
+        """
+        Columnar metadata whose rows line up with ``entries``: the maintained
+        columns for a list handed out by ``all()``, otherwise built on the spot.
+        """
+        with self.lock:
+            if entries is self._entries:
+                if self._columns is None:
+                    self._columns = self.columnar.build(self._entries, self._metas)
+                return self._columns
+        return self.columnar.build(entries, [self.meta(entry) for entry in entries])
+
+    def put(self, entry):
+        """Create or replace an entry; returns the stored record"""
+        return self.put_many([entry])[0]
+
+    def compare_and_put(self, entry, expected_version):
+        """
+        Store ``entry`` as version ``expected_version + 1``, stamped with
+        ``updatedAt``, if the stored entry with its id is still at
+        ``expected_version``; raises VersionConflict (carrying the current
+        entry) otherwise and KeyError if it is gone.
+        Only the check and the write hold the store lock. The revision is
+        recorded after it is released, under a lock for the entry's id alone,
+        so revisions of one entry are logged in order while other readers and
+        writers go ahead.
+        """
+        with self._revision_locks[hash(entry['id']) % len(self._revision_locks)]:
+            with self.lock:
+                current = self.get(entry['id'])
+                if current is None:
+                    raise KeyError(entry['id'])
+                if entry_version(current) != expected_version:
+                    raise VersionConflict(current)
+                updated = dict(entry)
+                updated['version'] = expected_version + 1
+                updated['updatedAt'] = datetime.now().isoformat()
+                stored = self.put_many([updated], previous={current['id']: current})[0]
+            if self.revisions is not None:
+                try:
+                    self.revisions.record(current, stored)
+                except Exception as e:
+                    print(f"Error recording revision {stored['version']} of entry {stored['id']}: {e}")
+            return stored
+
+    def put_many(self, new_entries, previous=None):
+        """
+        Create or replace several entries with a single backend write; returns
+        the stored records. ``previous`` maps ids of entries that are not
+        resident to the entries they replace.
+        """
+        if not new_entries:
+            return []
+
+        new_entries = [EntryRecord.from_entry(entry) for entry in new_entries]
+        with self.lock:
+            self._ensure_loaded()
+            # The backend moves a re-dated entry out of the month it was in
+            previous = dict(previous or {})
+            for entry in new_entries:
+                index = self._positions.get(entry.get('id'))
+                if index is not None:
+                    previous.setdefault(entry.get('id'), self._entries[index])
+            self.backend.append_many(new_entries, previous)
+
+            entries = list(self._entries)
+            metas = self._metas.copy(entries) if self.enrich else []
+            changed_rows = {}
+            positions = dict(self._positions)
+            date_index = list(self._date_index)
+            date_keys = dict(self._date_keys)
+            # Only the derived indexes need the new metas now; otherwise the
+            # rows are enriched lazily, like after a load
+            eager = self.enrich and (self._postings is not None or self._columns is not None)
+            for entry in new_entries:
+                index = positions.get(entry.get('id'))
+                meta = self.enrich(entry) if eager else None
+                if index is None:
+                    index = len(entries)
+                    positions[entry.get('id')] = index
+                    entries.append(entry)
+                    if self.enrich:
+                        metas.append(meta)
+                else:
+                    old_entry = entries[index]
+                    if self._search is not None:
+                        self._search.remove(index, old_entry)
+                    if self.enrich:
+                        if self._postings is not None:
+                            # Read before the row is replaced; metas are derived lazily from entries
+                            self._postings.remove(index, old_entry, metas[index])
+                        metas[index] = meta
+                    entries[index] = entry
+                if self._postings is not None:
+                    self._postings.add(index, entry, meta)
+                if self._search is not None:
+                    self._search.add(index, entry)
+                changed_rows[index] = (entry, meta)
+
+                old_key = date_keys.pop(index, None)
+                if old_key is not None:
+                    del date_index[bisect.bisect_left(date_index, old_key)]
+                    _add_to_day(self._day_stats, old_key[0], old_entry, -1)
+                key = date_index_key(entry, index)
+                if key is not None:
+                    bisect.insort(date_index, key)
+                    date_keys[index] = key
+                    _add_to_day(self._day_stats, key[0], entry, 1)
+
+            if self._columns is not None:
+                self._columns = self._columns.with_rows(changed_rows, len(entries))
+            self._entries = entries
+            self._metas = metas
+            self._positions = positions
+            self._date_index = date_index
+            self._date_keys = date_keys
+            self.version += 1
+        return new_entries
+
+    def query(self, node, order='desc', offset=0, limit=50):
+        """
+        Entries matching a parsed entry_query filter tree, in date order
+        (undated entries last). Returns (total matches, requested page).
+        """
+        self._ensure_loaded(None)
+        with self.lock:
+            if self._postings is None:
+                self._postings = self.postings.build(self._entries, self._metas)
+            entries, date_keys = self._entries, self._date_keys
+            rows = self._postings.select(node, entries, self._date_index, len(entries))
+
+        dated = sorted((date_keys[row] for row in rows.tolist() if row in date_keys), reverse=(order == 'desc'))
+        ordered = [key[2] for key in dated]
+        if len(ordered) < len(rows):
+            ordered.extend(row for row in rows.tolist() if row not in date_keys)
+        return len(rows), [entries[row] for row in ordered[offset:offset + limit]]
+
+    def warm_search(self):
+        """
+        Build the full-text index if it does not exist yet. The bulk of the work
+        runs without the lock; writes that land meanwhile are patched in after.
+        """
+        self._ensure_loaded(None)
+        # One build at a time; a concurrent caller waits for it instead of duplicating it
+        with self._search_build_lock:
+            with self.lock:
+                if self._search is not None:
+                    return
+                entries = self._entries
+            index = self.search_index.build(entries)
+            with self.lock:
+                if self._search is None:
+                    if self._entries is not entries:
+                        index.catch_up(entries, self._entries)
+                    self._search = index
+                    print(f"Built full-text index over {len(self._entries)} entries")
+
+    def search(self, text, limit=20, offset=0):
+        """BM25-ranked full-text matches: (total matches, [(entry, score)] best first)"""
+        self.warm_search()
+        with self.lock:
+            if self._search is None:
+                # Reloaded between warming and now
+                self._search = self.search_index.build(self._entries)
+            entries = self._entries
+            total, hits = self._search.search(text, limit, offset)
+        return total, [(entries[row], score) for row, score in hits]
+
+    def related(self, entry_id, k=5):
+        """[(entry, cosine similarity)] of the ``k`` entries most similar to ``entry_id`` (None if it does not exist)"""
+        if self.get(entry_id) is None:
+            return None
+        self.warm_search()
+        with self.lock:
+            if self._search is None:
+                self._search = self.search_index.build(self._entries)
+            entries = self._entries
+            row = self._positions.get(entry_id)
+            if row is None:
+                return None
+            hits = self._search.related(row, entries[row], k)
+        return [(entries[row], score) for row, score in hits]
+
+    def _older_span(self, first_day, last_day):
+        """
+        Split [first_day, last_day] at the start of the resident range. Returns
+        (last day to read from the backend, or None if the resident entries
+        cover the range, first day to take from the resident entries).
+        Backends without ``read_range`` extend the resident range instead.
+        """
+        self._ensure_loaded()
+        loaded_from = self._loaded_from
+        if loaded_from is None or (first_day is not None and first_day >= loaded_from):
+            return None, first_day
+        if getattr(self.backend, 'read_range', None) is None:
+            self._ensure_loaded(first_day)
+            return None, first_day
+        return (loaded_from - 1 if last_day is None else min(last_day, loaded_from - 1)), loaded_from
+
+    def _iter_older(self, first_day, last_day):
+        """
+        Yield (date key, entry) of the days in [first_day, last_day] in date
+        order, reading one backend month partition at a time. The entries are
+        not made resident.
+        """
+        month_ranges = getattr(self.backend, 'month_ranges', None)
+        spans = month_ranges(first_day, last_day) if month_ranges else [(first_day, last_day)]
+        for month_first, month_last in spans:
+            if first_day is not None:
+                month_first = max(month_first, first_day)
+            if last_day is not None:
+                month_last = min(month_last, last_day)
+            keyed = []
+            for position, entry in enumerate(self.backend.read_range(month_first, month_last)):
+                key = date_index_key(entry, position)
+                if key is not None:
+                    keyed.append((key, entry))
+            keyed.sort(key=lambda item: item[0])
+            yield from keyed
+
+    def _read_older(self, first_day, last_day):
+        """
+        Split [first_day, last_day] at the start of the resident range. Returns
+        ([(date key, entry)] of the days before it in date order, first day to
+        take from the resident entries); see ``_older_span``.
+        """
+        older_last, resident_first = self._older_span(first_day, last_day)
+        if older_last is None:
+            return [], resident_first
+        return list(self._iter_older(first_day, older_last)), resident_first
+
+    def _date_view(self):
+        """(entries, date index, positions, date keys) of one snapshot; _reload and put_many replace them one by one"""
+        with self.lock:
+            return self._entries, self._date_index, self._positions, self._date_keys
+
+    def on_days(self, first_day=None, last_day=None):
+        """Entries whose local date lies in [first_day, last_day] (epoch days), oldest first"""
+        older, first_day = self._read_older(first_day, last_day)
+        entries, date_index, _, _ = self._date_view()
+        lo = 0 if first_day is None else bisect.bisect_left(date_index, (first_day,))
+        hi = len(date_index) if last_day is None else bisect.bisect_left(date_index, (last_day + 1,))
+        return [entry for _, entry in older] + [entries[key[2]] for key in date_index[lo:hi]]
+
+    def day_stats(self, first_day, last_day):
+        """(entry count, {mood: count}) for each epoch day in [first_day, last_day] that has entries"""
+        older, first_day = self._read_older(first_day, last_day)
+        stats = {}
+        for key, entry in older:
+            _add_to_day(stats, key[0], entry, 1)
+        day_stats = self._day_stats
+        for day in range(first_day, last_day + 1):
+            value = day_stats.get(day)
+            if value is not None:
+                stats[day] = value
+        return stats
+
+    def between(self, start=None, end=None):
+        """Entries created in [start, end] (aware datetimes), oldest first"""
+        self._ensure_loaded(None if start is None else local_epoch_day(start))
+        entries, date_index, _, _ = self._date_view()
+        lo, hi = 0, len(date_index)
+        if start is not None:
+            lo = bisect.bisect_left(date_index, (local_epoch_day(start), start.timestamp()))
+        if end is not None:
+            hi = bisect.bisect_right(date_index, (local_epoch_day(end), end.timestamp(), float('inf')))
+        return [entries[key[2]] for key in date_index[lo:hi]]
+
+    def page(self, limit, order='desc', after=None, first_day=None, last_day=None):
+        """
+        One page of entries in date order, optionally limited to [first_day, last_day].
+        ``after`` is the (epoch day, epoch seconds, entry id) of the last entry of
+        the previous page. Returns (entries, cursor of the last entry or None, has_more).
+        Months before the resident range are read from the backend one at a
+        time, and only as many as it takes to fill the page.
+        """
+        self._ensure_loaded()
+        with self.lock:
+            view, loaded_from = self._date_view(), self._loaded_from
+        month_ranges = getattr(self.backend, 'month_ranges', None)
+        if loaded_from is not None and month_ranges is None:
+            # No way to read single months; extend the resident range instead
+            self._ensure_loaded(first_day)
+            with self.lock:
+                view, loaded_from = self._date_view(), self._loaded_from
+
+        # One more than requested tells whether another page follows
+        wanted = limit + 1
+        resident_first, older_last = first_day, None
+        if loaded_from is not None:
+            resident_first = loaded_from if first_day is None else max(first_day, loaded_from)
+            older_last = loaded_from - 1 if last_day is None else min(last_day, loaded_from - 1)
+            if first_day is not None and older_last < first_day:
+                older_last = None
+
+        if order == 'asc':
+            keyed = self._older_page(month_ranges, first_day, older_last, order, after, wanted) if older_last is not None else []
+            if len(keyed) < wanted:
+                keyed += self._page(view, wanted - len(keyed), order, after, resident_first, last_day)
+        else:
+            keyed = self._page(view, wanted, order, after, resident_first, last_day)
+            if len(keyed) < wanted and older_last is not None:
+                keyed += self._older_page(month_ranges, first_day, older_last, order, after, wanted - len(keyed))
+
+        keyed = keyed[:wanted]
+        has_more = len(keyed) > limit
+        keyed = keyed[:limit]
+        cursor = None
+        if keyed:
+            key, entry = keyed[-1]
+            cursor = (key[0], key[1], entry.get('id'))
+        return [entry for _, entry in keyed], cursor, has_more
+
+    def _page(self, view, count, order, after, first_day, last_day):
+        """Up to ``count`` [(date key, entry)] of the resident entries in page order"""
+        entries, date_index, positions, date_keys = view
+        lo = 0 if first_day is None else bisect.bisect_left(date_index, (first_day,))
+        hi = len(date_index) if last_day is None else bisect.bisect_left(date_index, (last_day + 1,))
+
+        if after is not None:
+            day, timestamp, entry_id = after
+            position = positions.get(entry_id)
+            key = date_keys.get(position) if position is not None else None
+            if key is None or key[:2] != (day, timestamp):
+                # The cursor entry is gone (or not resident); resume right at its timestamp
+                key = (day, timestamp, -1 if order == 'asc' else float('inf'))
+            if order == 'asc':
+                lo = max(lo, bisect.bisect_right(date_index, key))
+            else:
+                hi = min(hi, bisect.bisect_left(date_index, key))
+
+        if order == 'asc':
+            keys = date_index[lo:min(hi, lo + count)]
+        else:
+            keys = date_index[max(lo, hi - count):hi][::-1]
+        return [(key, entries[key[2]]) for key in keys]
+
+    def _older_page(self, month_ranges, first_day, last_day, order, after, count):
+        """
+        Up to ``count`` [(date key, entry)] dated in [first_day, last_day], before
+        the resident range, in page order. Reads one backend month at a time;
+        within these months ties are broken by entry id, so cursors are exact.
+        """
+        if after is not None:
+            after = (after[0], after[1], after[2] if isinstance(after[2], int) else -1)
+            # Only the months on the far side of the cursor
+            if order == 'asc':
+                first_day = after[0] if first_day is None else max(first_day, after[0])
+            else:
+                last_day = min(last_day, after[0])
+            if first_day is not None and first_day > last_day:
+                return []
+        months = month_ranges(first_day, last_day)
+        if order == 'desc':
+            months.reverse()
+        keyed = []
+        for month_first, month_last in months:
+            month = []
+            for entry in self.backend.read_range(max(month_first, first_day if first_day is not None else month_first),
+                                                 min(month_last, last_day)):
+                entry_id = entry.get('id')
+                key = date_index_key(entry, entry_id if isinstance(entry_id, int) else -1)
+                if key is None:
+                    continue
+                if after is not None and (key <= after if order == 'asc' else key >= after):
+                    continue
+                month.append((key, entry))
+            month.sort(key=lambda item: item[0], reverse=(order == 'desc'))
+            keyed.extend(month)
+            if len(keyed) >= count:
+                break
+        return keyed[:count]
+
+    def _iter_mentioning(self, term):
+        """
+        Yield entries whose content contains ``term`` (lowercased), in creation
+        order. Months before the resident range are scanned one at a time and
+        not kept, so a lookup does not pull the cold tier into memory.
+        """
+        older, entries = self._history()
+        for entry in itertools.chain(older, entries):
+            if term in (entry.get('content') or '').lower():
+                yield entry
+
+    def entries_mentioning(self, term):
+        """Entries whose content contains ``term`` (case-insensitive), in creation order"""
+        ids = self.backend.search_mentions(term)
+        if ids is not None:
+            matches = (self.get(entry_id) for entry_id in dict.fromkeys(ids))
+            return [entry for entry in matches if entry is not None]
+        return list(self._iter_mentioning(term.lower()))
+
+    def has_mention(self, term):
+        """True if any entry mentions ``term``; stops at the first match"""
+        ids = self.backend.search_mentions(term)
+        if ids is not None:
+            return len(ids) > 0
+        return next(self._iter_mentioning(term.lower()), None) is not None
@@ -0,0 +1,114 @@
+"""
+Snowflake-style entry id allocator.
+
+An id packs a millisecond timestamp, a node id and a per-millisecond
+sequence number::
+
+    | 41 bits: ms since 2020-01-01 | 4 bits: node | 8 bits: sequence |
+
+That is 53 bits in total, so ids stay exact as JavaScript numbers in the
+client, and they are larger than the plain ``time.time() * 1000`` ids used
+before, so new entries still sort after old ones. Each node can hand out
+256 ids per millisecond.
+
+The allocator persists a lease (a timestamp ahead of the last issued id) so
+that after a restart, or if the clock steps backwards, it never reissues an
+id. Several workers can share one data directory as long as each runs with
+its own ``NODE_ID``.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+ID_EPOCH_MS = 1577836800000  # 2020-01-01T00:00:00Z
+NODE_BITS = 4
+SEQUENCE_BITS = 8
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# How far ahead of the last issued timestamp the persisted lease reaches;
+# the state file is only rewritten once per lease period
+LEASE_MS = 10000
+
+
+def id_timestamp_ms(entry_id):
+    """Unix time in milliseconds encoded in an allocator id"""
+    return (entry_id >> (NODE_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS
+
+
+class EntryIdAllocator:
+    """Thread-safe, persisted, monotonic id generator for one node"""
+
+    def __init__(self, state_dir, node_id=0):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"node id must be between 0 and {MAX_NODE_ID}, got {node_id}")
+        self.node_id = node_id
+        self.state_path = Path(state_dir) / f"id_allocator.node{node_id}.json"
+        self.lock = threading.Lock()
+        self.last_ms = -1
+        self.sequence = 0
+        self.lease_ms = None
+
+    def _load_lease(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['lease_ms'])
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            # Fall back to a lease far enough ahead to clear anything the
+            # lost state could have covered
+            print(f"Invalid id allocator state in {self.state_path.name} ({e}); skipping ahead")
+            return self._now_ms() + LEASE_MS
+
+    def _save_lease(self, lease_ms):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'node_id': self.node_id, 'lease_ms': lease_ms}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+        self.lease_ms = lease_ms
+
+    @staticmethod
+    def _now_ms():
+        return int(time.time() * 1000) - ID_EPOCH_MS
+
+    def _advance(self):
+        """Move to the next (timestamp, sequence) slot; caller holds the lock"""
+        if self.lease_ms is None:
+            lease = self._load_lease()
+            if lease is not None:
+                # Everything below the previous lease may have been issued
+                self.last_ms = max(self.last_ms, lease)
+            self.lease_ms = lease if lease is not None else -1
+
+        now = self._now_ms()
+        if now > self.last_ms:
+            self.last_ms = now
+            self.sequence = 0
+        elif self.sequence < MAX_SEQUENCE:
+            # Same millisecond, or the clock went backwards: keep counting
+            self.sequence += 1
+        else:
+            # Sequence exhausted for this millisecond; borrow the next one
+            self.last_ms += 1
+            self.sequence = 0
+
+        if self.last_ms >= self.lease_ms:
+            self._save_lease(self.last_ms + LEASE_MS)
+
+        return (self.last_ms << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self.sequence
+
+    def next_id(self):
+        """Allocate one id"""
+        with self.lock:
+            return self._advance()
+
+    def next_ids(self, count):
+        """Allocate ``count`` increasing ids in one go"""
+        with self.lock:
+            return [self._advance() for _ in range(count)]
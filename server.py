@@ -1,6 +1,6 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Query
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Query, Request, Response, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any, Union, Annotated
 import uvicorn
@@ -9,7 +9,11 @@ import os
 import json
 import time
 import html
-from datetime import datetime, timedelta
+import base64
+import binascii
+import hashlib
+import calendar
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from openai import OpenAI
 # Temporarily disabled speech-to-text functionality
@@ -26,6 +30,19 @@ import schedule
 import uuid
 from difflib import SequenceMatcher
 import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from entry_store import EntryStore, EPOCH_ORDINAL, parse_created_at, epoch_day_from_param, entry_version, VersionConflict
+from storage_backends import create_storage_backend
+from id_allocator import EntryIdAllocator
+from entry_enrichment import enrich_entry, entry_text, detect_language, has_potential_new_topics, simhash, hamming_distance
+from entry_columns import EntryColumns, MOOD_FLAGS
+from entry_revisions import RevisionLog
+from entry_query import PostingLists, parse_filter
+from entry_search import SearchIndex, query_pattern, snippet
+from topic_fingerprints import FingerprintLog
+import numpy as np
 
 # Load environment variables
 load_dotenv()
@@ -33,8 +50,23 @@ load_dotenv()
 # Config flags
 USE_AI_FOR_TOPICS = os.getenv("USE_AI_FOR_TOPICS", "true").lower() == "true"
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Validate and create the data files once at startup instead of on every request
+    initialize_data_files()
+    # A fresh I/O pool per lifespan, so the app can be started again after a shutdown
+    app.state.io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="storage-io")
+    if SEARCH_WARMUP:
+        # Build the full-text index in the background so the first search is fast
+        threading.Thread(target=entry_store.warm_search, daemon=True).start()
+    yield
+    # Let storage calls already handed to the I/O pool finish, then commit any
+    # coalesced document writes still waiting for their group write
+    app.state.io_executor.shutdown(wait=True)
+    storage.flush()
+
 # Configure FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS origins
 def get_cors_settings():
@@ -102,6 +134,13 @@ class EntryUpdate(BaseModel):
     existingContent: Optional[str] = None
     newContent: Optional[str] = None
     moods: Optional[List[str]] = None
+    version: Optional[int] = None  # Alternative to the If-Match header
+
+class EntryQueryRequest(BaseModel):
+    filter: Dict[str, Any] = {}
+    order: str = "desc"
+    offset: int = 0
+    limit: int = 50
 
 class TopicExtractRequest(BaseModel):
     content: str
@@ -144,73 +183,119 @@ class TopicPriorityUpdate(BaseModel):
 
 # Data path - create data directory if it doesn't exist
 data_dir = Path('./data')
-data_path = data_dir / 'entries.json'
-topics_path = data_dir / 'topics.json'
-graph_path = data_dir / 'topic_graph.json'
-topic_config_path = data_dir / 'topic_config.json'
-topic_suggestions_path = data_dir / 'topic_suggestions.json'
 
-# Enhanced ensure_data_file function with debugging
+# Storage backend: "json" keeps entries in monthly partitions under data/entries/
+# and one JSON file per topic document, "sqlite" keeps everything in data/diary.db.
+# With json, months older than ENTRY_COLD_AFTER_DAYS are stored compressed and
+# only loaded on demand (0 keeps every month uncompressed)
+cold_after_days = int(os.getenv("ENTRY_COLD_AFTER_DAYS", "180"))
+storage = create_storage_backend(
+    os.getenv("STORAGE_BACKEND", "json"), data_dir, os.getenv("SQLITE_PATH"),
+    cold_after_days=cold_after_days if cold_after_days > 0 else None
+)
+
+# Process-wide resident view of the entries, shared by every reader
+entry_store = EntryStore(storage, enrich=enrich_entry, columnar=EntryColumns, revisions=RevisionLog(data_dir / 'revisions'),
+                         postings=PostingLists, search=SearchIndex)
+
+# SEARCH_WARMUP=1 builds the full-text index for /api/search at startup (loads
+# the whole history, cold months included); by default the first search builds it
+SEARCH_WARMUP = os.getenv("SEARCH_WARMUP", "0") != "0"
+
+# Collision-free entry ids; give each worker sharing data/ its own NODE_ID (0-15)
+entry_ids = EntryIdAllocator(data_dir, node_id=int(os.getenv("NODE_ID", "0")))
+
+# Weak ETags for the polled read endpoints, derived from the data version
+# counters kept by the write paths. The boot id keeps tags from a previous
+# process from matching after a restart.
+server_boot_id = uuid.uuid4().hex[:8]
+
+def data_etag(*versions):
+    """Weak ETag for a response built from data at the given versions"""
+    return 'W/"' + server_boot_id + '-' + '.'.join(str(v) for v in versions) + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of If-None-Match against our current ETag"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in header.split(','):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith('W/') else tag) == opaque:
+            return True
+    return False
+
+def check_etag(request: Request, response: Response, *versions):
+    """
+    Raise a 304 when the client already has the data at these versions,
+    otherwise attach the ETag to the outgoing response
+    """
+    etag = data_etag(*versions)
+    if etag_matches(request, etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+# Set once the data files have been validated/created
+data_files_ready = False
+data_files_lock = threading.Lock()
+
 def ensure_data_file():
+    """Cheap per-request guard; the data files are set up once by initialize_data_files"""
+    if not data_files_ready:
+        initialize_data_files()
+
+# Enhanced data file initialization with debugging (runs once, at startup)
+def initialize_data_files():
+    with data_files_lock:
+        if data_files_ready:
+            return
+        _initialize_data_files()
+
+def _initialize_data_files():
+    global data_files_ready
     try:
-        # Check if data directory exists, create if not
-        if not data_dir.exists():
-            print(f"Creating data directory at {data_dir.absolute()}")
-            data_dir.mkdir(parents=True, exist_ok=True)
+        # Create the data directory / database and a valid entries store
+        storage.initialize()
         
-        # Check if entries file exists, create if not
-        entries_exist = False
+        # Only the hot months are loaded here; the cold tier stays on disk
+        entry_count, has_older = entry_store.resident_count()
+        entries_exist = entry_count > 0 or has_older
         graph_exists = False
+        print(f"Entries store at {storage.describe()}")
+        print(f"Entries found: {entry_count}" + (" (plus older months in the cold tier)" if has_older else ""))
         
-        if not data_path.exists():
-            print(f"Creating new entries file at {data_path.absolute()}")
-            with open(data_path, 'w') as f:
-                json.dump([], f)
-        else:
-            # Verify the entries file has content
-            try:
-                with open(data_path, 'r') as f:
-                    entries = json.load(f)
-                    entries_exist = len(entries) > 0
-                print(f"Entries file exists at {data_path.absolute()}")
-                print(f"Entries found: {len(entries)}")
-            except (json.JSONDecodeError, KeyError):
-                print(f"Entries file exists but is invalid. Resetting it.")
-                with open(data_path, 'w') as f:
-                    json.dump([], f)
-        
-        # Check if topics file exists, create if not
-        if not topics_path.exists():
-            print(f"Creating new topics file at {topics_path.absolute()}")
-            with open(topics_path, 'w') as f:
-                json.dump({"topics": [], "people": [], "relations": []}, f)
+        # Check if topics document exists, create if not
+        if not storage.document_exists('topics'):
+            print(f"Creating new topics file at {storage.describe('topics')}")
+            save_topics_data({"topics": [], "people": [], "relations": []})
         
-        # Check if graph file exists and has content
-        if not graph_path.exists():
-            print(f"Creating new topic graph file at {graph_path.absolute()}")
+        # Check if graph document exists and has content
+        if not storage.document_exists('topic_graph'):
+            print(f"Creating new topic graph file at {storage.describe('topic_graph')}")
             graph = nx.Graph()
             # Save as JSON
             graph_data = nx.node_link_data(graph)
-            with open(graph_path, 'w') as f:
-                json.dump(graph_data, f)
+            save_topic_graph(graph_data)
         else:
-            # Verify the graph file has content
+            # Verify the graph document has content
             try:
-                with open(graph_path, 'r') as f:
-                    graph_data = json.load(f)
-                    graph_exists = len(graph_data.get('nodes', [])) > 0
-                print(f"Graph file exists at {graph_path.absolute()}")
+                graph_data = load_topic_graph()
+                graph_exists = len(graph_data.get('nodes', [])) > 0
+                print(f"Graph file exists at {storage.describe('topic_graph')}")
                 print(f"Graph nodes found: {len(graph_data.get('nodes', []))}")
             except (json.JSONDecodeError, KeyError):
                 print(f"Graph file exists but is invalid. Resetting it.")
                 graph = nx.Graph()
                 graph_data = nx.node_link_data(graph)
-                with open(graph_path, 'w') as f:
-                    json.dump(graph_data, f)
+                save_topic_graph(graph_data)
 
-        # Check if topic config file exists, create if not
-        if not topic_config_path.exists():
-            print(f"Creating new topic config file at {topic_config_path.absolute()}")
+        # Check if topic config document exists, create if not
+        if not storage.document_exists('topic_config'):
+            print(f"Creating new topic config file at {storage.describe('topic_config')}")
             default_config = {
                 "visible_topics": [],
                 "hidden_topics": [],
@@ -228,26 +313,25 @@ def ensure_data_file():
                     "group_by_category": False
                 }
             }
-            with open(topic_config_path, 'w') as f:
-                json.dump(default_config, f, ensure_ascii=False, indent=2)
+            storage.save_document('topic_config', default_config)
 
-        # Check if topic suggestions file exists, create if not
-        if not topic_suggestions_path.exists():
-            print(f"Creating new topic suggestions file at {topic_suggestions_path.absolute()}")
+        # Check if topic suggestions document exists, create if not
+        if not storage.document_exists('topic_suggestions'):
+            print(f"Creating new topic suggestions file at {storage.describe('topic_suggestions')}")
             default_suggestions = {
                 "pending_review": [],
                 "auto_approved": [],
                 "rejected": [],
                 "last_detection_run": None
             }
-            with open(topic_suggestions_path, 'w') as f:
-                json.dump(default_suggestions, f, ensure_ascii=False, indent=2)
+            storage.save_document('topic_suggestions', default_suggestions)
         
+        data_files_ready = True
+
         # If entries exist but no graph data, extract topics from existing entries
         if entries_exist and not graph_exists and USE_AI_FOR_TOPICS:
             print("Entries exist but no topic graph data found. Extracting topics from existing entries...")
             # Process in background to avoid blocking startup
-            import threading
             threading.Thread(target=process_existing_entries).start()
                 
     except Exception as e:
@@ -264,8 +348,7 @@ def process_existing_entries():
             return
 
         # Load all entries
-        with open(data_path, 'r') as f:
-            entries = json.load(f)
+        entries = entry_store.all()
 
         if not entries:
             print("No entries to process")
@@ -280,8 +363,7 @@ def process_existing_entries():
         topics_result = extract_topics(combined_content)
 
         # Save extracted topics
-        with open(topics_path, 'w') as f:
-            json.dump(topics_result, f, ensure_ascii=False, indent=2)
+        save_topics_data(topics_result)
 
         print(f"Topic extraction complete. Found {len(topics_result.get('topics', []))} topics and {len(topics_result.get('people', []))} people.")
 
@@ -292,9 +374,7 @@ def process_existing_entries():
 def load_topic_config():
     """Load user topic configuration"""
     try:
-        ensure_data_file()
-        with open(topic_config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return storage.load_document('topic_config')
     except Exception as e:
         print(f"Error loading topic config: {e}")
         # Return default config
@@ -319,9 +399,7 @@ def load_topic_config():
 def save_topic_config(config):
     """Save user topic configuration"""
     try:
-        ensure_data_file()
-        with open(topic_config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        storage.save_document('topic_config', config)
         return True
     except Exception as e:
         print(f"Error saving topic config: {e}")
@@ -330,9 +408,7 @@ def save_topic_config(config):
 def load_topic_suggestions():
     """Load topic suggestions"""
     try:
-        ensure_data_file()
-        with open(topic_suggestions_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return storage.load_document('topic_suggestions')
     except Exception as e:
         print(f"Error loading topic suggestions: {e}")
         return {
@@ -345,71 +421,134 @@ def load_topic_suggestions():
 def save_topic_suggestions(suggestions):
     """Save topic suggestions"""
     try:
-        ensure_data_file()
-        with open(topic_suggestions_path, 'w', encoding='utf-8') as f:
-            json.dump(suggestions, f, ensure_ascii=False, indent=2)
+        storage.save_document('topic_suggestions', suggestions)
         return True
     except Exception as e:
         print(f"Error saving topic suggestions: {e}")
         return False
 
+def load_topic_graph():
+    """Load the topic graph (node-link format)"""
+    return storage.load_document('topic_graph')
+
+def save_topic_graph(graph_data):
+    """Save the topic graph"""
+    storage.save_document('topic_graph', graph_data)
+
+def load_topics_data():
+    """Load the directly extracted topics, people and relations"""
+    return storage.load_document('topics')
+
+def save_topics_data(topics_data):
+    """Save the directly extracted topics, people and relations"""
+    storage.save_document('topics', topics_data)
+
+# Request handlers never touch storage on the event loop: loads, saves, entry
+# appends (fsync) and read-modify-writes that may wait for a document lock held
+# by a background topic thread run in this bounded pool (created by lifespan),
+# so cheap endpoints keep answering while a large graph is being merged or written.
+IO_THREADS = int(os.getenv("IO_THREADS", "4"))
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking storage call in the I/O pool and await its result"""
+    loop = asyncio.get_running_loop()
+    # Outside of a lifespan (e.g. an app mounted without one) use the loop's default pool
+    executor = getattr(app.state, 'io_executor', None)
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+async def load_topic_config_async():
+    return await run_io(load_topic_config)
+
+async def save_topic_config_async(config):
+    return await run_io(save_topic_config, config)
+
+async def load_topic_suggestions_async():
+    return await run_io(load_topic_suggestions)
+
+async def save_topic_suggestions_async(suggestions):
+    return await run_io(save_topic_suggestions, suggestions)
+
+async def load_topic_graph_async():
+    return await run_io(load_topic_graph)
+
+async def save_topic_graph_async(graph_data):
+    return await run_io(save_topic_graph, graph_data)
+
+async def load_topics_data_async():
+    return await run_io(load_topics_data)
+
+async def save_topics_data_async(topics_data):
+    return await run_io(save_topics_data, topics_data)
+
+async def load_entries_async():
+    return await run_io(load_entries)
+
+async def edit_document(name, apply):
+    """
+    Awaitable read-modify-write of a storage document: ``apply(document)``
+    mutates it in the I/O pool while the document's edit lock is held, and
+    its return value is passed back. Exceptions (e.g. HTTPException) propagate.
+    """
+    def edit():
+        with storage.editing(name) as document:
+            return apply(document)
+    return await run_io(edit)
+
 def get_all_available_topics():
     """Get all topics from both graph and topics files"""
     all_topics = []
 
     # Load from graph file
     try:
-        with open(graph_path, 'r', encoding='utf-8') as f:
-            graph_data = json.load(f)
-            for node in graph_data.get('nodes', []):
-                if node.get('type') in ['topic', 'person']:
-                    all_topics.append({
-                        'id': node.get('id'),
-                        'name': node.get('name'),
-                        'type': node.get('type'),
-                        'category': node.get('category', 'activities'),
-                        'importance': node.get('importance', 3),
-                        'sentiment': node.get('sentiment', 0),
-                        'context': node.get('context', ''),
-                        'keywords': node.get('keywords', [])
-                    })
+        graph_data = load_topic_graph()
+        for node in graph_data.get('nodes', []):
+            if node.get('type') in ['topic', 'person']:
+                all_topics.append({
+                    'id': node.get('id'),
+                    'name': node.get('name'),
+                    'type': node.get('type'),
+                    'category': node.get('category', 'activities'),
+                    'importance': node.get('importance', 3),
+                    'sentiment': node.get('sentiment', 0),
+                    'context': node.get('context', ''),
+                    'keywords': node.get('keywords', [])
+                })
     except Exception as e:
         print(f"Error loading topics from graph: {e}")
 
     # Load from topics file
     try:
-        with open(topics_path, 'r', encoding='utf-8') as f:
-            topics_data = json.load(f)
-
-            # Add topics
-            for topic in topics_data.get('topics', []):
-                # Check if already exists
-                if not any(t['id'] == topic.get('id') for t in all_topics):
-                    all_topics.append({
-                        'id': topic.get('id'),
-                        'name': topic.get('name'),
-                        'type': 'topic',
-                        'category': topic.get('category', 'activities'),
-                        'importance': topic.get('importance', 3),
-                        'sentiment': topic.get('sentiment', 0),
-                        'context': topic.get('context', ''),
-                        'keywords': topic.get('keywords', [])
-                    })
+        topics_data = load_topics_data()
+
+        # Add topics
+        for topic in topics_data.get('topics', []):
+            # Check if already exists
+            if not any(t['id'] == topic.get('id') for t in all_topics):
+                all_topics.append({
+                    'id': topic.get('id'),
+                    'name': topic.get('name'),
+                    'type': 'topic',
+                    'category': topic.get('category', 'activities'),
+                    'importance': topic.get('importance', 3),
+                    'sentiment': topic.get('sentiment', 0),
+                    'context': topic.get('context', ''),
+                    'keywords': topic.get('keywords', [])
+                })
 
-            # Add people
-            for person in topics_data.get('people', []):
-                # Check if already exists
-                if not any(t['id'] == person.get('id') for t in all_topics):
-                    all_topics.append({
-                        'id': person.get('id'),
-                        'name': person.get('name'),
-                        'type': 'person',
-                        'category': 'people',
-                        'importance': person.get('importance', 3),
-                        'sentiment': 0,
-                        'context': person.get('context', ''),
-                        'keywords': person.get('keywords', [])
-                    })
+        # Add people
+        for person in topics_data.get('people', []):
+            # Check if already exists
+            if not any(t['id'] == person.get('id') for t in all_topics):
+                all_topics.append({
+                    'id': person.get('id'),
+                    'name': person.get('name'),
+                    'type': 'person',
+                    'category': 'people',
+                    'importance': person.get('importance', 3),
+                    'sentiment': 0,
+                    'context': person.get('context', ''),
+                    'keywords': person.get('keywords', [])
+                })
     except Exception as e:
         print(f"Error loading topics from topics file: {e}")
 
@@ -418,28 +557,21 @@ def get_all_available_topics():
 def has_related_content(topic_id, topic_name):
     """Check if a topic has related content in diary entries"""
     try:
-        # Load all entries
-        with open(data_path, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
-
-        if not entries:
-            return False
-
         # Check if topic name appears in any entry content
-        topic_name_lower = topic_name.lower()
-        for entry in entries:
-            content = entry.get('content', '').lower()
-            if topic_name_lower in content:
-                return True
-
-        return False
+        return entry_store.has_mention(topic_name)
     except Exception as e:
         print(f"Error checking related content for topic {topic_id}: {e}")
         return True  # Default to showing the topic if we can't check
 
+# SimHash distance (bits out of 64) up to which re-saved content counts as a
+# near-duplicate of the version last sent for extraction and is skipped, and
+# up to which it is only a small edit and waits for the next batch run
+NEAR_DUPLICATE_BITS = 4
+SMALL_EDIT_BITS = 12
+
 # Intelligent Topic Detection Pipeline
 class TopicDetectionPipeline:
-    def __init__(self):
+    def __init__(self, fingerprints):
         self.detection_queue = []
         self.last_run = None
         self.is_running = False
@@ -447,19 +579,63 @@ class TopicDetectionPipeline:
         self.min_queue_size = 3
         self.detection_lock = threading.Lock()
         self.immediate_detection_enabled = True  # Enable immediate detection for new entries
+        # entry id -> simhash of the content last sent to extract_topics (a FingerprintLog)
+        self.extracted_fingerprints = fingerprints
+        self.skipped_near_duplicates = 0
+
+    def _near_duplicate_distance(self, entry_id, fingerprint):
+        """Distance to the last extracted version of the entry (None if it was never extracted)"""
+        extracted = self.extracted_fingerprints.get(entry_id)
+        return None if extracted is None else hamming_distance(extracted, fingerprint)
+
+    def _queued_distance(self, item):
+        """_near_duplicate_distance for a queue item, fingerprinting it only if the entry was extracted before"""
+        if self.extracted_fingerprints.get(item['entry_id']) is None:
+            return None
+        if item.get('fingerprint') is None:
+            item['fingerprint'] = simhash(item['content'])
+        return self._near_duplicate_distance(item['entry_id'], item['fingerprint'])
+
+    def _mark_extracted(self, items):
+        self.extracted_fingerprints.update({
+            item['entry_id']: item['fingerprint'] if item.get('fingerprint') is not None else simhash(item['content'])
+            for item in items
+        })
 
     def add_to_queue(self, entry_id, content, priority='normal'):
-        """Add entry to detection queue"""
+        """
+        Add entry to detection queue. Content that is a near-duplicate of what
+        was last extracted for the entry is dropped, small edits are downgraded
+        to the next batch run, and a still-pending item for the same entry is
+        replaced instead of queueing the entry twice.
+        """
+        fingerprint = simhash(content)
         with self.detection_lock:
+            distance = self._near_duplicate_distance(entry_id, fingerprint)
+            if distance is not None and distance <= NEAR_DUPLICATE_BITS:
+                self.skipped_near_duplicates += 1
+                print(f"Skipping topic detection for entry {entry_id}: near-duplicate of the extracted version ({distance} bits)")
+                return False
+            if distance is not None and distance <= SMALL_EDIT_BITS and priority in ('high', 'immediate'):
+                print(f"Entry {entry_id} changed only slightly ({distance} bits); deferring it to batch detection")
+                priority = 'normal'
+
             queue_item = {
                 'entry_id': entry_id,
                 'content': content,
+                'fingerprint': fingerprint,
                 'priority': priority,
                 'added_at': datetime.now().isoformat(),
                 'processed': False
             }
-            self.detection_queue.append(queue_item)
-            print(f"Added entry {entry_id} to topic detection queue (queue size: {len(self.detection_queue)})")
+            pending = next((item for item in self.detection_queue
+                            if item['entry_id'] == entry_id and not item.get('processed', False)), None)
+            if pending is not None:
+                pending.update(queue_item)
+                print(f"Replaced pending entry {entry_id} in topic detection queue (queue size: {len(self.detection_queue)})")
+            else:
+                self.detection_queue.append(queue_item)
+                print(f"Added entry {entry_id} to topic detection queue (queue size: {len(self.detection_queue)})")
 
             # Trigger immediate detection for high priority entries or new entries
             if priority == 'high' or priority == 'immediate':
@@ -467,6 +643,33 @@ class TopicDetectionPipeline:
                 return True  # Signal that immediate detection should be triggered
         return False
 
+    def add_many_to_queue(self, items, priority='bulk'):
+        """
+        Add several (entry_id, content) pairs to the detection queue at once,
+        dropping near-duplicates of what was last extracted for an entry.
+        Entries never extracted before (e.g. fresh imports) are fingerprinted
+        only once their batch has been extracted; call this off the event loop.
+        """
+        added_at = datetime.now().isoformat()
+        queue_items = []
+        for entry_id, content in items:
+            item = {
+                'entry_id': entry_id,
+                'content': content,
+                'fingerprint': None,
+                'priority': priority,
+                'added_at': added_at,
+                'processed': False
+            }
+            distance = self._queued_distance(item)
+            if distance is not None and distance <= NEAR_DUPLICATE_BITS:
+                continue
+            queue_items.append(item)
+        with self.detection_lock:
+            self.skipped_near_duplicates += len(items) - len(queue_items)
+            self.detection_queue.extend(queue_items)
+            print(f"Added {len(queue_items)} entries to topic detection queue at {priority} priority (queue size: {len(self.detection_queue)})")
+
     async def run_immediate_detection(self, entry_id, content):
         """Run immediate topic detection for a single entry"""
         if not self.immediate_detection_enabled:
@@ -478,6 +681,7 @@ class TopicDetectionPipeline:
 
             # Extract topics for this single entry
             topics_result = extract_topics(content)
+            self._mark_extracted([{'entry_id': entry_id, 'content': content}])
 
             # Generate topic suggestions for immediate review
             await self._generate_topic_suggestions(topics_result, [{
@@ -487,10 +691,10 @@ class TopicDetectionPipeline:
                 'added_at': datetime.now().isoformat()
             }])
 
-            # Mark this entry as processed in the queue
+            # Mark this entry as processed in the queue (unless it was edited again meanwhile)
             with self.detection_lock:
                 for item in self.detection_queue:
-                    if item['entry_id'] == entry_id:
+                    if item['entry_id'] == entry_id and item['content'] == content:
                         item['processed'] = True
                         break
 
@@ -545,28 +749,8 @@ class TopicDetectionPipeline:
 
     def has_potential_new_topics(self, content: str) -> bool:
         """Check if content might contain new topics that warrant immediate detection"""
-        if not content:
-            return False
-
-        # Simple heuristics to detect potentially new content
-        # Look for proper nouns, project names, or specific terminology
-        import re
-
-        # Check for capitalized words that might be names or projects
-        capitalized_words = re.findall(r'\b[A-Z][a-z]+\b', content)
-        chinese_names = re.findall(r'[\u4e00-\u9fff]{2,4}', content)  # Chinese names/terms
-
-        # Check for project-like terms
-        project_indicators = ['项目', '系统', '平台', '应用', 'project', 'system', 'platform', 'app']
-        has_project_terms = any(indicator in content.lower() for indicator in project_indicators)
-
-        # Check for person indicators
-        person_indicators = ['老师', '同事', '朋友', '客户', 'teacher', 'colleague', 'friend', 'client']
-        has_person_terms = any(indicator in content.lower() for indicator in person_indicators)
-
-        # If we have multiple capitalized words, Chinese names, or specific indicators, likely new topics
-        return (len(capitalized_words) >= 2 or len(chinese_names) >= 2 or
-                has_project_terms or has_person_terms)
+        # Stored entries already carry this as their enrichment's topic_hint
+        return has_potential_new_topics(content)
 
     async def run_batch_detection(self):
         """Run batch topic detection on queued entries"""
@@ -597,9 +781,8 @@ class TopicDetectionPipeline:
             self.last_run = datetime.now().isoformat()
 
             # Save detection run info to suggestions file
-            suggestions = load_topic_suggestions()
-            suggestions['last_detection_run'] = self.last_run
-            save_topic_suggestions(suggestions)
+            with storage.editing('topic_suggestions') as suggestions:
+                suggestions['last_detection_run'] = self.last_run
 
             print(f"✅ Batch topic detection completed")
 
@@ -611,6 +794,20 @@ class TopicDetectionPipeline:
     async def _process_batch(self, batch):
         """Process a batch of entries for topic detection"""
         try:
+            # Drop items that became near-duplicates of an extraction that ran after they were queued
+            with self.detection_lock:
+                fresh = []
+                for item in batch:
+                    distance = self._queued_distance(item)
+                    if distance is not None and distance <= NEAR_DUPLICATE_BITS:
+                        item['processed'] = True
+                        self.skipped_near_duplicates += 1
+                    else:
+                        fresh.append(item)
+            batch = fresh
+            if not batch:
+                return
+
             # Combine batch content
             combined_content = "\n\n".join([
                 f"Entry {item['entry_id']}: {item['content']}"
@@ -619,6 +816,7 @@ class TopicDetectionPipeline:
 
             # Extract topics using existing function
             topics_result = extract_topics(combined_content)
+            self._mark_extracted(batch)
 
             # Generate topic suggestions instead of immediately updating graph
             await self._generate_topic_suggestions(topics_result, batch)
@@ -635,7 +833,13 @@ class TopicDetectionPipeline:
 
     async def _generate_topic_suggestions(self, topics_result, batch):
         """Generate topic suggestions for user review"""
-        suggestions = load_topic_suggestions()
+        # Edit the latest suggestions under their write lock so a concurrent
+        # approve/reject is not overwritten
+        with storage.editing('topic_suggestions') as suggestions:
+            self._add_topic_suggestions(suggestions, topics_result, batch)
+
+    def _add_topic_suggestions(self, suggestions, topics_result, batch):
+        """Append suggestions for new topics and people that reach the mention threshold"""
         config = load_topic_config()
         min_mentions = config.get('auto_detection_settings', {}).get('min_mentions', 3)
 
@@ -707,22 +911,10 @@ class TopicDetectionPipeline:
                 suggestions.setdefault('pending_review', []).append(suggestion)
                 print(f"👤 Generated suggestion for person: {person_name} (mentions: {mention_count})")
 
-        save_topic_suggestions(suggestions)
-
     def _count_topic_mentions(self, topic_name):
         """Count how many times a topic is mentioned across all entries"""
         try:
-            with open(data_path, 'r', encoding='utf-8') as f:
-                entries = json.load(f)
-
-            count = 0
-            topic_lower = topic_name.lower()
-            for entry in entries:
-                content = entry.get('content', '').lower()
-                if topic_lower in content:
-                    count += 1
-
-            return count
+            return len(entry_store.entries_mentioning(topic_name))
         except Exception as e:
             print(f"Error counting topic mentions: {e}")
             return 0
@@ -744,29 +936,9 @@ class TopicDetectionPipeline:
         return min(confidence, 1.0)
 
 # Global pipeline instance
-topic_pipeline = TopicDetectionPipeline()
+topic_pipeline = TopicDetectionPipeline(FingerprintLog(data_dir / 'topic_fingerprints.jsonl'))
 
 # Language detection and validation utilities
-def detect_language(text: str) -> str:
-    """Simple language detection based on character analysis"""
-    if not text or not text.strip():
-        return "unknown"
-
-    # Count Chinese characters (CJK Unified Ideographs)
-    chinese_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
-    total_chars = len([char for char in text if char.isalpha()])
-
-    if total_chars == 0:
-        return "unknown"
-
-    chinese_ratio = chinese_chars / total_chars
-
-    # If more than 30% Chinese characters, consider it Chinese
-    if chinese_ratio > 0.3:
-        return "chinese"
-    else:
-        return "english"
-
 def validate_language_consistency(input_text: str, output_text: str) -> bool:
     """Validate that output maintains the same language as input"""
     input_lang = detect_language(input_text)
@@ -1399,8 +1571,7 @@ def cleanup_existing_topics():
     """
     try:
         # Load existing topic graph
-        with open(graph_path, "r", encoding="utf-8") as f:
-            graph_data = json.load(f)
+        graph_data = load_topic_graph()
 
         nodes = graph_data.get("nodes", [])
         edges = graph_data.get("edges", [])
@@ -1461,8 +1632,7 @@ def cleanup_existing_topics():
         graph_data["edges"] = final_edges
 
         # Save cleaned up graph
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(graph_data, f, ensure_ascii=False, indent=2)
+        save_topic_graph(graph_data)
 
         print(f"Topic cleanup complete. Removed {len(topics) - len(merged_topics)} duplicate topics and {len(people) - len(merged_people)} duplicate people")
         print(f"Updated {len(final_edges)} edges")
@@ -1526,10 +1696,13 @@ def update_topic_graph(topics_result):
     # Ensure the topic graph file exists
     ensure_data_file()
 
-    # Load existing topic graph
-    with open(graph_path, "r", encoding="utf-8") as f:
-        graph_data = json.load(f)
+    # Merge into the latest graph while holding its write lock, so concurrent
+    # extractions do not overwrite each other's nodes
+    with storage.editing('topic_graph') as graph_data:
+        merge_into_topic_graph(graph_data, topics_result)
 
+def merge_into_topic_graph(graph_data, topics_result):
+    """Merge extracted topics, people and relations into graph_data in place"""
     existing_nodes = {node["id"]: node for node in graph_data.get("nodes", [])}
     existing_edges = []
 
@@ -1644,10 +1817,6 @@ def update_topic_graph(topics_result):
     graph_data["nodes"] = list(existing_nodes.values())
     graph_data["edges"] = graph_data.get("edges", []) + new_edges
 
-    # Save the updated graph
-    with open(graph_path, "w", encoding="utf-8") as f:
-        json.dump(graph_data, f, ensure_ascii=False, indent=2)
-
 # Enhanced integrate_diary_content function with smart formatting
 def integrate_diary_content(existing_content, new_content):
     try:
@@ -1776,34 +1945,22 @@ async def create_entry(entry: EntryCreate):
         
         # Create entry object
         new_entry = {
-            "id": int(time.time() * 1000),  # Timestamp as ID
+            "id": entry_ids.next_id(),  # Timestamp + node + sequence
             "content": optimized_content,
             "type": entry.type,
             "createdAt": created_at,
-            "moods": entry.moods or []
+            "moods": entry.moods or [],
+            "version": 1
         }
         
         print(f"New entry object created: {new_entry}")
         
-        # Read existing entries
-        try:
-            with open(data_path, 'r') as f:
-                entries = json.load(f)
-            print(f"Loaded {len(entries)} existing entries")
-        except Exception as e:
-            print(f"Error loading entries: {e}")
-            entries = []
-        
-        # Add new entry
-        entries.append(new_entry)
-        
-        # Write back to file
+        # Append to the entry's month partition instead of rewriting the whole file
         try:
-            with open(data_path, 'w') as f:
-                json.dump(entries, f, indent=2)
-            print(f"Wrote {len(entries)} entries to file")
+            stored_entry = await run_io(entry_store.put, new_entry)
+            print(f"Appended entry {new_entry['id']} to {storage.describe()}")
         except Exception as e:
-            print(f"Error writing entries to file: {e}")
+            print(f"Error writing entry to storage: {e}")
             raise
             
         # Check if we should extract topics
@@ -1811,11 +1968,10 @@ async def create_entry(entry: EntryCreate):
         if should_extract:
             # Check if graph file already has content
             try:
-                with open(graph_path, 'r') as f:
-                    graph_data = json.load(f)
-                    # If we already have nodes, we can still extract for new entries
-                    if len(graph_data.get('nodes', [])) > 0:
-                        should_extract = USE_AI_FOR_TOPICS
+                graph_data = await load_topic_graph_async()
+                # If we already have nodes, we can still extract for new entries
+                if len(graph_data.get('nodes', [])) > 0:
+                    should_extract = USE_AI_FOR_TOPICS
             except Exception:
                 # If there's an error reading the graph file, we should extract
                 should_extract = USE_AI_FOR_TOPICS
@@ -1825,11 +1981,11 @@ async def create_entry(entry: EntryCreate):
             print("Adding entry to topic detection pipeline...")
 
             # Check if content has potential new topics to determine priority
-            has_new_topics = topic_pipeline.has_potential_new_topics(optimized_content)
+            has_new_topics = (await run_io(entry_store.meta, stored_entry))['topic_hint']
             priority = 'immediate' if has_new_topics else 'normal'
 
             print(f"Content analysis: potential new topics = {has_new_topics}, priority = {priority}")
-            should_run_immediate = topic_pipeline.add_to_queue(new_entry['id'], optimized_content, priority=priority)
+            should_run_immediate = await run_io(topic_pipeline.add_to_queue, new_entry['id'], optimized_content, priority=priority)
 
             # Run immediate detection for entries with potential new topics
             if should_run_immediate and has_new_topics:
@@ -1849,104 +2005,488 @@ async def create_entry(entry: EntryCreate):
         print(f"Error creating entry: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Get all entries
-@app.get("/api/entries")
-async def get_entries():
+IMPORT_BATCH_SIZE = 1000
+
+def parse_import_line(line):
+    """Build a new entry from one NDJSON import line; raises ValueError if it is unusable"""
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("line is not a JSON object")
+    content = item.get('content')
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("missing content")
+    
+    created_at = item.get('createdAt') or item.get('targetDate') or datetime.now().isoformat()
+    if not isinstance(created_at, str):
+        raise ValueError("createdAt must be an ISO timestamp string")
+    parse_created_at(created_at)
+    moods = item.get('moods') or []
+    if not isinstance(moods, list) or not all(isinstance(mood, str) for mood in moods):
+        raise ValueError("moods must be a list of strings")
+    entry_type = item.get('type') or "text"
+    if not isinstance(entry_type, str):
+        raise ValueError("type must be a string")
+    
+    return {
+        "content": content,
+        "type": entry_type,
+        "createdAt": created_at,
+        "moods": moods,
+        "version": 1
+    }
+
+@app.post("/api/entries/import")
+async def import_entries(request: Request, queue_topics: bool = Query(True, alias="extract_topics")):
+    """
+    Bulk-create entries from an NDJSON body (one {"content", "createdAt"|"targetDate",
+    "type", "moods"} object per line). The body is parsed as it streams in, every
+    entry gets a fresh id, entries are appended in batches and topic extraction is
+    queued in bulk at low priority instead of per entry.
+    """
+    ensure_data_file()
+    
+    imported = 0
+    errors = []
+    first_id = last_id = None
+    batch = []
+    
+    async def flush():
+        nonlocal imported, first_id, last_id
+        if not batch:
+            return
+        for entry, entry_id in zip(batch, entry_ids.next_ids(len(batch))):
+            entry["id"] = entry_id
+        # Appends and fsyncs off the event loop
+        await run_io(entry_store.put_many, list(batch))
+        if queue_topics and USE_AI_FOR_TOPICS:
+            # SimHash of the whole batch runs in the I/O pool, not on the event loop
+            await run_io(topic_pipeline.add_many_to_queue,
+                         [(entry["id"], entry["content"]) for entry in batch], priority='bulk')
+        first_id = batch[0]["id"] if first_id is None else first_id
+        last_id = batch[-1]["id"]
+        imported += len(batch)
+        batch.clear()
+    
+    def take(line, line_number):
+        if not line.strip():
+            return
+        try:
+            batch.append(parse_import_line(line))
+        except (ValueError, TypeError) as e:
+            errors.append({"line": line_number, "error": str(e)})
+    
+    try:
+        buffer = b''
+        line_number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                line_number += 1
+                take(line, line_number)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await flush()
+        if buffer:
+            line_number += 1
+            take(buffer, line_number)
+        await flush()
+    except Exception as e:
+        print(f"Error importing entries after {imported} entries: {e}")
+        raise HTTPException(status_code=500, detail=f"Import failed after {imported} entries: {e}")
+    
+    print(f"Imported {imported} entries ({len(errors)} lines skipped)")
+    return {
+        "status": "success",
+        "imported": imported,
+        "skipped": len(errors),
+        "errors": errors[:100],
+        "first_id": first_id,
+        "last_id": last_id
+    }
+
+def find_topic_name(kind, topic_id):
+    """Name of a topic or person by id, from the topic graph or the extracted topics (None if unknown)"""
+    node_type = 'person' if kind == 'person' else 'topic'
+    try:
+        if storage.document_exists('topic_graph'):
+            for node in load_topic_graph().get('nodes', []):
+                if node.get('id') == topic_id and node.get('type', node_type) == node_type:
+                    return node.get('name')
+        if storage.document_exists('topics'):
+            collection = 'people' if kind == 'person' else 'topics'
+            for topic in load_topics_data().get(collection, []):
+                if topic.get('id') == topic_id:
+                    return topic.get('name')
+    except Exception as e:
+        print(f"Error looking up {kind} {topic_id}: {e}")
+    return None
+
+@app.post("/api/entries/query")
+async def query_entries(query: EntryQueryRequest):
+    """
+    Entries matching a structured filter, e.g.
+    {"filter": {"topic": "...", "person": "...", "mood": "anxious", "month": "2026-03"}}.
+    See entry_query for the filter language (and/or/not, mood, lang, type, month,
+    mention, topic, person, from/to). Results are in date order and paginated.
+    """
     ensure_data_file()
+    if query.order not in ('asc', 'desc'):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    if query.offset < 0 or not 1 <= query.limit <= 500:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 500")
+    try:
+        # Topic ids are resolved against the stored documents, so parse off the event loop
+        node = await run_io(parse_filter, query.filter, find_topic_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    with open(data_path, 'r') as f:
-        entries = json.load(f)
+    try:
+        total, entries = await run_io(entry_store.query, node, query.order, query.offset, query.limit)
+    except Exception as e:
+        print(f"Error querying entries: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
     
-    print(f"Returning {len(entries)} entries")
+    return {
+        "total": total,
+        "offset": query.offset,
+        "limit": query.limit,
+        "entries": entries
+    }
+
+@app.get("/api/search")
+async def search_entries(q: str, limit: int = 20, offset: int = 0):
+    """
+    BM25-ranked full-text search (English words, Chinese character bigrams) with
+    a snippet per hit; ``highlights`` are [start, end] ranges within the snippet.
+    """
+    ensure_data_file()
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    if offset < 0 or not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 100")
+    
+    try:
+        started = time.perf_counter()
+        total, hits = await run_io(entry_store.search, q, limit, offset)
+        took_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        print(f"Error searching entries: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    pattern = query_pattern(q)
+    results = []
+    for entry, score in hits:
+        excerpt, highlights = snippet(entry.get('content'), pattern)
+        results.append({
+            "entry": entry,
+            "score": round(score, 4),
+            "snippet": excerpt,
+            "highlights": highlights
+        })
+    
+    return {
+        "query": q,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "took_ms": round(took_ms, 2),
+        "results": results
+    }
+
+def encode_entries_cursor(cursor):
+    """Opaque, URL-safe token for an EntryStore.page cursor"""
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+
+def decode_entries_cursor(token):
+    day, timestamp, entry_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    return int(day), float(timestamp), entry_id
+
+def project_entry(entry, fields):
+    """Keep only the requested fields of an entry"""
+    return {field: entry[field] for field in fields if field in entry}
+
+# Get all entries, or the entries in an inclusive date range (?from=YYYY-MM-DD&to=YYYY-MM-DD).
+# With limit/cursor the entries are paged in date order and wrapped as
+# {"entries", "next_cursor", "has_more"}; fields=id,createdAt,... trims each entry.
+@app.get("/api/entries")
+async def get_entries(
+    request: Request,
+    response: Response,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = None
+):
+    try:
+        first_day = epoch_day_from_param(from_date) if from_date else None
+        last_day = epoch_day_from_param(to_date) if to_date else None
+    except ValueError:
+        print(f"Invalid date range: from={from_date} to={to_date}")
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    field_list = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+
+    ensure_data_file()
+    check_etag(request, response, await run_io(entry_store.current_version))
+
+    if limit is not None or cursor:
+        try:
+            after = decode_entries_cursor(cursor) if cursor else None
+        except (ValueError, TypeError, binascii.Error):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        entries, last_cursor, has_more = await run_io(
+            entry_store.page, limit or 50, order=order, after=after, first_day=first_day, last_day=last_day
+        )
+        if field_list:
+            entries = [project_entry(entry, field_list) for entry in entries]
+        print(f"Returning page of {len(entries)} entries (has_more={has_more})")
+        return {
+            "entries": entries,
+            "next_cursor": encode_entries_cursor(last_cursor) if has_more else None,
+            "has_more": has_more
+        }
+
+    if from_date or to_date:
+        entries = await run_io(entry_store.on_days, first_day, last_day)
+        print(f"Returning {len(entries)} entries between {from_date} and {to_date}")
+    else:
+        entries = await load_entries_async()
+        print(f"Returning {len(entries)} entries")
+
+    if field_list:
+        entries = [project_entry(entry, field_list) for entry in entries]
     return entries
 
+# Stream entries as newline-delimited JSON (for backups and full exports).
+# Registered before /api/entries/{date} so "stream" is not parsed as a date.
+@app.get("/api/entries/stream")
+async def stream_entries(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    fields: Optional[str] = None
+):
+    try:
+        first_day = epoch_day_from_param(from_date) if from_date else None
+        last_day = epoch_day_from_param(to_date) if to_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    field_list = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    ensure_data_file()
+
+    def generate_lines(batch_size=200):
+        # Serialize a small batch at a time so memory stays flat no matter
+        # how large the archive is
+        batch = []
+        for entry in entry_store.iter_entries(first_day, last_day):
+            if field_list:
+                entry = project_entry(entry, field_list)
+            batch.append(json.dumps(dict(entry), ensure_ascii=False))
+            if len(batch) >= batch_size:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
 # Get entries by date
 @app.get("/api/entries/{date}")
 async def get_entries_by_date(date: str):
     ensure_data_file()
     
     try:
-        # Handle timezone properly by removing the Z
-        target_date = datetime.fromisoformat(date.replace('Z', '+00:00'))
+        # Both the target and the entries are compared by their local calendar date
+        target_day = epoch_day_from_param(date)
+        target_date = datetime(1970, 1, 1) + timedelta(days=target_day)
         print(f"Looking for entries on date: {target_date.strftime('%Y-%m-%d')}")
     except ValueError:
         print(f"Invalid date format: {date}")
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    with open(data_path, 'r') as f:
-        entries = json.load(f)
-    
-    filtered_entries = []
-    for entry in entries:
-        try:
-            # Fix date parsing from entry.createdAt
-            entry_date = datetime.fromisoformat(entry['createdAt'].replace('Z', '+00:00'))
-            match = (
-                entry_date.day == target_date.day and
-                entry_date.month == target_date.month and
-                entry_date.year == target_date.year
-            )
-            if match:
-                filtered_entries.append(entry)
-        except Exception as e:
-            print(f"Error parsing date for entry {entry.get('id')}: {e}")
+    filtered_entries = await run_io(entry_store.on_days, target_day, target_day)
     
     print(f"Found {len(filtered_entries)} entries for date {target_date.strftime('%Y-%m-%d')}")
     return filtered_entries
 
+def mood_bits(moods):
+    """Bitmask of the MOOD_FLAGS present in a {mood: count} aggregate"""
+    bits = 0
+    for i, mood in enumerate(MOOD_FLAGS):
+        if moods.get(mood):
+            bits |= 1 << i
+    return bits
+
+@app.get("/api/calendar/{year}/{month}")
+async def get_calendar_month(year: int, month: int, request: Request, response: Response):
+    """
+    Per-day entry counts and mood flags for one month, from the aggregates the
+    entry store keeps up to date on every write. ``days`` has a bit per day of
+    the month (bit 0 = day 1) set when it has entries; ``moods[i]`` is a bitmask
+    over ``mood_flags`` for day i + 1.
+    """
+    ensure_data_file()
+    
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        raise HTTPException(status_code=400, detail="Invalid year or month")
+    
+    check_etag(request, response, await run_io(entry_store.current_version))
+    
+    first = date(year, month, 1)
+    days_in_month = calendar.monthrange(year, month)[1]
+    first_day = first.toordinal() - EPOCH_ORDINAL
+    stats = await run_io(entry_store.day_stats, first_day, first_day + days_in_month - 1)
+    
+    counts = [0] * days_in_month
+    moods = [0] * days_in_month
+    days = 0
+    for day, (count, day_moods) in stats.items():
+        i = day - first_day
+        counts[i] = count
+        moods[i] = mood_bits(day_moods)
+        days |= 1 << i
+    
+    return {
+        "year": year,
+        "month": month,
+        "days": days,
+        "counts": counts,
+        "moods": moods,
+        "mood_flags": MOOD_FLAGS
+    }
+
+@app.get("/api/calendar/{year}")
+async def get_calendar_year(year: int, request: Request, response: Response):
+    """Per-day entry counts for a whole year (index 0 = January 1st), for a heatmap"""
+    ensure_data_file()
+    
+    if not 1 <= year <= 9999:
+        raise HTTPException(status_code=400, detail="Invalid year")
+    
+    check_etag(request, response, await run_io(entry_store.current_version))
+    
+    first_day = date(year, 1, 1).toordinal() - EPOCH_ORDINAL
+    last_day = date(year, 12, 31).toordinal() - EPOCH_ORDINAL
+    stats = await run_io(entry_store.day_stats, first_day, last_day)
+    
+    counts = [0] * (last_day - first_day + 1)
+    for day, (count, _) in stats.items():
+        counts[day - first_day] = count
+    
+    return {
+        "year": year,
+        "counts": counts,
+        "total": sum(counts),
+        "max": max(counts)
+    }
+
+# Attempts at writing an update whose base version was overtaken by a concurrent write
+UPDATE_CAS_ATTEMPTS = 3
+
+def parse_if_match(request: Request):
+    """Entry version from an If-Match header ("3" or W/"3"); None when absent or '*'"""
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    tag = header.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid If-Match header: {header}")
+
+def version_conflict(current, status_code=412, detail="Entry was modified by another request"):
+    """412 response (or ``status_code``) carrying the entry as it is stored now"""
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail, "current": dict(current)},
+        headers={"ETag": f'"{entry_version(current)}"'}
+    )
+
 # Update entry
 @app.put("/api/entries/{id}")
-async def update_entry(id: int, entry_update: EntryUpdate):
+async def update_entry(id: int, entry_update: EntryUpdate, request: Request, response: Response):
+    """
+    Update an entry with compare-and-swap on its version counter.
+
+    A client that sends ``If-Match`` (or ``version`` in the body) gets a 412 with
+    the current entry when someone else wrote first. Without a precondition the
+    update is based on the version read here; if a concurrent write lands while
+    the (slow) content merge runs, the merge is redone on top of the newer entry
+    instead of overwriting it; if it is still overtaken after
+    ``UPDATE_CAS_ATTEMPTS`` tries the answer is a 409, since the client set no
+    precondition that could have failed.
+    """
     ensure_data_file()
     
-    # Read existing entries
-    with open(data_path, 'r') as f:
-        entries = json.load(f)
-    
     # Find entry by ID
-    entry_index = None
-    for i, entry in enumerate(entries):
-        if entry['id'] == id:
-            entry_index = i
-            break
+    existing_entry = await run_io(entry_store.get, id)
     
-    if entry_index is None:
+    if existing_entry is None:
         raise HTTPException(status_code=404, detail="Entry not found")
     
-    # Process content update
-    if entry_update.appendMode and entry_update.existingContent and entry_update.newContent:
-        # Intelligent content merging
-        final_content = integrate_diary_content(
-            entry_update.existingContent, 
-            entry_update.newContent
-        )
-    elif entry_update.content:
-        # Direct content update (from manual editing)
-        final_content = entry_update.content
-    else:
-        raise HTTPException(status_code=400, detail="Invalid update parameters")
+    expected_version = parse_if_match(request)
+    if expected_version is None:
+        expected_version = entry_update.version
+    if expected_version is not None and expected_version != entry_version(existing_entry):
+        return version_conflict(existing_entry)
     
-    # Update the entry
-    entries[entry_index]['content'] = final_content
+    append_mode = entry_update.appendMode and entry_update.existingContent and entry_update.newContent
+    if not append_mode and not entry_update.content:
+        raise HTTPException(status_code=400, detail="Invalid update parameters")
     
-    # Update moods if provided
-    if entry_update.moods is not None:
-        entries[entry_index]['moods'] = entry_update.moods
+    base_content = entry_update.existingContent if append_mode else None
+    for attempt in range(UPDATE_CAS_ATTEMPTS):
+        # Process content update
+        if append_mode:
+            # Intelligent content merging, off the event loop so other requests keep flowing
+            final_content = await asyncio.to_thread(integrate_diary_content, base_content, entry_update.newContent)
+        else:
+            # Direct content update (from manual editing)
+            final_content = entry_update.content
+        
+        # Update a copy so readers holding the resident entry never see a partial edit
+        updated_entry = dict(existing_entry)
+        updated_entry['content'] = final_content
+        
+        # Update moods if provided
+        if entry_update.moods is not None:
+            updated_entry['moods'] = entry_update.moods
+        
+        try:
+            # Appends to the entry partition and the revision log off the event loop
+            stored_entry = await run_io(entry_store.compare_and_put, updated_entry, entry_version(existing_entry))
+            break
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        except VersionConflict as conflict:
+            if expected_version is not None:
+                return version_conflict(conflict.current)
+            print(f"Entry {id} changed during update (attempt {attempt + 1}); retrying on version {entry_version(conflict.current)}")
+            existing_entry = conflict.current
+            # Merge the new text into what is stored now rather than the client's stale copy
+            base_content = existing_entry.get('content') or ''
+    else:
+        return version_conflict(
+            existing_entry, status_code=409,
+            detail=f"Entry kept changing during the update ({UPDATE_CAS_ATTEMPTS} attempts); please retry"
+        )
     
-    # Write back to file
-    with open(data_path, 'w') as f:
-        json.dump(entries, f, indent=2)
+    response.headers["ETag"] = f'"{entry_version(stored_entry)}"'
     
     # Check if we should extract topics
     should_extract = USE_AI_FOR_TOPICS
     if should_extract:
         # Check if graph file has content
         try:
-            with open(graph_path, 'r') as f:
-                graph_data = json.load(f)
-                # If we already have nodes, we can still extract for updated entries
-                if len(graph_data.get('nodes', [])) > 0:
-                    should_extract = USE_AI_FOR_TOPICS
+            graph_data = await load_topic_graph_async()
+            # If we already have nodes, we can still extract for updated entries
+            if len(graph_data.get('nodes', [])) > 0:
+                should_extract = USE_AI_FOR_TOPICS
         except Exception:
             # If there's an error reading the graph file, we should extract
             should_extract = USE_AI_FOR_TOPICS
@@ -1954,7 +2494,7 @@ async def update_entry(id: int, entry_update: EntryUpdate):
     # Add updated entry to topic detection pipeline with immediate detection
     if should_extract:
         print("Adding updated entry to topic detection pipeline...")
-        should_run_immediate = topic_pipeline.add_to_queue(id, final_content, priority='high')
+        should_run_immediate = await run_io(topic_pipeline.add_to_queue, id, final_content, priority='high')
 
         # Run immediate detection for updated entries since they're high priority
         if should_run_immediate:
@@ -1969,7 +2509,71 @@ async def update_entry(id: int, entry_update: EntryUpdate):
     else:
         print("Skipping topic extraction (AI usage disabled)")
     
-    return entries[entry_index]
+    return stored_entry
+
+@app.get("/api/entries/{id}/related")
+async def get_related_entries(id: int, k: int = 5):
+    """The ``k`` entries most similar to this one by TF-IDF cosine similarity, computed locally"""
+    ensure_data_file()
+    if not 1 <= k <= 50:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 50")
+    
+    try:
+        started = time.perf_counter()
+        related = await run_io(entry_store.related, id, k)
+        took_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        print(f"Error finding entries related to {id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if related is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    return {
+        "id": id,
+        "took_ms": round(took_ms, 2),
+        "related": [{"entry": entry, "similarity": round(score, 4)} for entry, score in related]
+    }
+
+@app.get("/api/entries/{id}/revisions")
+async def list_entry_revisions(id: int):
+    """Versions of an entry in its revision history, oldest first"""
+    ensure_data_file()
+    entry = await run_io(entry_store.get, id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    revisions = await run_io(entry_store.revisions.list, id)
+    if not revisions or revisions[-1]['version'] != entry_version(entry):
+        # Never edited (or edited before history was kept): only the current text is known
+        revisions.append({
+            "version": entry_version(entry),
+            "at": entry.get('updatedAt') or entry.get('createdAt'),
+            "kind": "current",
+            "stored_chars": 0
+        })
+    return {"id": id, "version": entry_version(entry), "revisions": revisions}
+
+@app.get("/api/entries/{id}/revisions/{version}")
+async def get_entry_revision(id: int, version: int):
+    """Full content of one version of an entry, rebuilt from the nearest snapshot"""
+    ensure_data_file()
+    entry = await run_io(entry_store.get, id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    if version == entry_version(entry):
+        return {
+            "id": id,
+            "version": version,
+            "at": entry.get('updatedAt') or entry.get('createdAt'),
+            "moods": entry.get('moods') or [],
+            "content": entry.get('content')
+        }
+    
+    revision = await run_io(entry_store.revisions.get, id, version)
+    if revision is None:
+        raise HTTPException(status_code=404, detail=f"Revision {version} not found")
+    return {"id": id, **revision}
 
 # Add a new endpoint to identify topic threads across entries
 @app.get("/api/topic-threads")
@@ -1977,8 +2581,7 @@ async def get_topic_threads():
     ensure_data_file()
     
     # Read all entries
-    with open(data_path, 'r') as f:
-        entries = json.load(f)
+    entries = await run_io(entry_store.all)
     
     try:
         # Extract topic threads using LLM
@@ -2030,7 +2633,7 @@ async def get_topic_threads():
                             })
             
             # Update the graph
-            update_topic_graph(graph_data)
+            await run_io(update_topic_graph, graph_data)
         
         return topic_threads
     except Exception as e:
@@ -2144,7 +2747,7 @@ async def cleanup_topics_endpoint():
     Clean up duplicate topics in the topic graph
     """
     try:
-        result = cleanup_existing_topics()
+        result = await run_io(cleanup_existing_topics)
         return {"success": True, "result": result}
     except Exception as e:
         print(f"Error in topic cleanup endpoint: {e}")
@@ -2165,7 +2768,7 @@ async def extract_topics_endpoint():
         ensure_data_file()
         
         # Load diary entries
-        entries = load_entries()
+        entries = await load_entries_async()
         if not entries:
             return {"status": "error", "message": "No diary entries found"}
         
@@ -2173,7 +2776,7 @@ async def extract_topics_endpoint():
         topics_result = await extract_topics_from_entries(entries)
         
         # Update the topic graph
-        update_topic_graph(topics_result)
+        await run_io(update_topic_graph, topics_result)
         
         return {
             "status": "success", 
@@ -2193,8 +2796,7 @@ async def deduplicate_topics_endpoint():
     """
     try:
         # Load existing topic graph
-        with open(graph_path, "r", encoding="utf-8") as f:
-            graph_data = json.load(f)
+        graph_data = await load_topic_graph_async()
 
         # Extract topics and people
         topics = [node for node in graph_data.get("nodes", []) if node.get("type") == "topic"]
@@ -2275,8 +2877,7 @@ async def deduplicate_topics_endpoint():
         graph_data["nodes"] = all_merged_nodes
 
         # Save the updated graph
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(graph_data, f, ensure_ascii=False, indent=2)
+        await save_topic_graph_async(graph_data)
 
         return {
             "status": "success",
@@ -2302,13 +2903,11 @@ async def aggressive_deduplicate_topics():
     try:
         # Load both files separately
         # 1. Load graph file
-        with open(graph_path, "r", encoding="utf-8") as f:
-            graph_data = json.load(f)
+        graph_data = await load_topic_graph_async()
         graph_nodes = graph_data.get("nodes", [])
 
         # 2. Load topics file
-        with open(topics_path, "r", encoding="utf-8") as f:
-            topics_data = json.load(f)
+        topics_data = await load_topics_data_async()
         topics_items = topics_data.get("topics", []) + topics_data.get("people", [])
 
         print(f"🔍 Starting aggressive deduplication:")
@@ -2408,8 +3007,7 @@ async def aggressive_deduplicate_topics():
 
         # Load current graph to get edges
         try:
-            with open(graph_path, "r", encoding="utf-8") as f:
-                graph_data = json.load(f)
+            graph_data = await load_topic_graph_async()
             edges = graph_data.get("edges", [])
         except:
             edges = []
@@ -2459,8 +3057,7 @@ async def aggressive_deduplicate_topics():
             "nodes": graph_nodes,
             "edges": final_edges
         }
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(graph_data, f, ensure_ascii=False, indent=2)
+        await save_topic_graph_async(graph_data)
 
         # Update topics.json file with deduplicated data
         topics_data = {
@@ -2492,8 +3089,7 @@ async def aggressive_deduplicate_topics():
         }
 
         # Save updated topics.json
-        with open(topics_path, "w", encoding="utf-8") as f:
-            json.dump(topics_data, f, ensure_ascii=False, indent=2)
+        await save_topics_data_async(topics_data)
 
         duplicates_removed = len(all_items) - len(final_items)
         print(f"✅ Aggressive deduplication complete: removed {duplicates_removed} duplicates")
@@ -2519,7 +3115,7 @@ async def llm_semantic_deduplicate():
     """
     try:
         # Get all current topics
-        all_topics = get_all_available_topics()
+        all_topics = await run_io(get_all_available_topics)
 
         print(f"🤖 Starting LLM semantic deduplication on {len(all_topics)} topics")
 
@@ -2687,8 +3283,7 @@ Do not include explanations, only the JSON array."""
         # Update both graph and topics files
         # Load current graph to get edges
         try:
-            with open(graph_path, "r", encoding="utf-8") as f:
-                graph_data = json.load(f)
+            graph_data = await load_topic_graph_async()
             edges = graph_data.get("edges", [])
         except:
             edges = []
@@ -2742,8 +3337,7 @@ Do not include explanations, only the JSON array."""
             "nodes": graph_nodes,
             "edges": final_edges
         }
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(graph_data, f, ensure_ascii=False, indent=2)
+        await save_topic_graph_async(graph_data)
 
         # Update topics.json file
         topics_data = {
@@ -2774,8 +3368,7 @@ Do not include explanations, only the JSON array."""
             "relations": []
         }
 
-        with open(topics_path, "w", encoding="utf-8") as f:
-            json.dump(topics_data, f, ensure_ascii=False, indent=2)
+        await save_topics_data_async(topics_data)
 
         duplicates_removed = len(removed_ids)
         print(f"✅ LLM semantic deduplication complete: removed {duplicates_removed} semantic duplicates")
@@ -2802,7 +3395,7 @@ async def manual_final_deduplicate():
     """
     try:
         # Get all current topics
-        all_topics = get_all_available_topics()
+        all_topics = await run_io(get_all_available_topics)
 
         print(f"🔧 Starting manual final deduplication on {len(all_topics)} topics")
 
@@ -2853,8 +3446,7 @@ async def manual_final_deduplicate():
         # Update both graph and topics files
         # Load current graph to get edges
         try:
-            with open(graph_path, "r", encoding="utf-8") as f:
-                graph_data = json.load(f)
+            graph_data = await load_topic_graph_async()
             edges = graph_data.get("edges", [])
         except:
             edges = []
@@ -2908,8 +3500,7 @@ async def manual_final_deduplicate():
             "nodes": graph_nodes,
             "edges": final_edges
         }
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(graph_data, f, ensure_ascii=False, indent=2)
+        await save_topic_graph_async(graph_data)
 
         # Update topics.json file
         topics_data = {
@@ -2940,8 +3531,7 @@ async def manual_final_deduplicate():
             "relations": []
         }
 
-        with open(topics_path, "w", encoding="utf-8") as f:
-            json.dump(topics_data, f, ensure_ascii=False, indent=2)
+        await save_topics_data_async(topics_data)
 
         duplicates_removed = len(removed_ids)
         print(f"✅ Manual final deduplication complete: removed {duplicates_removed} remaining duplicates")
@@ -2974,8 +3564,7 @@ async def apply_consolidated_topics(consolidated_data: dict):
         new_people = consolidated_data['people']
 
         # Load current graph data to preserve edges
-        with open(graph_path, "r", encoding="utf-8") as f:
-            current_graph = json.load(f)
+        current_graph = await load_topic_graph_async()
 
         # Create new nodes list with consolidated topics and people
         new_nodes = []
@@ -3012,8 +3601,7 @@ async def apply_consolidated_topics(consolidated_data: dict):
         }
 
         # Save updated graph
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(updated_graph, f, ensure_ascii=False, indent=2)
+        await save_topic_graph_async(updated_graph)
 
         # Also update the topics.json file
         topics_data = {
@@ -3022,8 +3610,7 @@ async def apply_consolidated_topics(consolidated_data: dict):
             "relations": []  # Relations will be rebuilt from edges
         }
 
-        with open(topics_path, "w", encoding="utf-8") as f:
-            json.dump(topics_data, f, ensure_ascii=False, indent=2)
+        await save_topics_data_async(topics_data)
 
         return {
             "status": "success",
@@ -3044,16 +3631,14 @@ async def rebuild_topics_endpoint():
     try:
         # Clear existing topic graph
         graph_data = {"nodes": [], "edges": []}
-        with open(graph_path, "w", encoding="utf-8") as f:
-            json.dump(graph_data, f, ensure_ascii=False, indent=2)
+        await save_topic_graph_async(graph_data)
 
         # Clear existing topics file
         topics_data = {"topics": [], "people": [], "relations": []}
-        with open(topics_path, "w", encoding="utf-8") as f:
-            json.dump(topics_data, f, ensure_ascii=False, indent=2)
+        await save_topics_data_async(topics_data)
 
         # Load all entries
-        entries = load_entries()
+        entries = await load_entries_async()
         if not entries:
             return {"status": "error", "message": "No diary entries found"}
 
@@ -3061,7 +3646,7 @@ async def rebuild_topics_endpoint():
         topics_result = await extract_topics_from_entries(entries)
 
         # Update the topic graph with intelligent merging
-        update_topic_graph(topics_result)
+        await run_io(update_topic_graph, topics_result)
 
         return {
             "status": "success",
@@ -3081,8 +3666,7 @@ def load_entries():
     """
     ensure_data_file()
     try:
-        with open(data_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return entry_store.all()
     except Exception as e:
         print(f"Error loading entries: {str(e)}")
         return []
@@ -3209,15 +3793,23 @@ class TopicGraphType:
     people: List[PersonNodeType]
     relations: List[RelationEdgeType]
 
-@strawberry.type
-class Query:
+# Last built topic graph, keyed by the versions of the documents it was built from
+topic_graph_cache = {"versions": None, "graph": None}
+
+# Named apart from fastapi's Query, which the REST endpoints use for their parameters
+@strawberry.type(name="Query")
+class GraphQLQuery:
     @strawberry.field
-    def topic_graph(self) -> TopicGraphType:
+    async def topic_graph(self) -> TopicGraphType:
         """
         Loads the topic graph data from the stored files without using AI processing
         """
         ensure_data_file()
         
+        versions = (storage.document_version('topic_graph'), storage.document_version('topics'))
+        if topic_graph_cache["versions"] == versions:
+            return topic_graph_cache["graph"]
+        
         try:
             topics = []
             people = []
@@ -3225,8 +3817,7 @@ class Query:
             
             # Try to load from the graph file (network graph format)
             try:
-                with open(graph_path, 'r') as f:
-                    graph_data = json.load(f)
+                graph_data = await load_topic_graph_async()
                     
                 # Check if the graph has nodes
                 if len(graph_data.get('nodes', [])) > 0:
@@ -3311,8 +3902,7 @@ class Query:
                 # Try to load from the topics file (direct extraction format)
                 try:
                     print("Loading topics from topics file...")
-                    with open(topics_path, 'r') as f:
-                        topics_data = json.load(f)
+                    topics_data = await load_topics_data_async()
                     
                     # Convert topics to GraphQL types
                     for topic in topics_data.get('topics', []):
@@ -3351,16 +3941,26 @@ class Query:
                     # Both files failed, return empty data
                     return TopicGraphType(topics=[], people=[], relations=[])
             
-            return TopicGraphType(topics=topics, people=people, relations=relations)
+            graph = TopicGraphType(topics=topics, people=people, relations=relations)
+            topic_graph_cache["versions"] = versions
+            topic_graph_cache["graph"] = graph
+            return graph
         except Exception as e:
             print(f"Error fetching topic graph: {e}")
             return TopicGraphType(topics=[], people=[], relations=[])
 
 # Create GraphQL schema
-schema = strawberry.Schema(query=Query)
+schema = strawberry.Schema(query=GraphQLQuery)
+
+async def graphql_etag(request: Request, response: Response):
+    """The schema only exposes the topic graph, so its documents' versions plus the query identify a response"""
+    ensure_data_file()
+    body = await request.body()
+    query_hash = hashlib.md5(body + request.url.query.encode('utf-8')).hexdigest()[:12]
+    check_etag(request, response, storage.document_version('topic_graph'), storage.document_version('topics'), query_hash)
 
 # Create GraphQL router
-graphql_app = GraphQLRouter(schema)
+graphql_app = GraphQLRouter(schema, dependencies=[Depends(graphql_etag)])
 
 # Add GraphQL endpoints to the app
 app.include_router(graphql_app, prefix="/graphql")
@@ -3390,7 +3990,7 @@ async def ai_topics_status():
 async def get_topic_config():
     """Get user topic configuration"""
     try:
-        config = load_topic_config()
+        config = await load_topic_config_async()
         return {"status": "success", "config": config}
     except Exception as e:
         print(f"Error getting topic config: {e}")
@@ -3400,38 +4000,41 @@ async def get_topic_config():
 async def update_topic_config(config_update: TopicConfigUpdate):
     """Update user topic configuration"""
     try:
-        current_config = load_topic_config()
-
-        # Update only provided fields
-        if config_update.visible_topics is not None:
-            current_config["visible_topics"] = config_update.visible_topics
-        if config_update.hidden_topics is not None:
-            current_config["hidden_topics"] = config_update.hidden_topics
-        if config_update.topic_priorities is not None:
-            current_config["topic_priorities"].update(config_update.topic_priorities)
-        if config_update.auto_detection_enabled is not None:
-            current_config["auto_detection_settings"]["enabled"] = config_update.auto_detection_enabled
-        if config_update.auto_detection_frequency is not None:
-            current_config["auto_detection_settings"]["frequency"] = config_update.auto_detection_frequency
-        if config_update.min_mentions is not None:
-            current_config["auto_detection_settings"]["min_mentions"] = config_update.min_mentions
-        if config_update.categories_enabled is not None:
-            current_config["auto_detection_settings"]["categories_enabled"] = config_update.categories_enabled
-
-        success = save_topic_config(current_config)
-        if success:
-            return {"status": "success", "config": current_config}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save configuration")
+        def apply_update(current_config):
+            # Update only provided fields
+            if config_update.visible_topics is not None:
+                current_config["visible_topics"] = config_update.visible_topics
+            if config_update.hidden_topics is not None:
+                current_config["hidden_topics"] = config_update.hidden_topics
+            if config_update.topic_priorities is not None:
+                current_config["topic_priorities"].update(config_update.topic_priorities)
+            if config_update.auto_detection_enabled is not None:
+                current_config["auto_detection_settings"]["enabled"] = config_update.auto_detection_enabled
+            if config_update.auto_detection_frequency is not None:
+                current_config["auto_detection_settings"]["frequency"] = config_update.auto_detection_frequency
+            if config_update.min_mentions is not None:
+                current_config["auto_detection_settings"]["min_mentions"] = config_update.min_mentions
+            if config_update.categories_enabled is not None:
+                current_config["auto_detection_settings"]["categories_enabled"] = config_update.categories_enabled
+            return current_config
+
+        current_config = await edit_document('topic_config', apply_update)
+
+        return {"status": "success", "config": current_config}
     except Exception as e:
         print(f"Error updating topic config: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/topics/visible")
-async def get_visible_topics():
+async def get_visible_topics(request: Request, response: Response):
     """Get topics that should be visible to the user"""
+    # Visibility depends on the topic documents, the config and which topics
+    # the entries mention
+    ensure_data_file()
+    check_etag(request, response, await run_io(entry_store.current_version), storage.document_version('topic_graph'),
+               storage.document_version('topics'), storage.document_version('topic_config'))
     try:
-        visible_topics = get_user_visible_topics()
+        visible_topics = await run_io(get_user_visible_topics)
         return {"status": "success", "topics": visible_topics}
     except Exception as e:
         print(f"Error getting visible topics: {e}")
@@ -3441,8 +4044,8 @@ async def get_visible_topics():
 async def get_all_topics():
     """Get all available topics"""
     try:
-        all_topics = get_all_available_topics()
-        config = load_topic_config()
+        all_topics = await run_io(get_all_available_topics)
+        config = await load_topic_config_async()
 
         # Add visibility and priority information
         visible_topic_ids = set(config.get('visible_topics', []))
@@ -3464,30 +4067,28 @@ async def get_all_topics():
 async def update_topic_visibility(visibility_update: TopicVisibilityUpdate):
     """Update visibility of a specific topic"""
     try:
-        config = load_topic_config()
         topic_id = visibility_update.topic_id
         visible = visibility_update.visible
 
-        visible_topics = set(config.get('visible_topics', []))
-        hidden_topics = set(config.get('hidden_topics', []))
+        def set_visibility(config):
+            visible_topics = set(config.get('visible_topics', []))
+            hidden_topics = set(config.get('hidden_topics', []))
 
-        if visible:
-            # Make topic visible
-            visible_topics.add(topic_id)
-            hidden_topics.discard(topic_id)
-        else:
-            # Hide topic
-            hidden_topics.add(topic_id)
-            visible_topics.discard(topic_id)
+            if visible:
+                # Make topic visible
+                visible_topics.add(topic_id)
+                hidden_topics.discard(topic_id)
+            else:
+                # Hide topic
+                hidden_topics.add(topic_id)
+                visible_topics.discard(topic_id)
 
-        config['visible_topics'] = list(visible_topics)
-        config['hidden_topics'] = list(hidden_topics)
+            config['visible_topics'] = list(visible_topics)
+            config['hidden_topics'] = list(hidden_topics)
 
-        success = save_topic_config(config)
-        if success:
-            return {"status": "success", "message": f"Topic visibility updated"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save configuration")
+        await edit_document('topic_config', set_visibility)
+
+        return {"status": "success", "message": f"Topic visibility updated"}
     except Exception as e:
         print(f"Error updating topic visibility: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3496,7 +4097,6 @@ async def update_topic_visibility(visibility_update: TopicVisibilityUpdate):
 async def update_topic_priority(priority_update: TopicPriorityUpdate):
     """Update priority of a specific topic"""
     try:
-        config = load_topic_config()
         topic_id = priority_update.topic_id
         priority = priority_update.priority
 
@@ -3504,13 +4104,12 @@ async def update_topic_priority(priority_update: TopicPriorityUpdate):
         if priority < 1 or priority > 5:
             raise HTTPException(status_code=400, detail="Priority must be between 1 and 5")
 
-        config['topic_priorities'][topic_id] = priority
+        def set_priority(config):
+            config['topic_priorities'][topic_id] = priority
 
-        success = save_topic_config(config)
-        if success:
-            return {"status": "success", "message": f"Topic priority updated to {priority}"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save configuration")
+        await edit_document('topic_config', set_priority)
+
+        return {"status": "success", "message": f"Topic priority updated to {priority}"}
     except Exception as e:
         print(f"Error updating topic priority: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3519,8 +4118,6 @@ async def update_topic_priority(priority_update: TopicPriorityUpdate):
 async def create_custom_topic(custom_topic: CustomTopic):
     """Create a new custom topic"""
     try:
-        config = load_topic_config()
-
         # Generate unique ID for custom topic
         import uuid
         topic_id = f"custom_{uuid.uuid4().hex[:8]}"
@@ -3541,17 +4138,16 @@ async def create_custom_topic(custom_topic: CustomTopic):
             "priority": 3
         }
 
-        config['custom_topics'].append(new_custom_topic)
+        def add_custom_topic(config):
+            config['custom_topics'].append(new_custom_topic)
 
-        # Make it visible by default
-        if topic_id not in config.get('visible_topics', []):
-            config.setdefault('visible_topics', []).append(topic_id)
+            # Make it visible by default
+            if topic_id not in config.get('visible_topics', []):
+                config.setdefault('visible_topics', []).append(topic_id)
 
-        success = save_topic_config(config)
-        if success:
-            return {"status": "success", "topic": new_custom_topic}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save custom topic")
+        await edit_document('topic_config', add_custom_topic)
+
+        return {"status": "success", "topic": new_custom_topic}
     except Exception as e:
         print(f"Error creating custom topic: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3560,31 +4156,28 @@ async def create_custom_topic(custom_topic: CustomTopic):
 async def delete_custom_topic(topic_id: str):
     """Delete a custom topic"""
     try:
-        config = load_topic_config()
+        def remove_custom_topic(config):
+            # Find and remove the custom topic
+            custom_topics = config.get('custom_topics', [])
+            original_count = len(custom_topics)
+            config['custom_topics'] = [t for t in custom_topics if t.get('id') != topic_id]
 
-        # Find and remove the custom topic
-        custom_topics = config.get('custom_topics', [])
-        original_count = len(custom_topics)
-        config['custom_topics'] = [t for t in custom_topics if t.get('id') != topic_id]
+            if len(config['custom_topics']) == original_count:
+                raise HTTPException(status_code=404, detail="Custom topic not found")
 
-        if len(config['custom_topics']) == original_count:
-            raise HTTPException(status_code=404, detail="Custom topic not found")
+            # Remove from visible/hidden lists
+            if 'visible_topics' in config:
+                config['visible_topics'] = [t for t in config['visible_topics'] if t != topic_id]
+            if 'hidden_topics' in config:
+                config['hidden_topics'] = [t for t in config['hidden_topics'] if t != topic_id]
 
-        # Remove from visible/hidden lists
-        if 'visible_topics' in config:
-            config['visible_topics'] = [t for t in config['visible_topics'] if t != topic_id]
-        if 'hidden_topics' in config:
-            config['hidden_topics'] = [t for t in config['hidden_topics'] if t != topic_id]
+            # Remove from priorities
+            if topic_id in config.get('topic_priorities', {}):
+                del config['topic_priorities'][topic_id]
 
-        # Remove from priorities
-        if topic_id in config.get('topic_priorities', {}):
-            del config['topic_priorities'][topic_id]
+        await edit_document('topic_config', remove_custom_topic)
 
-        success = save_topic_config(config)
-        if success:
-            return {"status": "success", "message": "Custom topic deleted"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to delete custom topic")
+        return {"status": "success", "message": "Custom topic deleted"}
     except Exception as e:
         print(f"Error deleting custom topic: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3595,85 +4188,75 @@ async def delete_topic(topic_id: str):
     try:
         print(f"🗑️ Attempting to delete topic: {topic_id}")
 
-        # Remove from topic configuration
-        config = load_topic_config()
-
-        # Remove from custom topics if it exists there
-        custom_topics = config.get('custom_topics', [])
-        config['custom_topics'] = [t for t in custom_topics if t.get('id') != topic_id]
-
-        # Remove from visible/hidden lists
-        if 'visible_topics' in config:
-            config['visible_topics'] = [t for t in config['visible_topics'] if t != topic_id]
-        if 'hidden_topics' in config:
-            config['hidden_topics'] = [t for t in config['hidden_topics'] if t != topic_id]
-
-        # Remove from priorities
-        if topic_id in config.get('topic_priorities', {}):
-            del config['topic_priorities'][topic_id]
-
         # Remove from topic graph (graph.json)
         try:
-            with open(graph_path, 'r', encoding='utf-8') as f:
-                graph_data = json.load(f)
-
-            # Remove the topic node
-            original_nodes = len(graph_data.get('nodes', []))
-            graph_data['nodes'] = [node for node in graph_data.get('nodes', []) if node.get('id') != topic_id]
+            def remove_from_graph(graph_data):
+                # Remove the topic node
+                original_nodes = len(graph_data.get('nodes', []))
+                graph_data['nodes'] = [node for node in graph_data.get('nodes', []) if node.get('id') != topic_id]
 
-            # Remove edges connected to this topic
-            original_edges = len(graph_data.get('edges', []))
-            graph_data['edges'] = [edge for edge in graph_data.get('edges', [])
-                                 if edge.get('source') != topic_id and edge.get('target') != topic_id]
+                # Remove edges connected to this topic
+                original_edges = len(graph_data.get('edges', []))
+                graph_data['edges'] = [edge for edge in graph_data.get('edges', [])
+                                     if edge.get('source') != topic_id and edge.get('target') != topic_id]
 
-            # Save updated graph
-            with open(graph_path, 'w', encoding='utf-8') as f:
-                json.dump(graph_data, f, ensure_ascii=False, indent=2)
+                print(f"Removed from graph: {original_nodes - len(graph_data['nodes'])} nodes, {original_edges - len(graph_data['edges'])} edges")
 
-            print(f"Removed from graph: {original_nodes - len(graph_data['nodes'])} nodes, {original_edges - len(graph_data['edges'])} edges")
+            await edit_document('topic_graph', remove_from_graph)
 
         except Exception as e:
             print(f"Warning: Could not update graph file: {e}")
 
         # Remove from topics file (topics.json)
         try:
-            with open(topics_path, 'r', encoding='utf-8') as f:
-                topics_data = json.load(f)
-
-            # Remove from topics list
-            original_topics = len(topics_data.get('topics', []))
-            topics_data['topics'] = [topic for topic in topics_data.get('topics', []) if topic.get('id') != topic_id]
+            def remove_from_topics(topics_data):
+                # Remove from topics list
+                original_topics = len(topics_data.get('topics', []))
+                topics_data['topics'] = [topic for topic in topics_data.get('topics', []) if topic.get('id') != topic_id]
 
-            # Remove from people list (in case it was misclassified)
-            original_people = len(topics_data.get('people', []))
-            topics_data['people'] = [person for person in topics_data.get('people', []) if person.get('id') != topic_id]
+                # Remove from people list (in case it was misclassified)
+                original_people = len(topics_data.get('people', []))
+                topics_data['people'] = [person for person in topics_data.get('people', []) if person.get('id') != topic_id]
 
-            # Save updated topics
-            with open(topics_path, 'w', encoding='utf-8') as f:
-                json.dump(topics_data, f, ensure_ascii=False, indent=2)
+                print(f"Removed from topics file: {original_topics - len(topics_data['topics'])} topics, {original_people - len(topics_data['people'])} people")
 
-            print(f"Removed from topics file: {original_topics - len(topics_data['topics'])} topics, {original_people - len(topics_data['people'])} people")
+            await edit_document('topics', remove_from_topics)
 
         except Exception as e:
             print(f"Warning: Could not update topics file: {e}")
 
-        # Save configuration
-        success = save_topic_config(config)
-        if success:
-            print(f"✅ Successfully deleted topic: {topic_id}")
-            return {"status": "success", "message": "Topic deleted successfully"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save configuration after deletion")
+        # Remove from topic configuration
+        def remove_from_config(config):
+            # Remove from custom topics if it exists there
+            custom_topics = config.get('custom_topics', [])
+            config['custom_topics'] = [t for t in custom_topics if t.get('id') != topic_id]
+
+            # Remove from visible/hidden lists
+            if 'visible_topics' in config:
+                config['visible_topics'] = [t for t in config['visible_topics'] if t != topic_id]
+            if 'hidden_topics' in config:
+                config['hidden_topics'] = [t for t in config['hidden_topics'] if t != topic_id]
+
+            # Remove from priorities
+            if topic_id in config.get('topic_priorities', {}):
+                del config['topic_priorities'][topic_id]
+
+        await edit_document('topic_config', remove_from_config)
+
+        print(f"✅ Successfully deleted topic: {topic_id}")
+        return {"status": "success", "message": "Topic deleted successfully"}
 
     except Exception as e:
         print(f"❌ Error deleting topic {topic_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/topic-suggestions")
-async def get_topic_suggestions():
+async def get_topic_suggestions(request: Request, response: Response):
     """Get pending topic suggestions for user review"""
+    ensure_data_file()
+    check_etag(request, response, storage.document_version('topic_suggestions'))
     try:
-        suggestions = load_topic_suggestions()
+        suggestions = await load_topic_suggestions_async()
         return {"status": "success", "suggestions": suggestions}
     except Exception as e:
         print(f"Error getting topic suggestions: {e}")
@@ -3683,29 +4266,26 @@ async def get_topic_suggestions():
 async def approve_topic_suggestion(suggestion_id: str):
     """Approve a topic suggestion and add it to visible topics"""
     try:
-        suggestions = load_topic_suggestions()
-        config = load_topic_config()
-
-        # Find the suggestion
-        pending = suggestions.get('pending_review', [])
-        suggestion = None
-        for i, s in enumerate(pending):
-            if s.get('id') == suggestion_id:
-                suggestion = pending.pop(i)
-                break
+        def approve(suggestions):
+            # Find the suggestion
+            pending = suggestions.get('pending_review', [])
+            suggestion = None
+            for i, s in enumerate(pending):
+                if s.get('id') == suggestion_id:
+                    suggestion = pending.pop(i)
+                    break
 
-        if not suggestion:
-            raise HTTPException(status_code=404, detail="Suggestion not found")
+            if not suggestion:
+                raise HTTPException(status_code=404, detail="Suggestion not found")
 
-        # Move to approved
-        suggestions.setdefault('auto_approved', []).append(suggestion)
+            # Move to approved
+            suggestions.setdefault('auto_approved', []).append(suggestion)
 
-        # Add to visible topics
-        config.setdefault('visible_topics', []).append(suggestion_id)
+            # Add to visible topics
+            with storage.editing('topic_config') as config:
+                config.setdefault('visible_topics', []).append(suggestion_id)
 
-        # Save both files
-        save_topic_suggestions(suggestions)
-        save_topic_config(config)
+        await edit_document('topic_suggestions', approve)
 
         return {"status": "success", "message": "Topic suggestion approved"}
     except Exception as e:
@@ -3716,23 +4296,22 @@ async def approve_topic_suggestion(suggestion_id: str):
 async def reject_topic_suggestion(suggestion_id: str):
     """Reject a topic suggestion"""
     try:
-        suggestions = load_topic_suggestions()
-
-        # Find the suggestion
-        pending = suggestions.get('pending_review', [])
-        suggestion = None
-        for i, s in enumerate(pending):
-            if s.get('id') == suggestion_id:
-                suggestion = pending.pop(i)
-                break
+        def reject(suggestions):
+            # Find the suggestion
+            pending = suggestions.get('pending_review', [])
+            suggestion = None
+            for i, s in enumerate(pending):
+                if s.get('id') == suggestion_id:
+                    suggestion = pending.pop(i)
+                    break
 
-        if not suggestion:
-            raise HTTPException(status_code=404, detail="Suggestion not found")
+            if not suggestion:
+                raise HTTPException(status_code=404, detail="Suggestion not found")
 
-        # Move to rejected
-        suggestions.setdefault('rejected', []).append(suggestion)
+            # Move to rejected
+            suggestions.setdefault('rejected', []).append(suggestion)
 
-        save_topic_suggestions(suggestions)
+        await edit_document('topic_suggestions', reject)
 
         return {"status": "success", "message": "Topic suggestion rejected"}
     except Exception as e:
@@ -3743,29 +4322,27 @@ async def reject_topic_suggestion(suggestion_id: str):
 async def update_bulk_topic_visibility(updates: List[TopicVisibilityUpdate]):
     """Update visibility for multiple topics at once"""
     try:
-        config = load_topic_config()
-        visible_topics = set(config.get('visible_topics', []))
-        hidden_topics = set(config.get('hidden_topics', []))
+        def set_visibilities(config):
+            visible_topics = set(config.get('visible_topics', []))
+            hidden_topics = set(config.get('hidden_topics', []))
 
-        for update in updates:
-            topic_id = update.topic_id
-            visible = update.visible
+            for update in updates:
+                topic_id = update.topic_id
+                visible = update.visible
 
-            if visible:
-                visible_topics.add(topic_id)
-                hidden_topics.discard(topic_id)
-            else:
-                hidden_topics.add(topic_id)
-                visible_topics.discard(topic_id)
+                if visible:
+                    visible_topics.add(topic_id)
+                    hidden_topics.discard(topic_id)
+                else:
+                    hidden_topics.add(topic_id)
+                    visible_topics.discard(topic_id)
 
-        config['visible_topics'] = list(visible_topics)
-        config['hidden_topics'] = list(hidden_topics)
+            config['visible_topics'] = list(visible_topics)
+            config['hidden_topics'] = list(hidden_topics)
 
-        success = save_topic_config(config)
-        if success:
-            return {"status": "success", "message": f"Updated visibility for {len(updates)} topics"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save configuration")
+        await edit_document('topic_config', set_visibilities)
+
+        return {"status": "success", "message": f"Updated visibility for {len(updates)} topics"}
     except Exception as e:
         print(f"Error updating bulk topic visibility: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3792,7 +4369,7 @@ async def reset_topic_config():
             }
         }
 
-        success = save_topic_config(default_config)
+        success = await save_topic_config_async(default_config)
         if success:
             return {"status": "success", "message": "Topic configuration reset to defaults", "config": default_config}
         else:
@@ -3817,7 +4394,8 @@ async def get_pipeline_status():
             "unprocessed_count": unprocessed_count,
             "last_run": topic_pipeline.last_run,
             "batch_size": topic_pipeline.batch_size,
-            "min_queue_size": topic_pipeline.min_queue_size
+            "min_queue_size": topic_pipeline.min_queue_size,
+            "skipped_near_duplicates": topic_pipeline.skipped_near_duplicates
         }
 
         return {"status": "success", "pipeline_status": status}
@@ -3885,19 +4463,21 @@ async def process_all_entries():
     """Add all existing entries to the topic detection pipeline"""
     try:
         # Load all entries
-        with open(data_path, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
+        entries = await run_io(entry_store.all)
 
         if not entries:
             return {"status": "info", "message": "No entries found to process"}
 
-        # Add all entries to queue
-        added_count = 0
-        for entry in entries:
-            content = entry.get('content', '')
-            if content.strip():
-                topic_pipeline.add_to_queue(entry['id'], content, priority='bulk')
-                added_count += 1
+        # Add all entries to queue (content reads and SimHash off the event loop)
+        def queue_all():
+            added_count = 0
+            for entry in entries:
+                content = entry.get('content', '')
+                if content.strip():
+                    topic_pipeline.add_to_queue(entry['id'], content, priority='bulk')
+                    added_count += 1
+            return added_count
+        added_count = await run_io(queue_all)
 
         return {"status": "success", "message": f"Added {added_count} entries to detection queue"}
     except Exception as e:
@@ -3908,38 +4488,36 @@ async def process_all_entries():
 async def get_topic_stats():
     """Get usage statistics for all topics"""
     try:
-        # Load all entries
-        with open(data_path, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
-
         # Load all topics
-        all_topics = get_all_available_topics()
+        all_topics = await run_io(get_all_available_topics)
 
-        stats = {}
+        def collect_stats():
+            stats = {}
 
-        for topic in all_topics:
-            topic_name = topic['name'].lower()
-            mention_count = 0
-            last_mentioned = None
-            entry_ids = []
+            for topic in all_topics:
+                mention_count = 0
+                last_mentioned = None
+                entry_ids = []
 
-            # Count mentions across all entries
-            for entry in entries:
-                content = entry.get('content', '').lower()
-                if topic_name in content:
+                # Count mentions across all entries
+                for entry in entry_store.entries_mentioning(topic['name']):
                     mention_count += 1
                     entry_ids.append(entry['id'])
                     entry_date = entry.get('createdAt', '')
                     if not last_mentioned or entry_date > last_mentioned:
                         last_mentioned = entry_date
 
-            stats[topic['id']] = {
-                'mention_count': mention_count,
-                'last_mentioned': last_mentioned,
-                'entry_ids': entry_ids[:5],  # Keep only first 5 for performance
-                'category': topic.get('category', 'unknown'),
-                'type': topic.get('type', 'topic')
-            }
+                stats[topic['id']] = {
+                    'mention_count': mention_count,
+                    'last_mentioned': last_mentioned,
+                    'entry_ids': entry_ids[:5],  # Keep only first 5 for performance
+                    'category': topic.get('category', 'unknown'),
+                    'type': topic.get('type', 'topic')
+                }
+            return stats
+
+        # The mention scans walk the whole history, so keep them off the event loop
+        stats = await run_io(collect_stats)
 
         return {"status": "success", "stats": stats}
     except Exception as e:
@@ -3951,21 +4529,22 @@ async def get_topic_analytics():
     """Get comprehensive topic analytics and insights"""
     try:
         # Load all entries and topics
-        with open(data_path, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
+        entries = await run_io(entry_store.all)
 
-        all_topics = get_all_available_topics()
-        config = load_topic_config()
+        all_topics = await run_io(get_all_available_topics)
+        config = await load_topic_config_async()
 
         # Calculate analytics
-        analytics = {
-            "overview": calculate_topic_overview(entries, all_topics),
-            "trends": calculate_topic_trends(entries, all_topics),
-            "insights": generate_topic_insights(entries, all_topics, config),
-            "recommendations": generate_topic_recommendations(entries, all_topics, config),
-            "activity_patterns": analyze_activity_patterns(entries, all_topics),
-            "topic_relationships": analyze_topic_relationships(entries, all_topics)
-        }
+        def calculate_analytics():
+            return {
+                "overview": calculate_topic_overview(entries, all_topics),
+                "trends": calculate_topic_trends(entries, all_topics),
+                "insights": generate_topic_insights(entries, all_topics, config),
+                "recommendations": generate_topic_recommendations(entries, all_topics, config),
+                "activity_patterns": analyze_activity_patterns(entries, all_topics),
+                "topic_relationships": analyze_topic_relationships(entries, all_topics)
+            }
+        analytics = await run_io(calculate_analytics)
 
         return {"status": "success", "analytics": analytics}
     except Exception as e:
@@ -3978,22 +4557,24 @@ def calculate_topic_overview(entries, topics):
     active_topics = 0
     total_mentions = 0
 
+    metas = [entry_store.meta(entry) for entry in entries]
+    texts = [entry_text(entry) for entry in entries]
+
     # Calculate mentions for each topic
     for topic in topics:
         topic_name = topic['name'].lower()
-        mentions = sum(1 for entry in entries if topic_name in entry.get('content', '').lower())
+        mentions = sum(1 for text in texts if topic_name in text)
         if mentions > 0:
             active_topics += 1
             total_mentions += mentions
 
     # Calculate time range
     if entries:
-        dates = [entry.get('createdAt', '') for entry in entries if entry.get('createdAt')]
-        dates.sort()
+        dated = sorted((meta['ts'], entry['createdAt']) for entry, meta in zip(entries, metas) if meta['ts'] is not None)
         time_range = {
-            "start": dates[0] if dates else None,
-            "end": dates[-1] if dates else None,
-            "total_days": len(set(date[:10] for date in dates)) if dates else 0
+            "start": dated[0][1] if dated else None,
+            "end": dated[-1][1] if dated else None,
+            "total_days": len(set(meta['day'] for meta in metas if meta['day'] is not None))
         }
     else:
         time_range = {"start": None, "end": None, "total_days": 0}
@@ -4010,32 +4591,25 @@ def calculate_topic_overview(entries, topics):
 
 def calculate_topic_trends(entries, topics):
     """Calculate topic trends over time"""
-    from datetime import datetime, timedelta
-    import calendar
+    columns = entry_store.columns_for(entries)
+    dated = columns.dated
+    texts = [entry_text(entry) for entry in entries]
 
-    # Group entries by month
-    monthly_data = {}
-    for entry in entries:
-        created_at = entry.get('createdAt', '')
-        if created_at:
-            try:
-                date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                month_key = f"{date.year}-{date.month:02d}"
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = []
-                monthly_data[month_key].append(entry)
-            except:
-                continue
+    def month_label(month):
+        return f"{month // 12}-{month % 12 + 1:02d}"
+
+    # Entries per month, keyed by the year * 12 + month column value
+    monthly_counts = columns.group_counts('month', dated)
 
     # Calculate trends for top topics
     topic_trends = []
     for topic in topics[:20]:  # Top 20 topics
         topic_name = topic['name'].lower()
-        monthly_mentions = {}
-
-        for month, month_entries in monthly_data.items():
-            mentions = sum(1 for entry in month_entries if topic_name in entry.get('content', '').lower())
-            monthly_mentions[month] = mentions
+        mentioned = np.fromiter((topic_name in text for text in texts), dtype=bool, count=len(texts))
+        mentions_by_month = columns.group_counts('month', dated & mentioned)
+        monthly_mentions = {
+            month_label(month): mentions_by_month.get(month, 0) for month in monthly_counts
+        }
 
         if sum(monthly_mentions.values()) > 0:
             topic_trends.append({
@@ -4051,9 +4625,9 @@ def calculate_topic_trends(entries, topics):
     topic_trends.sort(key=lambda x: x['total_mentions'], reverse=True)
 
     return {
-        "monthly_overview": {month: len(entries) for month, entries in monthly_data.items()},
+        "monthly_overview": {month_label(month): count for month, count in monthly_counts.items()},
         "topic_trends": topic_trends[:10],  # Top 10 trending topics
-        "time_periods": list(monthly_data.keys())
+        "time_periods": [month_label(month) for month in monthly_counts]
     }
 
 def calculate_trend_direction(monthly_data):
@@ -4082,11 +4656,13 @@ def generate_topic_insights(entries, topics, config):
     """Generate intelligent insights about topic usage"""
     insights = []
 
+    texts = [entry_text(entry) for entry in entries]
+
     # Most active topics
     topic_activity = []
     for topic in topics:
         topic_name = topic['name'].lower()
-        mentions = sum(1 for entry in entries if topic_name in entry.get('content', '').lower())
+        mentions = sum(1 for text in texts if topic_name in text)
         if mentions > 0:
             topic_activity.append((topic, mentions))
 
@@ -4138,7 +4714,7 @@ def generate_topic_insights(entries, topics, config):
 
     inactive_visible = [topic for topic in topics
                        if topic['id'] in visible_topics and
-                       not any(topic['name'].lower() in entry.get('content', '').lower() for entry in entries)]
+                       not any(topic['name'].lower() in text for text in texts)]
 
     if inactive_visible:
         insights.append({
@@ -4154,11 +4730,13 @@ def generate_topic_recommendations(entries, topics, config):
     """Generate recommendations for topic management"""
     recommendations = []
 
+    texts = [entry_text(entry) for entry in entries]
+
     # Recommend hiding inactive topics
     inactive_topics = []
     for topic in topics:
         topic_name = topic['name'].lower()
-        mentions = sum(1 for entry in entries if topic_name in entry.get('content', '').lower())
+        mentions = sum(1 for text in texts if topic_name in text)
         if mentions == 0:
             inactive_topics.append(topic)
 
@@ -4194,7 +4772,7 @@ def generate_topic_recommendations(entries, topics, config):
     topic_activity = []
     for topic in topics:
         topic_name = topic['name'].lower()
-        mentions = sum(1 for entry in entries if topic_name in entry.get('content', '').lower())
+        mentions = sum(1 for text in texts if topic_name in text)
         current_priority = config.get('topic_priorities', {}).get(topic['id'], 3)
         if mentions > 10 and current_priority < 4:
             topic_activity.append((topic, mentions, current_priority))
@@ -4217,7 +4795,7 @@ def find_frequent_phrases(entries):
     from collections import Counter
 
     # Extract all text
-    all_text = " ".join(entry.get('content', '') for entry in entries).lower()
+    all_text = " ".join(entry_text(entry) for entry in entries)
 
     # Find potential topic phrases (2-4 characters for Chinese, 3-15 chars for others)
     chinese_phrases = re.findall(r'[\u4e00-\u9fff]{2,4}', all_text)
@@ -4236,30 +4814,19 @@ def find_frequent_phrases(entries):
 
 def analyze_activity_patterns(entries, topics):
     """Analyze when topics are most active"""
-    from datetime import datetime
-    import calendar
+    columns = entry_store.columns_for(entries)
+    dated = columns.dated
+
+    hourly = columns.count_by('hour', dated, minlength=24)
+    daily = columns.count_by('weekday', dated, minlength=7)
+    monthly = np.bincount(columns.month[dated] % 12, minlength=12)
 
     patterns = {
-        "hourly": {},
-        "daily": {},
-        "monthly": {}
+        "hourly": {hour: int(count) for hour, count in enumerate(hourly) if count},
+        "daily": {calendar.day_name[day]: int(count) for day, count in enumerate(daily) if count},
+        "monthly": {calendar.month_name[month + 1]: int(count) for month, count in enumerate(monthly) if count}
     }
 
-    for entry in entries:
-        created_at = entry.get('createdAt', '')
-        if created_at:
-            try:
-                date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                hour = date.hour
-                day = calendar.day_name[date.weekday()]
-                month = calendar.month_name[date.month]
-
-                patterns["hourly"][hour] = patterns["hourly"].get(hour, 0) + 1
-                patterns["daily"][day] = patterns["daily"].get(day, 0) + 1
-                patterns["monthly"][month] = patterns["monthly"].get(month, 0) + 1
-            except:
-                continue
-
     return {
         "peak_hour": max(patterns["hourly"].items(), key=lambda x: x[1]) if patterns["hourly"] else None,
         "peak_day": max(patterns["daily"].items(), key=lambda x: x[1]) if patterns["daily"] else None,
@@ -4274,7 +4841,7 @@ def analyze_topic_relationships(entries, topics):
     topic_cooccurrence = {}
 
     for entry in entries:
-        content = entry.get('content', '').lower()
+        content = entry_text(entry)
         mentioned_topics = []
 
         for topic in topics:
@@ -4317,12 +4884,10 @@ async def get_topic_entries(topic_id: str, concise: bool = False):
         # Load the topic graph data to get information about the topic
         topic_data = None
         
-        # Try to load from graph_path
-        graph_path = os.path.join(data_dir, "topic_graph.json")
+        # Try to load from the topic graph
         try:
-            if os.path.exists(graph_path) and os.path.getsize(graph_path) > 0:
-                with open(graph_path, "r") as f:
-                    graph_data = json.load(f)
+            if storage.document_exists('topic_graph'):
+                graph_data = await load_topic_graph_async()
                     
                 # Find the topic node
                 for node in graph_data.get("nodes", []):
@@ -4334,11 +4899,9 @@ async def get_topic_entries(topic_id: str, concise: bool = False):
         
         # If topic not found in graph, try topics.json
         if not topic_data:
-            topics_path = os.path.join(data_dir, "topics.json")
             try:
-                if os.path.exists(topics_path) and os.path.getsize(topics_path) > 0:
-                    with open(topics_path, "r") as f:
-                        topics_data = json.load(f)
+                if storage.document_exists('topics'):
+                    topics_data = await load_topics_data_async()
 
                     for collection_name in ("topics", "people"):
                         for topic in topics_data.get(collection_name, []):
@@ -4356,116 +4919,123 @@ async def get_topic_entries(topic_id: str, concise: bool = False):
         topic_name = topic_data.get("name", "Unknown Topic")
         
         # Load all entries
-        entries = load_entries()
+        entries = await load_entries_async()
         
-        # Find entries that mention this topic
-        related_entries = []
+        # Matching and excerpting touch every entry's text; do it off the event loop
+        def find_related():
+            # Find entries that mention this topic
+            related_entries = []
         
-        for entry in entries:
-            entry_content = entry.get("content", "")
-            entry_date = entry.get("createdAt", "")
+            topic_lower = topic_name.lower()
+            for entry in entries:
+                entry_date = entry.get("createdAt", "")
             
-            # Skip entries without content or date
-            if not entry_content or not entry_date:
-                continue
+                # Read once: every access to a record's content decodes it again
+                entry_content = entry.get("content") or ""
+                content_lower = entry_content.lower()
             
-            # Format the date as YYYY年MM月DD日
-            try:
-                date_obj = datetime.fromisoformat(entry_date.replace('Z', '+00:00'))
-                formatted_date = f"{date_obj.year}年{date_obj.month}月{date_obj.day}日"
-                sort_timestamp = date_obj.timestamp()
-            except Exception:
-                # Fallback to raw date
-                formatted_date = entry_date
-                sort_timestamp = 0
+                # Skip entries without content or date
+                if not content_lower or not entry_date:
+                    continue
             
-            # Check if topic is mentioned in the entry
-            if topic_name.lower() in entry_content.lower():
-                # Find a relevant excerpt containing the topic name
-                topic_lower = topic_name.lower()
-                content_lower = entry_content.lower()
+                # Check if topic is mentioned in the entry
+                if topic_lower in content_lower:
+                    meta = entry_store.meta(entry)
+                    # Format the date as YYYY年MM月DD日
+                    if meta['date'] is not None:
+                        year, month, day = meta['date'].split('-')
+                        formatted_date = f"{int(year)}年{int(month)}月{int(day)}日"
+                        sort_timestamp = meta['ts']
+                    else:
+                        # Fallback to raw date
+                        formatted_date = entry_date
+                        sort_timestamp = 0
+                
                 
-                if concise:
-                    # Extract a concise excerpt showing just the relevant text
-                    # Find all occurrences of the topic in the content
-                    positions = [m.start() for m in re.finditer(re.escape(topic_lower), content_lower)]
+                    if concise:
+                        # Extract a concise excerpt showing just the relevant text
+                        # Find all occurrences of the topic in the content
+                        positions = [m.start() for m in re.finditer(re.escape(topic_lower), content_lower)]
                     
-                    if positions:
-                        # Extract context around the first occurrence
-                        pos = positions[0]
+                        if positions:
+                            # Extract context around the first occurrence
+                            pos = positions[0]
                         
-                        # Determine the start and end of the excerpt
-                        excerpt_start = max(0, pos - 30)
-                        excerpt_end = min(len(entry_content), pos + len(topic_name) + 30)
+                            # Determine the start and end of the excerpt
+                            excerpt_start = max(0, pos - 30)
+                            excerpt_end = min(len(entry_content), pos + len(topic_name) + 30)
                         
-                        # Find sentence boundaries or stops to make the excerpt more natural
-                        # Chinese stops: 。 ！ ？  English stops: . ! ?
-                        stops = ['。', '！', '？', '.', '!', '?']
+                            # Find sentence boundaries or stops to make the excerpt more natural
+                            # Chinese stops: 。 ！ ？  English stops: . ! ?
+                            stops = ['。', '！', '？', '.', '!', '?']
                         
-                        # Check if there's a stop before the topic mention
-                        text_before = entry_content[excerpt_start:pos]
+                            # Check if there's a stop before the topic mention
+                            text_before = entry_content[excerpt_start:pos]
                         
-                        # Find the last stop before the topic
-                        last_stop_index = -1
-                        for stop in stops:
-                            stop_index = text_before.rfind(stop)
-                            if stop_index > last_stop_index:
-                                last_stop_index = stop_index
+                            # Find the last stop before the topic
+                            last_stop_index = -1
+                            for stop in stops:
+                                stop_index = text_before.rfind(stop)
+                                if stop_index > last_stop_index:
+                                    last_stop_index = stop_index
                         
-                        # If we found a stop, start from just after it
-                        if last_stop_index >= 0:
-                            excerpt_start = excerpt_start + last_stop_index + 1
-                            # Skip whitespace after the stop
-                            while excerpt_start < pos and entry_content[excerpt_start].isspace():
-                                excerpt_start += 1
+                            # If we found a stop, start from just after it
+                            if last_stop_index >= 0:
+                                excerpt_start = excerpt_start + last_stop_index + 1
+                                # Skip whitespace after the stop
+                                while excerpt_start < pos and entry_content[excerpt_start].isspace():
+                                    excerpt_start += 1
                         
-                        # For the ending boundary, find the next stop after the topic
-                        text_after = entry_content[pos + len(topic_name):excerpt_end]
+                            # For the ending boundary, find the next stop after the topic
+                            text_after = entry_content[pos + len(topic_name):excerpt_end]
                         
-                        # Find the first stop after the topic
-                        first_stop_index = len(text_after)
-                        for stop in stops:
-                            stop_index = text_after.find(stop)
-                            if stop_index >= 0 and stop_index < first_stop_index:
-                                first_stop_index = stop_index
+                            # Find the first stop after the topic
+                            first_stop_index = len(text_after)
+                            for stop in stops:
+                                stop_index = text_after.find(stop)
+                                if stop_index >= 0 and stop_index < first_stop_index:
+                                    first_stop_index = stop_index
                         
-                        # If we found a stop, end at it (including the stop)
-                        if first_stop_index < len(text_after):
-                            excerpt_end = pos + len(topic_name) + first_stop_index + 1
+                            # If we found a stop, end at it (including the stop)
+                            if first_stop_index < len(text_after):
+                                excerpt_end = pos + len(topic_name) + first_stop_index + 1
                         
-                        # Extract the context
-                        excerpt = entry_content[excerpt_start:excerpt_end].strip()
-                        highlighted_excerpt = highlight_topic_excerpt(excerpt, topic_name)
-                    else:
-                        # Fallback - should rarely happen
-                        excerpt = entry_content[:100] + "..." if len(entry_content) > 100 else entry_content
-                        highlighted_excerpt = highlight_topic_excerpt(excerpt, topic_name)
-                else:
-                    # Use a larger excerpt for full display
-                    if len(entry_content) > 500:
-                        # Find a section containing the topic
-                        topic_pos = content_lower.find(topic_lower)
-                        if topic_pos != -1:
-                            start_pos = max(0, topic_pos - 200)
-                            end_pos = min(len(entry_content), topic_pos + 300)
-                            excerpt = entry_content[start_pos:end_pos]
+                            # Extract the context
+                            excerpt = entry_content[excerpt_start:excerpt_end].strip()
+                            highlighted_excerpt = highlight_topic_excerpt(excerpt, topic_name)
                         else:
-                            excerpt = entry_content[:500] + "..."
+                            # Fallback - should rarely happen
+                            excerpt = entry_content[:100] + "..." if len(entry_content) > 100 else entry_content
+                            highlighted_excerpt = highlight_topic_excerpt(excerpt, topic_name)
                     else:
-                        excerpt = entry_content
+                        # Use a larger excerpt for full display
+                        if len(entry_content) > 500:
+                            # Find a section containing the topic
+                            topic_pos = content_lower.find(topic_lower)
+                            if topic_pos != -1:
+                                start_pos = max(0, topic_pos - 200)
+                                end_pos = min(len(entry_content), topic_pos + 300)
+                                excerpt = entry_content[start_pos:end_pos]
+                            else:
+                                excerpt = entry_content[:500] + "..."
+                        else:
+                            excerpt = entry_content
 
-                    highlighted_excerpt = highlight_topic_excerpt(excerpt, topic_name)
+                        highlighted_excerpt = highlight_topic_excerpt(excerpt, topic_name)
                 
-                related_entries.append({
-                    'id': entry.get('id'),
-                    'date': formatted_date,
-                    'title': f"{topic_name} - {formatted_date}",
-                    'excerpt': highlighted_excerpt,
-                    'sortTimestamp': sort_timestamp
-                })
+                    related_entries.append({
+                        'id': entry.get('id'),
+                        'date': formatted_date,
+                        'title': f"{topic_name} - {formatted_date}",
+                        'excerpt': highlighted_excerpt,
+                        'sortTimestamp': sort_timestamp
+                    })
         
-        # Sort entries by date (newest first)
-        related_entries.sort(key=lambda x: x['sortTimestamp'], reverse=True)
+            # Sort entries by date (newest first)
+            related_entries.sort(key=lambda x: x['sortTimestamp'], reverse=True)
+            return related_entries
+
+        related_entries = await run_io(find_related)
 
         for related_entry in related_entries:
             related_entry.pop('sortTimestamp', None)
@@ -4509,45 +5079,37 @@ def categorize_mood(mood):
 def analyze_almanac_patterns_with_data(entries, almanac_data_list, start_date=None, end_date=None, min_occurrences=3):
     """Analyze patterns between almanac elements and moods/activities using provided almanac data"""
     try:
-        # Create a mapping of date to almanac data
+        # Create a mapping of local epoch day to almanac data
         almanac_map = {}
         for almanac_entry in almanac_data_list:
-            date_key = almanac_entry['date'][:10]  # Use YYYY-MM-DD format
-            almanac_map[date_key] = {
+            day = epoch_day_from_param(almanac_entry['date'][:10])  # Use YYYY-MM-DD format
+            almanac_map[day] = {
                 'recommends': almanac_entry['recommends'],
                 'avoids': almanac_entry['avoids']
             }
         
         # Filter entries by date range if specified
-        filtered_entries = entries
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            filtered_entries = [e for e in filtered_entries if datetime.fromisoformat(e['createdAt'].replace('Z', '+00:00')) >= start_dt]
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            filtered_entries = [e for e in filtered_entries if datetime.fromisoformat(e['createdAt'].replace('Z', '+00:00')) <= end_dt]
+        columns = entry_store.columns_for(entries)
+        start_ts = int(parse_created_at(start_date).timestamp()) if start_date else None
+        end_ts = int(parse_created_at(end_date).timestamp()) if end_date else None
+        in_range = columns.mask(start_ts, end_ts)
+        total_entries = int(in_range.sum())
+        
+        # Only entries with moods on a day that has almanac data take part
+        almanac_days = np.fromiter(almanac_map.keys(), dtype=np.int32, count=len(almanac_map))
+        matched = in_range & (columns.mood_count > 0) & np.isin(columns.day, almanac_days)
         
         # Data structures to store analysis
         recommends_data = {}
         avoids_data = {}
         
-        # Process each entry
-        for entry in filtered_entries:
+        # Process each matching entry
+        for row in np.flatnonzero(matched):
+            entry = entries[row]
             try:
-                entry_date = datetime.fromisoformat(entry['createdAt'].replace('Z', '+00:00'))
-                date_key = entry_date.strftime('%Y-%m-%d')
-                
-                # Get almanac data for this date
-                if date_key not in almanac_map:
-                    continue
-                
-                almanac = almanac_map[date_key]
+                almanac = almanac_map[int(columns.day[row])]
                 moods = entry.get('moods', [])
                 
-                # Skip if no moods
-                if not moods:
-                    continue
-                
                 # Process recommends
                 for item in almanac['recommends']:
                     if item not in recommends_data:
@@ -4617,15 +5179,16 @@ def analyze_almanac_patterns_with_data(entries, almanac_data_list, start_date=No
         avoids_result = calculate_stats(avoids_data)
         
         # Calculate date range
-        if filtered_entries:
-            dates = [datetime.fromisoformat(e['createdAt'].replace('Z', '+00:00')) for e in filtered_entries]
-            date_range = f"{min(dates).strftime('%Y-%m-%d')} 至 {max(dates).strftime('%Y-%m-%d')}"
+        if total_entries:
+            days = columns.day[in_range]
+            first, last = (date(1970, 1, 1) + timedelta(days=int(day)) for day in (days.min(), days.max()))
+            date_range = f"{first.strftime('%Y-%m-%d')} 至 {last.strftime('%Y-%m-%d')}"
         else:
             date_range = "无数据"
         
         return {
             'summary': {
-                'total_entries': len(filtered_entries),
+                'total_entries': total_entries,
                 'date_range': date_range,
                 'unique_recommends': len(recommends_result),
                 'unique_avoids': len(avoids_result)
@@ -4652,22 +5215,25 @@ async def post_almanac_analysis(request: AlmanacAnalysisRequest):
     Analyze correlations between almanac elements (recommends/avoids) and user moods/activities
     Accepts almanac data from frontend since tyme4ts is a JavaScript library
     """
+    try:
+        start_dt = parse_created_at(request.start_date) if request.start_date else None
+        end_dt = parse_created_at(request.end_date) if request.end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
     try:
         ensure_data_file()
         
-        # Load entries
-        with open(data_path, 'r') as f:
-            entries = json.load(f)
+        # Load only the entries inside the requested window from the date index
+        entries = await run_io(entry_store.between, start_dt, end_dt)
         
         # Convert almanac data to dict format
         almanac_data_list = [item.dict() for item in request.almanac_data]
         
-        # Perform analysis
+        # Perform analysis (the date window has already been applied)
         analysis_result = analyze_almanac_patterns_with_data(
             entries,
             almanac_data_list,
-            start_date=request.start_date,
-            end_date=request.end_date,
             min_occurrences=request.min_occurrences
         )
         
@@ -0,0 +1,484 @@
+"""
+Pluggable storage backends for the diary server.
+
+A backend persists the diary entries plus the four topic documents
+(``topic_graph``, ``topics``, ``topic_config`` and ``topic_suggestions``).
+
+- ``JsonStorageBackend`` keeps plain files under ``data/``: entries in
+  month-partitioned JSONL files (``data/entries/``) with their content in a
+  memory-mapped blob file beside them, and one JSON file per document,
+  written through a group-committing ``DocumentWriter``. A legacy
+  ``entries.json`` is split into partitions on startup, and months older
+  than ``cold_after_days`` are kept gzip-compressed.
+- ``SqliteStorageBackend`` stores everything in a single SQLite database with
+  proper tables and an FTS5 index over entry content for mention lookups.
+
+Both backends offer ``editing(name)`` for read-modify-write updates of a
+document that must not race with other writers, and ``document_version(name)``
+for caches and ETags derived from a document.
+
+Select a backend with ``STORAGE_BACKEND=json|sqlite``. Existing JSON data can
+be imported into SQLite with::
+
+    python storage_backends.py migrate --data-dir ./data --db ./data/diary.db
+"""
+import argparse
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from document_writer import DocumentWriter
+from entry_partitions import PartitionedEntryLog, partition_days
+
+DOCUMENT_NAMES = ('topic_graph', 'topics', 'topic_config', 'topic_suggestions')
+
+
+class JsonStorageBackend:
+    """Entries in monthly JSONL partitions, documents as individual JSON files"""
+
+    name = 'json'
+
+    def __init__(self, data_dir, cold_after_days=None):
+        self.data_dir = Path(data_dir)
+        self.entries_dir = self.data_dir / 'entries'
+        self.entry_log = PartitionedEntryLog(self.entries_dir, cold_after_days=cold_after_days)
+        # Pre-partitioning layout, imported once by initialize()
+        self.legacy_entries_path = self.data_dir / 'entries.json'
+        self.legacy_journal_path = self.data_dir / 'entries.journal.jsonl'
+        self.document_paths = {
+            'topic_graph': self.data_dir / 'topic_graph.json',
+            'topics': self.data_dir / 'topics.json',
+            'topic_config': self.data_dir / 'topic_config.json',
+            'topic_suggestions': self.data_dir / 'topic_suggestions.json',
+        }
+        self.documents = {name: DocumentWriter(path) for name, path in self.document_paths.items()}
+
+    def describe(self, name=None):
+        path = self.document_paths[name] if name else self.entries_dir
+        return str(path.absolute())
+
+    def initialize(self):
+        """Create the data directory and the entry partitions, importing a legacy entries.json"""
+        if not self.data_dir.exists():
+            print(f"Creating data directory at {self.data_dir.absolute()}")
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.entry_log.exists():
+            if not self.entry_log.blobs.exists():
+                print(f"Moving entry content into {self.entry_log.blobs.blob_path.absolute()}")
+                self.entry_log.externalize_content()
+            self.entry_log.apply_tiering()
+            return
+
+        if self.legacy_entries_path.exists() or self.legacy_journal_path.exists():
+            print(f"Splitting {self.legacy_entries_path.absolute()} into monthly partitions")
+            self.entry_log.import_legacy(self.legacy_entries_path, self.legacy_journal_path)
+        else:
+            print(f"Creating new entry partitions at {self.entries_dir.absolute()}")
+            self.entry_log.initialize()
+
+    # Entries
+
+    def read_all(self, first_day=None):
+        return self.entry_log.read_all(first_day)
+
+    def hot_from_day(self):
+        """First epoch day held uncompressed; older entries are only read on demand"""
+        return self.entry_log.hot_from_day()
+
+    def read_range(self, first_day=None, last_day=None):
+        return self.entry_log.read_range(first_day, last_day)
+
+    def month_ranges(self, first_day=None, last_day=None):
+        """(first, last) epoch days of the month partitions overlapping [first_day, last_day], oldest first"""
+        return [partition_days(key) for key in self.entry_log.keys_for_days(first_day, last_day)]
+
+    def append_many(self, entries, previous=None):
+        self.entry_log.append_many(entries, previous)
+
+    def changed_externally(self):
+        return self.entry_log.changed_externally()
+
+    def search_mentions(self, term):
+        """No text index in the JSON layout; callers scan the resident entries"""
+        return None
+
+    # Documents
+
+    def document_exists(self, name):
+        return self.documents[name].exists()
+
+    def load_document(self, name):
+        return self.documents[name].read()
+
+    def document_version(self, name):
+        """Changes with every save and with edits made to the file by hand; the server derives ETags from it"""
+        return self.documents[name].version()
+
+    def save_document(self, name, data):
+        self.documents[name].write(data)
+
+    @contextmanager
+    def editing(self, name):
+        """Yield a copy of a document and commit it when the block succeeds, serialized with other writers"""
+        writer = self.documents[name]
+        with writer.edit_lock:
+            data = writer.read()
+            yield data
+            self.save_document(name, data)
+
+    def flush(self):
+        """Write pending document changes to disk"""
+        for writer in self.documents.values():
+            writer.flush()
+
+
+class SqliteStorageBackend:
+    """Entries, topic nodes/edges, config and suggestions in one SQLite database"""
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER NOT NULL,
+            created_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_id ON entries(id);
+        CREATE INDEX IF NOT EXISTS idx_entries_created_at ON entries(created_at);
+
+        CREATE TABLE IF NOT EXISTS documents (
+            name TEXT PRIMARY KEY,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+
+        CREATE TABLE IF NOT EXISTS topic_nodes (
+            document TEXT NOT NULL,
+            collection TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            id TEXT,
+            name TEXT,
+            type TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (document, collection, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_topic_nodes_id ON topic_nodes(id);
+
+        CREATE TABLE IF NOT EXISTS topic_edges (
+            document TEXT NOT NULL,
+            collection TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            source TEXT,
+            target TEXT,
+            type TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (document, collection, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_topic_edges_source ON topic_edges(source);
+        CREATE INDEX IF NOT EXISTS idx_topic_edges_target ON topic_edges(target);
+
+        CREATE TABLE IF NOT EXISTS topic_config (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS topic_suggestions (
+            status TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            id TEXT,
+            name TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (status, position)
+        );
+    """
+
+    # Which keys of each document are stored as rows of which table
+    NODE_COLLECTIONS = {'topic_graph': ('nodes',), 'topics': ('topics', 'people')}
+    EDGE_COLLECTIONS = {'topic_graph': ('edges',), 'topics': ('relations',)}
+    SUGGESTION_STATUSES = ('pending_review', 'auto_approved', 'rejected')
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.lock = threading.RLock()
+        self.conn = None
+        self.trigram = False
+        self.known_data_version = None
+        # Bumped on every save; the server derives ETags from these
+        self.document_versions = dict.fromkeys(DOCUMENT_NAMES, 0)
+        # Per-document locks serializing read-modify-write edits
+        self.edit_locks = {name: threading.RLock() for name in DOCUMENT_NAMES}
+
+    def describe(self, name=None):
+        return f"{self.db_path.absolute()}" + (f" ({name})" if name else "")
+
+    def initialize(self):
+        with self.lock:
+            if self.conn is not None:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+
+            # The trigram tokenizer gives substring matching, which is what a
+            # topic mention check is; older SQLite builds fall back to scanning
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                    "USING fts5(content, tokenize='trigram case_sensitive 0')"
+                )
+                self.trigram = True
+            except sqlite3.OperationalError:
+                conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(content)")
+                self.trigram = False
+            conn.commit()
+            self.conn = conn
+
+    def _connection(self):
+        if self.conn is None:
+            self.initialize()
+        return self.conn
+
+    # Entries
+
+    def read_all(self):
+        with self.lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT data FROM entries ORDER BY seq").fetchall()
+            self.known_data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+        return [json.loads(data) for (data,) in rows]
+
+    def _upsert_entry(self, conn, entry):
+        data = json.dumps(dict(entry), ensure_ascii=False)
+        row = conn.execute("SELECT MIN(seq) FROM entries WHERE id = ?", (entry.get('id'),)).fetchone()
+        if row[0] is None:
+            cursor = conn.execute(
+                "INSERT INTO entries (id, created_at, data) VALUES (?, ?, ?)",
+                (entry.get('id'), entry.get('createdAt'), data)
+            )
+            seq = cursor.lastrowid
+        else:
+            seq = row[0]
+            conn.execute(
+                "UPDATE entries SET created_at = ?, data = ? WHERE seq = ?",
+                (entry.get('createdAt'), data, seq)
+            )
+            conn.execute("DELETE FROM entries_fts WHERE rowid = ?", (seq,))
+        conn.execute("INSERT INTO entries_fts (rowid, content) VALUES (?, ?)", (seq, entry.get('content', '')))
+
+    def append_many(self, entries, previous=None):
+        # Rows are updated in place by id, so ``previous`` is not needed
+        if not entries:
+            return
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                for entry in entries:
+                    self._upsert_entry(conn, entry)
+
+    def replace_all_entries(self, entries):
+        """Replace every entry (used by the migration), keeping duplicate ids as separate rows"""
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM entries")
+                conn.execute("DELETE FROM entries_fts")
+                for entry in entries:
+                    cursor = conn.execute(
+                        "INSERT INTO entries (id, created_at, data) VALUES (?, ?, ?)",
+                        (entry.get('id'), entry.get('createdAt'), json.dumps(dict(entry), ensure_ascii=False))
+                    )
+                    conn.execute(
+                        "INSERT INTO entries_fts (rowid, content) VALUES (?, ?)",
+                        (cursor.lastrowid, entry.get('content', ''))
+                    )
+
+    def changed_externally(self):
+        # data_version only moves when another connection commits
+        with self.lock:
+            conn = self._connection()
+            return conn.execute("PRAGMA data_version").fetchone()[0] != self.known_data_version
+
+    def search_mentions(self, term):
+        """
+        Ids of entries whose content contains ``term`` (case-insensitive), in
+        creation order, or None when the index cannot answer the query.
+        """
+        # Trigrams need at least three characters to match anything
+        if not self.trigram or len(term) < 3:
+            return None
+
+        phrase = '"' + term.replace('"', '""') + '"'
+        with self.lock:
+            rows = self._connection().execute(
+                "SELECT e.id FROM entries_fts JOIN entries e ON e.seq = entries_fts.rowid "
+                "WHERE entries_fts MATCH ? ORDER BY e.seq",
+                (phrase,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # Documents
+
+    def document_exists(self, name):
+        with self.lock:
+            row = self._connection().execute("SELECT 1 FROM documents WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def load_document(self, name):
+        with self.lock:
+            conn = self._connection()
+            row = conn.execute("SELECT extra FROM documents WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"No {name} document in {self.db_path}")
+            document = json.loads(row[0])
+
+            if name == 'topic_config':
+                for key, value in conn.execute("SELECT key, value FROM topic_config"):
+                    document[key] = json.loads(value)
+            elif name == 'topic_suggestions':
+                for status in self.SUGGESTION_STATUSES:
+                    if status in document:
+                        document[status] = []
+                for status, data in conn.execute(
+                    "SELECT status, data FROM topic_suggestions ORDER BY status, position"
+                ):
+                    document.setdefault(status, []).append(json.loads(data))
+            else:
+                for collection in self.NODE_COLLECTIONS[name]:
+                    rows = conn.execute(
+                        "SELECT data FROM topic_nodes WHERE document = ? AND collection = ? ORDER BY position",
+                        (name, collection)
+                    ).fetchall()
+                    if rows or collection in document:
+                        document[collection] = [json.loads(data) for (data,) in rows]
+                for collection in self.EDGE_COLLECTIONS[name]:
+                    rows = conn.execute(
+                        "SELECT data FROM topic_edges WHERE document = ? AND collection = ? ORDER BY position",
+                        (name, collection)
+                    ).fetchall()
+                    if rows or collection in document:
+                        document[collection] = [json.loads(data) for (data,) in rows]
+
+        return document
+
+    def save_document(self, name, data):
+        # Row-backed keys are kept in "extra" as empty markers so that the
+        # loaded document has the same keys that were saved
+        extra = {}
+        with self.lock:
+            conn = self._connection()
+            with conn:
+                if name == 'topic_config':
+                    conn.execute("DELETE FROM topic_config")
+                    conn.executemany(
+                        "INSERT INTO topic_config (key, value) VALUES (?, ?)",
+                        [(key, json.dumps(value, ensure_ascii=False)) for key, value in data.items()]
+                    )
+                elif name == 'topic_suggestions':
+                    conn.execute("DELETE FROM topic_suggestions")
+                    for key, value in data.items():
+                        if key in self.SUGGESTION_STATUSES and isinstance(value, list):
+                            extra[key] = []
+                            conn.executemany(
+                                "INSERT INTO topic_suggestions (status, position, id, name, data) VALUES (?, ?, ?, ?, ?)",
+                                [(key, position, item.get('id'), item.get('name'), json.dumps(item, ensure_ascii=False))
+                                 for position, item in enumerate(value)]
+                            )
+                        else:
+                            extra[key] = value
+                else:
+                    conn.execute("DELETE FROM topic_nodes WHERE document = ?", (name,))
+                    conn.execute("DELETE FROM topic_edges WHERE document = ?", (name,))
+                    for key, value in data.items():
+                        if key in self.NODE_COLLECTIONS[name] and isinstance(value, list):
+                            extra[key] = []
+                            conn.executemany(
+                                "INSERT INTO topic_nodes (document, collection, position, id, name, type, data) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                [(name, key, position, node.get('id'), node.get('name'), node.get('type'),
+                                  json.dumps(node, ensure_ascii=False))
+                                 for position, node in enumerate(value)]
+                            )
+                        elif key in self.EDGE_COLLECTIONS[name] and isinstance(value, list):
+                            extra[key] = []
+                            conn.executemany(
+                                "INSERT INTO topic_edges (document, collection, position, source, target, type, data) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                [(name, key, position, edge.get('source'), edge.get('target'), edge.get('type'),
+                                  json.dumps(edge, ensure_ascii=False))
+                                 for position, edge in enumerate(value)]
+                            )
+                        else:
+                            extra[key] = value
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (name, extra) VALUES (?, ?)",
+                    (name, json.dumps(extra, ensure_ascii=False))
+                )
+            self.document_versions[name] += 1
+
+    def document_version(self, name):
+        """Bumped on every save; the server derives ETags from it"""
+        return self.document_versions[name]
+
+    @contextmanager
+    def editing(self, name):
+        """Yield a copy of a document and commit it when the block succeeds, serialized with other edits"""
+        with self.edit_locks[name]:
+            data = self.load_document(name)
+            yield data
+            self.save_document(name, data)
+
+    def flush(self):
+        """Every save is its own transaction; nothing is buffered"""
+
+
+def create_storage_backend(kind, data_dir, db_path=None, cold_after_days=None):
+    """Build the backend selected by STORAGE_BACKEND"""
+    if kind == 'sqlite':
+        return SqliteStorageBackend(db_path or Path(data_dir) / 'diary.db')
+    if kind != 'json':
+        print(f"Unknown storage backend '{kind}', falling back to json")
+    return JsonStorageBackend(data_dir, cold_after_days=cold_after_days)
+
+
+def migrate_json_to_sqlite(data_dir, db_path):
+    """Import the JSON data files into a SQLite database, replacing its contents"""
+    source = JsonStorageBackend(data_dir)
+    source.initialize()
+    target = SqliteStorageBackend(db_path)
+    target.initialize()
+
+    entries = source.read_all()
+    target.replace_all_entries(entries)
+    print(f"Imported {len(entries)} entries")
+
+    for name in DOCUMENT_NAMES:
+        if not source.document_exists(name):
+            print(f"Skipping {name}: {source.describe(name)} does not exist")
+            continue
+        try:
+            target.save_document(name, source.load_document(name))
+            print(f"Imported {name}")
+        except json.JSONDecodeError as e:
+            print(f"Skipping {name}: invalid JSON ({e})")
+
+    print(f"Migration complete: {target.describe()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diary storage maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Import the JSON data files into SQLite")
+    migrate_parser.add_argument("--data-dir", default="./data")
+    migrate_parser.add_argument("--db", default=None, help="Database path (default: <data-dir>/diary.db)")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_json_to_sqlite(args.data_dir, args.db or Path(args.data_dir) / 'diary.db')
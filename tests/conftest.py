@@ -0,0 +1,24 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """The server module, imported from a scratch directory so its ./data stays there"""
+    os.environ['USE_AI_FOR_TOPICS'] = 'false'
+    os.chdir(tmp_path_factory.mktemp('server'))
+    import server as module
+    return module
+
+
+@pytest.fixture(scope='session')
+def client(server):
+    from fastapi.testclient import TestClient
+    with TestClient(server.app) as client:
+        yield client
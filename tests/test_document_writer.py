@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+from document_writer import DocumentWriter
+from storage_backends import JsonStorageBackend
+
+
+def test_writes_in_one_window_are_committed_together(tmp_path):
+    path = tmp_path / 'topics.json'
+    writer = DocumentWriter(path, commit_delay=60)
+    for i in range(10):
+        writer.write({'topics': list(range(i + 1))})
+
+    # Readers see the latest commit before it reaches the disk
+    assert writer.read() == {'topics': list(range(10))}
+    assert not path.exists() and writer.writes == 0
+
+    writer.flush()
+    assert json.loads(path.read_text()) == {'topics': list(range(10))}
+    assert writer.writes == 1
+    writer.flush()
+    assert writer.writes == 1
+
+
+def test_pending_changes_are_written_after_the_commit_delay(tmp_path):
+    path = tmp_path / 'topics.json'
+    writer = DocumentWriter(path, commit_delay=0.05)
+    writer.write({'topics': ['first']})
+    writer.write({'topics': ['second']})
+
+    deadline = time.monotonic() + 5
+    while writer.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.writes == 1
+    assert json.loads(path.read_text()) == {'topics': ['second']}
+
+
+def test_hand_edits_move_the_version_on(tmp_path):
+    path = tmp_path / 'topics.json'
+    writer = DocumentWriter(path, commit_delay=60)
+    writer.write({'topics': []})
+    writer.flush()
+    version = writer.version()
+    assert writer.read() == {'topics': []}
+
+    path.write_text('{"topics": ["edited by hand"]}')
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+
+    assert writer.version() > version
+    assert writer.read() == {'topics': ['edited by hand']}
+
+
+def test_concurrent_edits_are_serialized(tmp_path):
+    backend = JsonStorageBackend(tmp_path)
+    backend.initialize()
+    backend.save_document('topic_config', {'count': 0})
+
+    def increment():
+        for _ in range(50):
+            with backend.editing('topic_config') as config:
+                count = config['count']
+                time.sleep(0)
+                config['count'] = count + 1
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.load_document('topic_config') == {'count': 200}
+    backend.flush()
+    assert json.loads((tmp_path / 'topic_config.json').read_text()) == {'count': 200}
+    # 200 edits reach the disk as a handful of group writes
+    assert backend.documents['topic_config'].writes <= 2
@@ -0,0 +1,39 @@
+import json
+
+from document_writer import DocumentWriter
+
+GRAPH_QUERY = {"query": "{ topicGraph { topics { id name } } }"}
+
+
+def test_hand_edit_moves_the_version(tmp_path):
+    path = tmp_path / 'topics.json'
+    writer = DocumentWriter(path, commit_delay=60)
+    writer.write({"topics": [1]})
+    writer.flush()
+    version = writer.version()
+    assert writer.read() == {"topics": [1]}
+    assert writer.version() == version
+
+    path.write_text(json.dumps({"topics": [1, 2]}))
+    assert writer.version() != version
+    assert writer.read() == {"topics": [1, 2]}
+
+
+def test_hand_edited_graph_is_served_with_a_new_etag(server, client):
+    def graph(name):
+        return {"nodes": [{"id": "topic_hand", "name": name, "type": "topic", "category": "activities"}],
+                "links": []}
+
+    server.storage.save_document('topic_graph', graph("hiking"))
+    server.storage.flush()
+    first = client.post('/graphql', json=GRAPH_QUERY)
+    assert [topic['name'] for topic in first.json()['data']['topicGraph']['topics']] == ["hiking"]
+    etag = first.headers['etag']
+    assert client.post('/graphql', json=GRAPH_QUERY, headers={'If-None-Match': etag}).status_code == 304
+
+    path = server.storage.document_paths['topic_graph']
+    path.write_text(json.dumps(graph("climbing in the alps")), encoding='utf-8')
+    second = client.post('/graphql', json=GRAPH_QUERY, headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.headers['etag'] != etag
+    assert [topic['name'] for topic in second.json()['data']['topicGraph']['topics']] == ["climbing in the alps"]
@@ -0,0 +1,101 @@
+import multiprocessing
+
+from entry_blobs import READ_CACHE_ROWS, UNDATED, ContentBlobStore, ContentRef
+from entry_columns import EntryColumns
+from entry_enrichment import enrich_entry
+from entry_partitions import PartitionedEntryLog
+from entry_record import EntryRecord
+
+
+def test_empty_content_survives_a_restart(tmp_path):
+    log = PartitionedEntryLog(tmp_path)
+    log.initialize()
+    log.append_many([
+        {'id': 1, 'createdAt': '2026-10-01T09:00:00', 'content': ''},
+        {'id': 2, 'createdAt': '2026-10-02T09:00:00', 'content': ''},
+    ])
+    log.close()
+
+    # Nothing but empty content was written, so the blob file itself is empty
+    assert (tmp_path / 'content.blob').stat().st_size == 0
+    reopened = PartitionedEntryLog(tmp_path)
+    assert [(entry['id'], entry['content']) for entry in reopened.read_all()] == [(1, ''), (2, '')]
+    assert bytes(reopened.blobs.view(0)) == b''
+
+
+def _append_from_process(directory, worker, batches):
+    store = ContentBlobStore(directory)
+    for batch in range(batches):
+        store.append_many([
+            (worker * 1000 + batch * 10 + i, UNDATED, f"worker {worker} batch {batch} item {i} " * (i + 1))
+            for i in range(5)
+        ])
+    store.close()
+
+
+def test_processes_appending_to_one_store_do_not_overlap(tmp_path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_append_from_process, args=(tmp_path, worker, 40)) for worker in (1, 2)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    store = ContentBlobStore(tmp_path)
+    index = store.index()
+    assert len(index) == 2 * 40 * 5
+    # Every row points at its own bytes: the blob is the rows laid end to end
+    order = index['offset'].argsort()
+    assert (index['offset'][order][1:] == (index['offset'] + index['length'])[order][:-1]).all()
+    for row, (entry_id, _, _, _) in enumerate(index.tolist()):
+        worker, batch, i = entry_id // 1000, entry_id % 1000 // 10, entry_id % 10
+        assert store.read(row) == f"worker {worker} batch {batch} item {i} " * (i + 1)
+
+
+def test_torn_index_tail_is_cut_off_on_open(tmp_path):
+    store = ContentBlobStore(tmp_path)
+    first = store.append_many([(1, UNDATED, 'kept'), (2, UNDATED, 'also kept')])
+    store.close()
+    with open(tmp_path / 'content.idx', 'ab') as f:
+        f.write(b'\x07' * 11)
+
+    store = ContentBlobStore(tmp_path)
+    assert len(store.index()) == 2
+    assert (tmp_path / 'content.idx').stat().st_size == 2 * 28
+    assert store.append_many([(3, UNDATED, 'after the crash')]) == first + 2
+    assert [store.read(row) for row in range(3)] == ['kept', 'also kept', 'after the crash']
+
+
+def test_columns_take_content_lengths_from_the_index(tmp_path, monkeypatch):
+    log = PartitionedEntryLog(tmp_path)
+    log.initialize()
+    log.append_many([
+        {'id': 1, 'createdAt': '2026-10-01T09:00:00', 'content': 'plain'},
+        {'id': 2, 'createdAt': '2026-10-02T09:00:00', 'content': '今天爬山'},
+    ])
+    entries = log.read_all()
+    metas = [enrich_entry(entry) for entry in entries]
+
+    def no_decoding(self, row):
+        raise AssertionError('content was decoded')
+    monkeypatch.setattr(ContentBlobStore, 'read', no_decoding)
+
+    assert EntryColumns.build(entries, metas).length.tolist() == [5, 12]
+
+
+def test_recently_read_content_is_decoded_once(tmp_path):
+    store = ContentBlobStore(tmp_path)
+    first = store.append_many([(i, UNDATED, f"entry {i}") for i in range(READ_CACHE_ROWS + 1)])
+
+    text = store.read(first)
+    assert store.read(first) is text
+    for row in range(first + 1, first + READ_CACHE_ROWS + 1):
+        store.read(row)
+    # The cache stays bounded: the oldest row was dropped and is decoded afresh
+    assert len(store._decoded) == READ_CACHE_ROWS
+    assert store.read(first) == text and store.read(first) is not text
+
+    record = EntryRecord({'id': 1, 'content': ContentRef(store, first + 1)})
+    assert record.content_length() == len('entry 1')
+    assert EntryRecord({'id': 2, 'content': '爬山'}).content_length() == 6
@@ -0,0 +1,188 @@
+import gzip
+import json
+from datetime import date
+
+from entry_enrichment import enrich_entry
+from entry_partitions import PartitionedEntryLog
+from entry_store import EPOCH_ORDINAL, EntryStore, entry_version
+from storage_backends import JsonStorageBackend
+
+
+def epoch_day(year, month, day):
+    return date(year, month, day).toordinal() - EPOCH_ORDINAL
+
+
+def entry(entry_id, created_at, content):
+    return {'id': entry_id, 'createdAt': created_at, 'content': content}
+
+
+def test_entries_land_in_month_partitions_listed_by_the_manifest(tmp_path):
+    log = PartitionedEntryLog(tmp_path)
+    log.initialize()
+    log.append_many([
+        entry(1, '2026-09-14T10:00:00', 'September'),
+        entry(2, '2026-10-14T10:00:00', 'October'),
+        entry(3, 'not a date', 'Undated'),
+    ])
+    log.close()
+
+    manifest = json.loads((tmp_path / 'manifest.json').read_text())
+    assert [(item['month'], item['file'], item['tier']) for item in manifest['partitions']] == [
+        ('2026-09', '2026-09.jsonl', 'hot'),
+        ('2026-10', '2026-10.jsonl', 'hot'),
+        ('undated', 'undated.jsonl', 'hot'),
+    ]
+    # Partitions only hold metadata; the text is in the blob file
+    record = json.loads((tmp_path / '2026-10.jsonl').read_text())
+    assert record['entry']['content'] is None and isinstance(record['blob'], int)
+
+
+def test_update_is_appended_to_the_partition_holding_the_entry(tmp_path):
+    log = PartitionedEntryLog(tmp_path)
+    log.initialize()
+    log.append_many([entry(1, '2026-09-14T10:00:00', 'first draft')])
+    log.close()
+
+    log = PartitionedEntryLog(tmp_path)
+    log.read_all()
+    log.append_many([entry(1, '2026-09-14T10:00:00', 'second draft')])
+    log.close()
+
+    assert len((tmp_path / '2026-09.jsonl').read_bytes().splitlines()) == 2
+    reopened = PartitionedEntryLog(tmp_path)
+    assert [(e['id'], e['content']) for e in reopened.read_all()] == [(1, 'second draft')]
+
+
+def test_redated_entry_moves_to_the_partition_of_its_new_month(tmp_path):
+    log = PartitionedEntryLog(tmp_path)
+    log.initialize()
+    log.append_many([entry(1, '2026-09-14T10:00:00', 'first draft'), entry(2, '2026-09-15T10:00:00', 'stays')])
+    log.append_many([entry(1, '2026-10-02T10:00:00', 'moved to October')])
+
+    assert [e['id'] for e in log.read_range(epoch_day(2026, 9, 1), epoch_day(2026, 9, 30))] == [2]
+    assert [e['content'] for e in log.read_range(epoch_day(2026, 10, 1), epoch_day(2026, 10, 31))] == ['moved to October']
+    log.close()
+
+    # A reader that never cached September learns the old month from ``previous``
+    reopened = PartitionedEntryLog(tmp_path)
+    moved = entry(1, '2026-10-02T10:00:00', 'moved to October')
+    reopened.append_many([entry(1, '2026-08-30T10:00:00', 'and to August')], previous={1: moved})
+    reopened.close()
+
+    log = PartitionedEntryLog(tmp_path)
+    assert [(e['id'], e['content']) for e in log.read_all()] == [(1, 'and to August'), (2, 'stays')]
+    for month in (9, 10):
+        assert [e['id'] for e in log.read_range(epoch_day(2026, month, 1), epoch_day(2026, month, 28))] == (
+            [2] if month == 9 else [])
+    # Compaction drops the removed entry and its tombstone
+    log.compact_partition('2026-10')
+    assert (tmp_path / '2026-10.jsonl').read_bytes() == b''
+
+
+def test_read_range_opens_only_the_overlapping_months(tmp_path):
+    log = PartitionedEntryLog(tmp_path)
+    log.initialize()
+    log.append_many([entry(month, f'2026-{month:02d}-14T10:00:00', f'month {month}') for month in (7, 8, 9)])
+    log.close()
+
+    reopened = PartitionedEntryLog(tmp_path)
+    entries = reopened.read_range(epoch_day(2026, 8, 1), epoch_day(2026, 8, 31))
+    assert [e['content'] for e in entries] == ['month 8']
+    assert sorted(key for key, partition in reopened.partitions.items() if partition.loaded) == ['2026-08']
+
+
+def frozen_log(directory):
+    """A log with January 2020 in the cold tier and May 2020 still hot"""
+    # Written without tiering so no background pass races the one below
+    log = PartitionedEntryLog(directory)
+    log.initialize()
+    log.append_many([
+        entry(1, '2020-01-14T10:00:00', 'winter'),
+        entry(2, '2020-05-20T10:00:00', 'spring'),
+    ])
+    log.cold_after_days = 30
+    log.apply_tiering(today=epoch_day(2020, 6, 1))
+    return log
+
+
+def test_cold_months_are_read_back_after_a_restart(tmp_path):
+    frozen_log(tmp_path).close()
+
+    assert not (tmp_path / '2020-01.jsonl').exists()
+    assert len(gzip.decompress((tmp_path / '2020-01.jsonl.gz').read_bytes()).splitlines()) == 1
+    tiers = {item['month']: item['tier'] for item in json.loads((tmp_path / 'manifest.json').read_text())['partitions']}
+    assert tiers == {'2020-01': 'cold', '2020-05': 'hot'}
+
+    reopened = PartitionedEntryLog(tmp_path, cold_after_days=30)
+    hot_from = reopened.hot_from_day()
+    assert hot_from == epoch_day(2020, 2, 1)
+    assert [e['content'] for e in reopened.read_all(hot_from)] == ['spring']
+    assert not reopened.partitions['2020-01'].loaded
+    assert [e['content'] for e in reopened.read_all()] == ['winter', 'spring']
+
+
+def test_cold_entry_update_goes_to_a_tail_next_to_the_segment(tmp_path):
+    frozen_log(tmp_path).close()
+    segment = (tmp_path / '2020-01.jsonl.gz').read_bytes()
+
+    log = PartitionedEntryLog(tmp_path, cold_after_days=30)
+    log.read_all()
+    log.append_many([entry(1, '2020-01-14T10:00:00', 'winter, revised')])
+    log.close()
+
+    assert (tmp_path / '2020-01.jsonl.gz').read_bytes() == segment
+    assert len((tmp_path / '2020-01.jsonl').read_bytes().splitlines()) == 1
+    reopened = PartitionedEntryLog(tmp_path, cold_after_days=30)
+    assert [(e['id'], e['content']) for e in reopened.read_all()] == [(1, 'winter, revised'), (2, 'spring')]
+
+    # Compacting a cold partition folds the tail back into its segment
+    reopened.compact_partition('2020-01')
+    assert not (tmp_path / '2020-01.jsonl').exists()
+    assert [e['content'] for e in PartitionedEntryLog(tmp_path).read_all()] == ['winter, revised', 'spring']
+
+
+def test_entry_store_leaves_the_cold_tier_on_disk_until_it_is_needed(tmp_path):
+    frozen_log(tmp_path / 'entries').close()
+    # Keeps May 2020 hot when the backend re-applies tiering against today's date
+    cold_after_days = date.today().toordinal() - date(2020, 3, 1).toordinal()
+    backend = JsonStorageBackend(tmp_path, cold_after_days=cold_after_days)
+    backend.initialize()
+    store = EntryStore(backend, enrich=enrich_entry)
+
+    assert store.resident_count() == (1, True)
+    assert not backend.entry_log.partitions['2020-01'].loaded
+
+    cold = store.get(1)
+    updated = store.compare_and_put(dict(cold, content='winter, edited'), entry_version(cold))
+    assert updated['version'] == entry_version(cold) + 1
+    backend.entry_log.close()
+
+    reopened = EntryStore(JsonStorageBackend(tmp_path, cold_after_days=cold_after_days), enrich=enrich_entry)
+    assert reopened.get(1)['content'] == 'winter, edited'
+
+    # Re-dating the cold entry into the hot tier moves it out of the archive
+    cold = reopened.get(1)
+    reopened.compare_and_put(dict(cold, createdAt='2020-05-21T10:00:00'), entry_version(cold))
+    log = reopened.backend.entry_log
+    assert [e['id'] for e in log.read_range(epoch_day(2020, 1, 1), epoch_day(2020, 1, 31))] == []
+    assert [e['id'] for e in log.read_range(epoch_day(2020, 5, 1), epoch_day(2020, 5, 31))] == [2, 1]
+
+
+def test_legacy_snapshot_and_journal_are_split_into_partitions(tmp_path):
+    (tmp_path / 'entries.json').write_text(json.dumps([
+        entry(1, '2026-09-14T10:00:00', 'from the snapshot'),
+        entry(2, '2026-10-01T10:00:00', 'untouched'),
+    ]))
+    (tmp_path / 'entries.journal.jsonl').write_text(
+        json.dumps({'op': 'put', 'entry': entry(1, '2026-09-14T10:00:00', 'edited in the journal')}) + '\n'
+        + json.dumps({'op': 'put', 'entry': entry(3, '2026-10-02T10:00:00', 'created later')}) + '\n'
+        + '{"op": "put", "entry": {"id": 4'
+    )
+
+    log = PartitionedEntryLog(tmp_path / 'entries')
+    log.import_legacy(tmp_path / 'entries.json', tmp_path / 'entries.journal.jsonl')
+
+    assert [(e['id'], e['content']) for e in log.read_all()] == [
+        (1, 'edited in the journal'), (2, 'untouched'), (3, 'created later')]
+    assert sorted(path.name for path in tmp_path.iterdir() if path.is_file()) == [
+        'entries.journal.jsonl.migrated', 'entries.json.migrated']
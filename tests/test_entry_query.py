@@ -0,0 +1,78 @@
+import pytest
+
+from entry_enrichment import enrich_entry
+from entry_query import PostingLists, parse_filter
+from entry_store import EntryStore
+from storage_backends import JsonStorageBackend
+
+ENTRIES = [
+    {'id': 1, 'createdAt': '2026-03-02T08:00:00', 'content': 'Climbing with Anna', 'moods': ['happy']},
+    {'id': 2, 'createdAt': '2026-03-05T08:00:00', 'content': 'Deadline stress at work', 'moods': ['anxious']},
+    {'id': 3, 'createdAt': '2026-04-01T08:00:00', 'content': '和Anna一起去爬山', 'moods': ['happy', 'tired']},
+    {'id': 4, 'createdAt': '2026-04-20T08:00:00', 'content': 'Quiet day', 'moods': ['relaxed']},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    backend = JsonStorageBackend(tmp_path)
+    backend.initialize()
+    store = EntryStore(backend, enrich=enrich_entry, postings=PostingLists)
+    store.put_many(ENTRIES)
+    return store
+
+
+def ids(store, spec, order='asc', offset=0, limit=50):
+    total, entries = store.query(parse_filter(spec), order, offset, limit)
+    return total, [entry['id'] for entry in entries]
+
+
+def test_filters_become_query_trees():
+    def resolve(kind, topic_id):
+        return {('topic', 'topic_1'): 'Climbing'}.get((kind, topic_id))
+
+    assert parse_filter({}) == ('and', [])
+    assert parse_filter({'mood': ['happy', 'sad']}) == ('or', [('field', 'mood', 'happy'), ('field', 'mood', 'sad')])
+    assert parse_filter({'topic': 'topic_1', 'person': 'nobody'}, resolve) == ('and', [('term', 'climbing'), ('none',)])
+    assert parse_filter({'not': {'mention': 'Anna'}}) == ('not', ('term', 'anna'))
+    assert parse_filter({'from': '1970-01-02'}) == ('days', 1, None)
+    for bad in ([], {'colour': 'red'}, {'mood': ''}, {'and': {'mood': 'happy'}}, {'from': 'March'}):
+        with pytest.raises(ValueError):
+            parse_filter(bad)
+
+
+def test_leaves_combine_with_and_or_not(store):
+    assert ids(store, {'mood': 'happy'}) == (2, [1, 3])
+    assert ids(store, {'mood': 'happy', 'month': '2026-04'}) == (1, [3])
+    assert ids(store, {'or': [{'mood': 'anxious'}, {'mention': 'ANNA'}]}) == (3, [1, 2, 3])
+    assert ids(store, {'not': {'mood': 'happy'}}) == (2, [2, 4])
+    assert ids(store, {'lang': 'chinese'}) == (1, [3])
+    assert ids(store, {'from': '2026-03-03', 'to': '2026-04-01'}) == (2, [2, 3])
+    assert ids(store, {'mood': 'sad'}) == (0, [])
+
+
+def test_results_are_ordered_and_paged(store):
+    assert ids(store, {}, order='desc') == (4, [4, 3, 2, 1])
+    assert ids(store, {}, order='desc', offset=1, limit=2) == (4, [3, 2])
+
+
+def test_postings_follow_writes_after_the_first_query(store):
+    assert ids(store, {'mood': 'relaxed'}) == (1, [4])
+    assert ids(store, {'mention': 'deadline'}) == (1, [2])
+
+    store.put({'id': 4, 'createdAt': '2026-04-20T08:00:00', 'content': 'Deadline moved', 'moods': ['anxious']})
+    store.put({'id': 5, 'createdAt': '2026-04-21T08:00:00', 'content': 'Slept in', 'moods': ['relaxed']})
+
+    assert ids(store, {'mood': 'relaxed'}) == (1, [5])
+    assert ids(store, {'mood': 'anxious'}) == (2, [2, 4])
+    assert ids(store, {'mention': 'deadline'}) == (2, [2, 4])
+
+
+def test_query_endpoint_rejects_malformed_filters(client):
+    response = client.post('/api/entries/query', json={'filter': {'colour': 'red'}})
+    assert response.status_code == 400
+    assert "Unknown filter key 'colour'" in response.json()['detail']
+
+
+def test_graphql_root_keeps_its_name(server):
+    assert 'type Query {' in server.schema.as_str()
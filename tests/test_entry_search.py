@@ -0,0 +1,90 @@
+from entry_enrichment import enrich_entry
+from entry_search import SearchIndex, query_pattern, snippet
+from entry_store import EntryStore
+from storage_backends import JsonStorageBackend
+
+DOCS = [
+    {'content': 'Climbing in the gym after work'},
+    {'content': 'Climbing, climbing and more climbing'},
+    {'content': 'A long walk by the river after a long week of work and more work'},
+    {'content': '今天和朋友去爬山，爬山很累'},
+]
+
+
+def rows(hits):
+    return [row for row, _ in hits]
+
+
+def test_bm25_ranks_frequent_terms_in_short_entries_first():
+    index = SearchIndex.build(DOCS)
+
+    total, hits = index.search('climbing')
+    assert total == 2 and rows(hits) == [1, 0]
+    # Terms add up: only row 0 has both, and the rarer term weighs more
+    assert rows(index.search('gym climbing')[1])[0] == 0
+    assert rows(index.search('爬山')[1]) == [3]
+    assert index.search('bouldering') == (0, [])
+    assert rows(index.search('climbing', limit=1, offset=1)[1]) == [0]
+
+
+def test_rewritten_rows_keep_the_postings_sorted():
+    index = SearchIndex.build(DOCS)
+    index.remove(0, DOCS[0])
+    index.add(0, {'content': 'Bouldering with more friends'})
+    index.remove(2, DOCS[2])
+    index.add(2, {'content': 'more rest'})
+
+    for term_rows, frequencies in index._postings.values():
+        assert list(term_rows) == sorted(term_rows) and len(frequencies) == len(term_rows)
+    assert sorted(rows(index.search('more')[1])) == [0, 1, 2]
+    assert index.search('gym') == (0, [])
+    assert rows(index.search('climbing')[1]) == [1]
+
+
+def test_snippets_highlight_every_match():
+    pattern = query_pattern('river WORK')
+    excerpt, highlights = snippet(DOCS[2]['content'], pattern)
+
+    assert [excerpt[start:end] for start, end in highlights] == ['river', 'work', 'work']
+    assert query_pattern('') is None
+    # CJK bigrams that overlap are merged into one range
+    excerpt, highlights = snippet('我们爬山了', query_pattern('爬山了'))
+    assert [excerpt[start:end] for start, end in highlights] == ['爬山了']
+
+
+RELATED = [
+    {'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'Climbing the north face with Anna'},
+    {'id': 2, 'createdAt': '2026-10-02T08:00:00', 'content': 'Climbing the north face with Anna'},
+    {'id': 3, 'createdAt': '2026-10-03T08:00:00', 'content': 'Anna and I went climbing in the gym'},
+    {'id': 4, 'createdAt': '2026-10-04T08:00:00', 'content': 'Tax forms, dentist appointment'},
+]
+
+
+def test_related_rows_rank_by_cosine_similarity():
+    index = SearchIndex.build(RELATED)
+
+    hits = index.related(0, RELATED[0], k=5)
+    assert rows(hits) == [1, 2]
+    # The duplicate is as close as it gets; the entry itself is left out
+    assert abs(hits[0][1] - 1) < 1e-5 and 0 < hits[1][1] < hits[0][1]
+    assert index.related(3, RELATED[3]) == []
+    assert rows(index.related(0, RELATED[0], k=1)) == [1]
+
+
+def test_store_related_entries_follow_edits(tmp_path):
+    backend = JsonStorageBackend(tmp_path)
+    backend.initialize()
+    store = EntryStore(backend, enrich=enrich_entry, search=SearchIndex)
+    store.put_many(RELATED)
+
+    assert [(entry['id'], round(score, 3)) for entry, score in store.related(1)][:1] == [(2, 1.0)]
+    assert store.related(99) is None
+
+    store.put(dict(RELATED[3], content='Climbing the north face again'))
+    assert 4 in [entry['id'] for entry, _ in store.related(1)]
+    assert [entry['id'] for entry, _ in store.related(4, k=1)] in ([1], [2])
+
+
+def test_related_endpoint_validates_its_parameters(client):
+    assert client.get('/api/entries/1/related', params={'k': 0}).status_code == 400
+    assert client.get('/api/entries/424242/related').status_code == 404
@@ -0,0 +1,171 @@
+import threading
+from datetime import date, datetime, timedelta
+
+from entry_enrichment import enrich_entry
+from entry_partitions import PartitionedEntryLog
+from entry_query import PostingLists, parse_filter
+from entry_search import SearchIndex
+from entry_store import EPOCH_ORDINAL, EntryStore
+from storage_backends import JsonStorageBackend
+
+START = datetime(2026, 10, 1, 8, 0)
+OCTOBER = (date(2026, 10, 1).toordinal() - EPOCH_ORDINAL, date(2026, 10, 31).toordinal() - EPOCH_ORDINAL)
+
+
+def october_entry(i):
+    return {'id': i, 'createdAt': (START + timedelta(hours=i)).isoformat(), 'content': f'entry {i}'}
+
+
+class InterleavedStore(EntryStore):
+    """Runs ``interleave`` on another thread right when a reader picks up the date index"""
+
+    interleave = None
+
+    @property
+    def _date_index(self):
+        action, self.interleave = self.interleave, None
+        if action is not None:
+            thread = threading.Thread(target=action)
+            thread.start()
+            # A reader holding the store lock keeps the writer out until it is done
+            thread.join(0.2)
+            self.writers.append(thread)
+        return self.__dict__['_date_index']
+
+    @_date_index.setter
+    def _date_index(self, value):
+        self.__dict__['_date_index'] = value
+
+
+def new_store(tmp_path, cls=EntryStore, **kwargs):
+    backend = JsonStorageBackend(tmp_path, **kwargs)
+    backend.initialize()
+    return cls(backend, enrich=enrich_entry)
+
+
+def test_date_reads_are_not_torn_by_a_concurrent_write(tmp_path):
+    store = new_store(tmp_path, InterleavedStore)
+    store.writers = []
+    store.put_many([october_entry(i) for i in range(5)])
+
+    reads = {
+        'on_days': lambda: store.on_days(*OCTOBER),
+        'page': lambda: store.page(10, first_day=OCTOBER[0], last_day=OCTOBER[1])[0],
+        'between': lambda: store.between(START.astimezone(), (START + timedelta(days=20)).astimezone()),
+    }
+    for i, (name, read) in enumerate(reads.items()):
+        before = len(store.on_days(*OCTOBER))
+        store.interleave = lambda: store.put(october_entry(100 + i))
+        entries = read()
+        # The read sees the store either before or after the write, never a mix
+        assert len(entries) == before, name
+        assert len({entry['id'] for entry in entries}) == len(entries), name
+        for writer in store.writers:
+            writer.join()
+    assert len(store.on_days(*OCTOBER)) == 8
+
+
+def tiered_store(tmp_path, cold_months, hot_entries):
+    """A store over a data dir whose ``cold_months`` (2020) are frozen and whose May 2020 is hot"""
+    log = PartitionedEntryLog(tmp_path / 'entries')
+    log.initialize()
+    log.append_many([
+        {'id': month * 100 + i, 'createdAt': f'2020-{month:02d}-{10 + i:02d}T09:00:00', 'content': f'{month}/{i}'}
+        for month, count in cold_months.items() for i in range(count)
+    ] + [
+        {'id': 500 + i, 'createdAt': f'2020-05-{10 + i:02d}T09:00:00', 'content': f'5/{i}'} for i in range(hot_entries)
+    ])
+    log.cold_after_days = 1
+    log.apply_tiering(today=date(2020, 5, 20).toordinal() - EPOCH_ORDINAL)
+    log.close()
+    # Keeps May 2020 hot when the backend re-applies tiering against today's date
+    return new_store(tmp_path, cold_after_days=date.today().toordinal() - date(2020, 6, 1).toordinal())
+
+
+def test_newest_first_page_reads_only_the_months_it_needs(tmp_path):
+    store = tiered_store(tmp_path, {1: 3, 3: 2, 4: 1}, hot_entries=2)
+    log = store.backend.entry_log
+    store.resident_count()
+    loaded_from = store._loaded_from
+
+    entries, cursor, has_more = store.page(2)
+    assert [e['id'] for e in entries] == [501, 500] and has_more
+    # Filling the page and seeing that more follows only needed April
+    entries, cursor, has_more = store.page(2, after=cursor)
+    assert [e['id'] for e in entries] == [400, 301] and has_more
+    assert not log.partitions['2020-01'].loaded
+    assert store._loaded_from == loaded_from
+
+    pages = []
+    cursor, has_more = None, True
+    while has_more:
+        entries, cursor, has_more = store.page(2, after=cursor)
+        pages.append([e['id'] for e in entries])
+    assert pages == [[501, 500], [400, 301], [300, 102], [101, 100]]
+    assert store._loaded_from == loaded_from
+
+
+def test_oldest_first_pages_cross_from_the_archive_into_the_hot_months(tmp_path):
+    store = tiered_store(tmp_path, {1: 3, 3: 2}, hot_entries=2)
+
+    ids, cursor, has_more = [], None, True
+    while has_more:
+        entries, cursor, has_more = store.page(3, order='asc', after=cursor)
+        ids.append([e['id'] for e in entries])
+    assert ids == [[100, 101, 102], [300, 301, 500], [501]]
+
+    march = (date(2020, 3, 1).toordinal() - EPOCH_ORDINAL, date(2020, 3, 31).toordinal() - EPOCH_ORDINAL)
+    entries, _, has_more = store.page(5, order='asc', first_day=march[0], last_day=march[1])
+    assert [e['id'] for e in entries] == [300, 301] and not has_more
+
+
+def test_streaming_the_history_reads_the_archive_one_month_at_a_time(tmp_path):
+    store = tiered_store(tmp_path, {1: 2, 3: 2}, hot_entries=2)
+    log = store.backend.entry_log
+    store.resident_count()
+    loaded_from = store._loaded_from
+
+    stream = store.iter_entries()
+    assert [next(stream)['id'] for _ in range(2)] == [100, 101]
+    # Only the month being sent has been read so far
+    assert not log.partitions['2020-03'].loaded
+    assert [e['id'] for e in stream] == [300, 301, 500, 501]
+    assert store._loaded_from == loaded_from
+    assert not log.partitions['2020-01'].loaded and not log.partitions['2020-03'].loaded
+
+    march = (date(2020, 3, 1).toordinal() - EPOCH_ORDINAL, date(2020, 5, 10).toordinal() - EPOCH_ORDINAL)
+    assert [e['id'] for e in store.iter_entries(*march)] == [300, 301, 500]
+
+
+def test_mention_lookups_and_all_leave_the_archive_on_disk(tmp_path):
+    store = tiered_store(tmp_path, {1: 2, 3: 1}, hot_entries=2)
+    store.put({'id': 900, 'createdAt': '2020-05-18T09:00:00', 'content': 'Climbing in the gym'})
+    log = store.backend.entry_log
+    store.resident_count()
+    loaded_from = store._loaded_from
+
+    assert [e['id'] for e in store.entries_mentioning('/1')] == [101, 501]
+    assert store.has_mention('3/0') and store.has_mention('CLIMBING')
+    assert not store.has_mention('bouldering')
+    assert [e['id'] for e in store.all()] == [100, 101, 300, 500, 501, 900]
+
+    assert store._loaded_from == loaded_from
+    assert not log.partitions['2020-01'].loaded and not log.partitions['2020-03'].loaded
+
+
+def test_metas_keep_no_copy_of_the_content(tmp_path):
+    backend = JsonStorageBackend(tmp_path)
+    backend.initialize()
+    store = EntryStore(backend, enrich=enrich_entry, postings=PostingLists, search=SearchIndex)
+    store.put_many([
+        {'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'Climbing with Anna'},
+        {'id': 2, 'createdAt': '2026-10-02T08:00:00', 'content': 'Rest day'},
+    ])
+
+    assert all('Anna' not in str(value) for value in store.meta(store.get(1)).values())
+    # Case-insensitive matches lowercase the content when they need it
+    assert [e['id'] for e in store.query(parse_filter({'mention': 'ANNA'}))[1]] == [1]
+    assert [e['id'] for e, _ in store.search('climbing')[1]] == [1]
+    store.put({'id': 2, 'createdAt': '2026-10-02T08:00:00', 'content': 'Bouldering with anna'})
+    assert sorted(e['id'] for e in store.query(parse_filter({'mention': 'Anna'}))[1]) == [1, 2]
+    assert [e['id'] for e, _ in store.search('bouldering')[1]] == [2]
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from id_allocator import ID_EPOCH_MS, LEASE_MS, MAX_SEQUENCE, EntryIdAllocator, id_timestamp_ms
+
+
+def allocator_at(tmp_path, clock, node_id=0):
+    """An allocator reading its time (ms since the id epoch) from ``clock[0]``"""
+    allocator = EntryIdAllocator(tmp_path, node_id=node_id)
+    allocator._now_ms = lambda: clock[0]
+    return allocator
+
+
+def test_ids_carry_the_timestamp_and_the_node(tmp_path):
+    clock = [5000]
+    allocator = allocator_at(tmp_path, clock, node_id=3)
+
+    first = allocator.next_id()
+    clock[0] += 1
+    second = allocator.next_id()
+
+    assert second > first
+    assert id_timestamp_ms(first) == ID_EPOCH_MS + 5000
+    assert (first >> 8) & 0xF == 3
+    assert first < 2 ** 53
+    with pytest.raises(ValueError):
+        EntryIdAllocator(tmp_path, node_id=16)
+
+
+def test_sequence_rolls_over_into_the_next_millisecond(tmp_path):
+    clock = [5000]
+    allocator = allocator_at(tmp_path, clock)
+
+    ids = allocator.next_ids(MAX_SEQUENCE + 11)
+
+    assert ids == sorted(set(ids))
+    assert {id_timestamp_ms(i) - ID_EPOCH_MS for i in ids[:MAX_SEQUENCE + 1]} == {5000}
+    # The 257th id borrows the next millisecond before the clock gets there
+    assert id_timestamp_ms(ids[MAX_SEQUENCE + 1]) - ID_EPOCH_MS == 5001
+    clock[0] = 5001
+    assert allocator.next_id() > ids[-1]
+
+
+def test_clock_stepping_back_does_not_reissue_ids(tmp_path):
+    clock = [5000]
+    allocator = allocator_at(tmp_path, clock)
+    issued = allocator.next_ids(3)
+
+    clock[0] = 4000
+    later = allocator.next_ids(3)
+
+    assert later == sorted(later) and later[0] > issued[-1]
+
+
+def test_restart_continues_above_the_persisted_lease(tmp_path):
+    clock = [5000]
+    allocator = allocator_at(tmp_path, clock)
+    issued = allocator.next_ids(5)
+    state_path = tmp_path / 'id_allocator.node0.json'
+    assert json.loads(state_path.read_text()) == {'node_id': 0, 'lease_ms': 5000 + LEASE_MS}
+
+    # Within the lease the state file is not rewritten
+    mtime = state_path.stat().st_mtime_ns
+    clock[0] = 5000 + LEASE_MS - 1
+    allocator.next_id()
+    assert state_path.stat().st_mtime_ns == mtime
+
+    # A restart with the clock behind the lease starts above everything issued
+    restarted = allocator_at(tmp_path, [4000])
+    after_restart = restarted.next_id()
+    assert after_restart > issued[-1]
+    assert id_timestamp_ms(after_restart) - ID_EPOCH_MS == 5000 + LEASE_MS
+
+
+def test_corrupt_state_skips_a_whole_lease_ahead(tmp_path):
+    (tmp_path / 'id_allocator.node0.json').write_text('{"lease_ms":')
+
+    allocator = allocator_at(tmp_path, [5000])
+
+    assert id_timestamp_ms(allocator.next_id()) - ID_EPOCH_MS == 5000 + LEASE_MS
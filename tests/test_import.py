@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+
+def ndjson(*items):
+    return '\n'.join(item if isinstance(item, str) else json.dumps(item) for item in items) + '\n'
+
+
+def test_parse_import_line_defaults(server):
+    entry = server.parse_import_line('{"content": "hello", "targetDate": "2025-03-01T08:00:00"}')
+    assert entry == {
+        "content": "hello",
+        "type": "text",
+        "createdAt": "2025-03-01T08:00:00",
+        "moods": [],
+        "version": 1,
+    }
+
+
+@pytest.mark.parametrize('line', [
+    '[1, 2]',
+    '{"content": "   "}',
+    '{"content": "x", "createdAt": "yesterday"}',
+    '{"content": "x", "createdAt": 1700000000}',
+    '{"content": "x", "moods": "happy"}',
+    '{"content": "x", "moods": [["a"]]}',
+    '{"content": "x", "type": {"kind": "text"}}',
+])
+def test_parse_import_line_rejects(server, line):
+    with pytest.raises(ValueError):
+        server.parse_import_line(line)
+
+
+def test_import_skips_bad_lines_and_keeps_the_rest(server, client):
+    body = ndjson(
+        {"content": "imported one", "createdAt": "2025-04-01T09:00:00", "moods": ["calm"]},
+        {"content": "x", "moods": [["a"]]},
+        "not json",
+        {"content": "x", "type": {"kind": "text"}},
+        {"content": "imported two", "type": "voice"},
+    )
+    response = client.post('/api/entries/import', content=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert result['imported'] == 2
+    assert result['skipped'] == 3
+    assert [error['line'] for error in result['errors']] == [2, 3, 4]
+
+    first = server.entry_store.get(result['first_id'])
+    assert first['content'] == "imported one"
+    assert first['moods'] == ["calm"]
+    assert server.entry_store.get(result['last_id'])['type'] == "voice"
+
+
+def test_import_extract_topics_flag_is_accepted(client):
+    response = client.post('/api/entries/import', params={'extract_topics': 'false'},
+                           content=ndjson({"content": "no topics please"}))
+    assert response.status_code == 200
+    assert response.json()['imported'] == 1
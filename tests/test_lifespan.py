@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+
+
+def test_app_serves_storage_calls_after_a_restart(server, monkeypatch):
+    # monkeypatch puts back the pool of the session-wide client once this test is done
+    monkeypatch.setattr(server.app.state, 'io_executor', None, raising=False)
+
+    for _ in range(2):
+        with TestClient(server.app) as client:
+            response = client.get('/api/topic-stats')
+            assert response.status_code == 200
+            assert response.json()['status'] == 'success'
+        assert server.app.state.io_executor._shutdown
+
+
+def test_topic_entries_are_matched_off_the_loop(server, client):
+    created = client.post('/api/entries', json={'content': 'Climbed with Anna today. Anna led the hard pitch.'})
+    assert created.status_code == 200
+    server.save_topics_data({'topics': [{'id': 'anna', 'name': 'Anna'}], 'people': [], 'relations': []})
+
+    response = client.get('/api/topic-entries/anna', params={'concise': True})
+    body = response.json()
+    assert body['status'] == 'success'
+    assert [entry['id'] for entry in body['entries']] == [created.json()['id']]
+    assert 'sortTimestamp' not in body['entries'][0]
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from entry_revisions import SNAPSHOT_EVERY, RevisionLog
+from entry_store import EntryStore, VersionConflict
+from storage_backends import JsonStorageBackend
+
+
+def test_current_version_time_matches_in_list_and_detail(server, client):
+    entry = client.post('/api/entries', json={"content": "first draft", "type": "text"}).json()
+    for text in ("second draft", "final text"):
+        assert client.put(f"/api/entries/{entry['id']}", json={"content": text}).status_code == 200
+
+    stored = server.entry_store.get(entry['id'])
+    assert stored['version'] == 3
+    assert stored['updatedAt']
+
+    revisions = client.get(f"/api/entries/{entry['id']}/revisions").json()['revisions']
+    assert [revision['version'] for revision in revisions] == [1, 2, 3]
+    assert revisions[0]['at'] == entry['createdAt']
+    for revision in revisions:
+        detail = client.get(f"/api/entries/{entry['id']}/revisions/{revision['version']}").json()
+        assert detail['at'] == revision['at']
+    assert revisions[-1]['at'] == stored['updatedAt']
+    assert detail['content'] == "final text"
+
+
+def test_history_replays_across_the_snapshot_boundary(tmp_path):
+    log = RevisionLog(tmp_path)
+    texts = [f"Day {i}: " + "climbed the north face. " * 5 + f"note {i}" for i in range(SNAPSHOT_EVERY + 5)]
+    for version in range(2, len(texts) + 1):
+        log.record(
+            {'id': 7, 'version': version - 1, 'content': texts[version - 2], 'createdAt': '2026-10-01T08:00:00'},
+            {'id': 7, 'version': version, 'content': texts[version - 1], 'updatedAt': f'2026-10-{version:02d}T08:00:00'},
+        )
+
+    kinds = [summary['kind'] for summary in log.list(7)]
+    assert len(kinds) == len(texts)
+    # The chain starts from a snapshot of the first version and takes a new one every SNAPSHOT_EVERY revisions
+    assert [i for i, kind in enumerate(kinds) if kind == 'snapshot'] == [0, SNAPSHOT_EVERY]
+    for version, text in enumerate(texts, start=1):
+        assert log.get(7, version)['content'] == text
+    assert log.get(7, len(texts) + 1) is None
+
+
+def test_compare_and_put_checks_the_version_and_logs_outside_the_store_lock(tmp_path):
+    backend = JsonStorageBackend(tmp_path)
+    backend.initialize()
+    store = EntryStore(backend, revisions=RevisionLog(tmp_path / 'revisions'))
+    store.put({'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'first', 'version': 1})
+
+    lock_free = []
+    record = store.revisions.record
+
+    def probe():
+        acquired = store.lock.acquire(timeout=1)
+        if acquired:
+            store.lock.release()
+        lock_free.append(acquired)
+
+    def record_and_probe(previous, current):
+        # Another thread can take the store lock while the revision is written
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        record(previous, current)
+    store.revisions.record = record_and_probe
+
+    stored = store.compare_and_put({'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'second'}, 1)
+    assert stored['version'] == 2 and lock_free == [True]
+    assert store.revisions.get(1, 2)['content'] == 'second'
+
+    with pytest.raises(VersionConflict) as conflict:
+        store.compare_and_put({'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'stale'}, 1)
+    assert conflict.value.current['content'] == 'second'
+    with pytest.raises(KeyError):
+        store.compare_and_put({'id': 2, 'content': 'missing'}, 1)
+
+
+def test_update_without_precondition_gives_up_with_409(server, client, monkeypatch):
+    entry = client.post('/api/entries', json={"content": "contended", "type": "text"}).json()
+
+    def always_overtaken(updated, expected_version):
+        raise VersionConflict(server.entry_store.get(updated['id']))
+    monkeypatch.setattr(server.entry_store, 'compare_and_put', always_overtaken)
+
+    response = client.put(f"/api/entries/{entry['id']}", json={"content": "mine"})
+    assert response.status_code == 409
+    assert response.json()['current']['content'] == "contended"
+
+    # With a precondition the client learns the current version instead
+    response = client.put(f"/api/entries/{entry['id']}", json={"content": "mine"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 412
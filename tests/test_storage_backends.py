@@ -0,0 +1,135 @@
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from storage_backends import JsonStorageBackend, SqliteStorageBackend, migrate_json_to_sqlite
+
+ROOT = Path(__file__).resolve().parent.parent
+
+GRAPH = {
+    'nodes': [{'id': 'topic_1', 'name': 'Climbing', 'type': 'topic'}, {'id': 'person_1', 'name': 'Anna', 'type': 'person'}],
+    'edges': [{'source': 'person_1', 'target': 'topic_1', 'type': 'related'}],
+    'lastUpdated': '2026-10-01T08:00:00',
+}
+SUGGESTIONS = {
+    'pending_review': [{'id': 's1', 'name': 'Bouldering'}],
+    'auto_approved': [],
+    'rejected': [{'id': 's2', 'name': 'Weather'}],
+    'last_processed': '2026-10-01',
+}
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    backend = SqliteStorageBackend(tmp_path / 'diary.db')
+    backend.initialize()
+    return backend
+
+
+def test_sqlite_entries_are_updated_in_place(sqlite_backend):
+    sqlite_backend.append_many([
+        {'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'Climbing with Anna'},
+        {'id': 2, 'createdAt': '2026-10-02T08:00:00', 'content': 'Rest day'},
+    ])
+    sqlite_backend.append_many([{'id': 1, 'createdAt': '2026-10-01T08:00:00', 'content': 'Bouldering with Anna'}])
+
+    assert [(e['id'], e['content']) for e in sqlite_backend.read_all()] == [(1, 'Bouldering with Anna'), (2, 'Rest day')]
+    # The full-text index follows the update and matches case-insensitively
+    assert sqlite_backend.search_mentions('BOULDER') == [1]
+    assert sqlite_backend.search_mentions('climbing') == []
+    # Too short for trigrams; the caller falls back to scanning
+    assert sqlite_backend.search_mentions('da') is None
+
+
+def test_sqlite_notices_writes_from_another_connection(sqlite_backend, tmp_path):
+    sqlite_backend.read_all()
+    assert not sqlite_backend.changed_externally()
+
+    other = SqliteStorageBackend(tmp_path / 'diary.db')
+    other.append_many([{'id': 7, 'createdAt': '2026-10-01T08:00:00', 'content': 'written elsewhere'}])
+
+    assert sqlite_backend.changed_externally()
+    assert [e['id'] for e in sqlite_backend.read_all()] == [7]
+    assert not sqlite_backend.changed_externally()
+
+
+def test_sqlite_documents_round_trip_through_their_tables(sqlite_backend, tmp_path):
+    assert not sqlite_backend.document_exists('topic_graph')
+    sqlite_backend.save_document('topic_graph', GRAPH)
+    sqlite_backend.save_document('topic_suggestions', SUGGESTIONS)
+    sqlite_backend.save_document('topic_config', {'auto_approve_threshold': 0.8, 'categories': ['work', 'life']})
+
+    assert sqlite_backend.load_document('topic_graph') == GRAPH
+    assert sqlite_backend.load_document('topic_suggestions') == SUGGESTIONS
+    assert sqlite_backend.load_document('topic_config') == {'auto_approve_threshold': 0.8, 'categories': ['work', 'life']}
+
+    # Nodes and edges are rows, queryable on their own
+    conn = sqlite3.connect(tmp_path / 'diary.db')
+    assert conn.execute("SELECT name FROM topic_nodes WHERE id = 'person_1'").fetchone() == ('Anna',)
+    assert conn.execute("SELECT source FROM topic_edges WHERE target = 'topic_1'").fetchone() == ('person_1',)
+    conn.close()
+
+
+def test_sqlite_editing_commits_and_moves_the_version(sqlite_backend):
+    sqlite_backend.save_document('topics', {'topics': [], 'people': [], 'relations': []})
+    version = sqlite_backend.document_version('topics')
+
+    with sqlite_backend.editing('topics') as topics:
+        topics['topics'].append({'id': 'topic_1', 'name': 'Climbing'})
+
+    assert sqlite_backend.load_document('topics')['topics'] == [{'id': 'topic_1', 'name': 'Climbing'}]
+    assert sqlite_backend.document_version('topics') == version + 1
+
+    with pytest.raises(RuntimeError):
+        with sqlite_backend.editing('topics') as topics:
+            topics['topics'].clear()
+            raise RuntimeError('abandoned edit')
+    assert len(sqlite_backend.load_document('topics')['topics']) == 1
+    assert sqlite_backend.document_version('topics') == version + 1
+
+
+def write_json_data(data_dir):
+    source = JsonStorageBackend(data_dir)
+    source.initialize()
+    source.append_many([
+        {'id': 1, 'createdAt': '2026-09-14T10:00:00', 'content': 'September'},
+        {'id': 2, 'createdAt': '2026-10-14T10:00:00', 'content': 'October', 'moods': ['happy']},
+    ])
+    source.save_document('topic_graph', GRAPH)
+    source.save_document('topic_suggestions', SUGGESTIONS)
+    source.flush()
+    source.entry_log.close()
+    (data_dir / 'topics.json').write_text('{"topics": [')
+
+
+def test_migrate_copies_entries_and_documents(tmp_path):
+    write_json_data(tmp_path)
+
+    migrate_json_to_sqlite(tmp_path, tmp_path / 'diary.db')
+
+    target = SqliteStorageBackend(tmp_path / 'diary.db')
+    assert [(e['id'], e['content'], e.get('moods')) for e in target.read_all()] == [
+        (1, 'September', None), (2, 'October', ['happy'])]
+    assert target.load_document('topic_graph') == GRAPH
+    assert target.load_document('topic_suggestions') == SUGGESTIONS
+    # Invalid or missing documents are skipped, not half-imported
+    assert not target.document_exists('topics')
+    assert not target.document_exists('topic_config')
+
+
+def test_migrate_command_line(tmp_path):
+    write_json_data(tmp_path)
+
+    result = subprocess.run(
+        [sys.executable, str(ROOT / 'storage_backends.py'), 'migrate', '--data-dir', str(tmp_path)],
+        capture_output=True, text=True, check=True,
+    )
+
+    assert 'Imported 2 entries' in result.stdout
+    assert 'Skipping topics: invalid JSON' in result.stdout
+    target = SqliteStorageBackend(tmp_path / 'diary.db')
+    assert [e['id'] for e in target.read_all()] == [1, 2]
+    assert target.load_document('topic_graph') == GRAPH
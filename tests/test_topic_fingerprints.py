@@ -0,0 +1,46 @@
+from entry_enrichment import hamming_distance, simhash
+from topic_fingerprints import FingerprintLog
+
+TEXT = 'Went hiking with Anna in the Alps. 今天天气很好'
+
+
+def test_simhash_is_stable():
+    # Fingerprints are persisted, so the value for a given text must not change
+    assert simhash(TEXT) == 15192945896571591342
+    assert simhash('') == 0
+    assert hamming_distance(simhash(TEXT), simhash(TEXT + ' again')) <= 12
+
+
+def test_fingerprints_survive_a_restart(tmp_path):
+    path = tmp_path / 'topic_fingerprints.jsonl'
+    log = FingerprintLog(path)
+    log.update({1: 10, 2: 20})
+    log.update({1: 11})
+
+    with open(path, 'ab') as f:
+        f.write(b'{"id": 3, "sim')  # torn final line
+    reopened = FingerprintLog(path)
+    assert (reopened.get(1), reopened.get(2), reopened.get(3)) == (11, 20, None)
+
+
+def test_superseded_lines_are_compacted(tmp_path, monkeypatch):
+    import topic_fingerprints
+    monkeypatch.setattr(topic_fingerprints, 'COMPACT_SLACK', 4)
+    path = tmp_path / 'topic_fingerprints.jsonl'
+    log = FingerprintLog(path)
+    for value in range(10):
+        log.update({1: value, 2: value})
+    assert len(path.read_bytes().splitlines()) <= 2 + 2 * 4 + 2
+    assert FingerprintLog(path).get(1) == 9
+
+
+def test_unchanged_resave_is_skipped_after_restart(server, tmp_path):
+    path = tmp_path / 'topic_fingerprints.jsonl'
+    pipeline = server.TopicDetectionPipeline(FingerprintLog(path))
+    pipeline._mark_extracted([{'entry_id': 42, 'content': TEXT}])
+
+    restarted = server.TopicDetectionPipeline(FingerprintLog(path))
+    assert restarted.add_to_queue(42, TEXT, priority='high') is False
+    restarted.add_many_to_queue([(42, TEXT), (43, TEXT)])
+    assert [item['entry_id'] for item in restarted.detection_queue] == [43]
+    assert restarted.skipped_near_duplicates == 2
@@ -0,0 +1,81 @@
+"""
+Persisted SimHash fingerprints of the entry content last sent for topic extraction.
+
+The topic pipeline skips a re-saved entry whose content is a near-duplicate
+of the version it already extracted topics from. ``FingerprintLog`` keeps
+those fingerprints in ``data/topic_fingerprints.jsonl``, one
+``{"id": ..., "simhash": ...}`` line per extraction with the last line for
+an id winning, so the check still holds after a restart. The file is read
+on first use and rewritten with one line per entry once superseded lines
+outnumber the current ones.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+from entry_store import _write_temp
+
+# Superseded lines tolerated before the file is rewritten
+COMPACT_SLACK = 1000
+
+
+def _lines(fingerprints):
+    return b''.join(
+        json.dumps({'id': entry_id, 'simhash': fingerprint}).encode('utf-8') + b'\n'
+        for entry_id, fingerprint in fingerprints.items()
+    )
+
+
+class FingerprintLog:
+    """entry id -> fingerprint of the last extracted content, backed by an append-only file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self._fingerprints = None
+        self._records = 0
+
+    def _loaded(self):
+        """The fingerprint dict, read from disk the first time; caller holds the lock"""
+        if self._fingerprints is None:
+            fingerprints, records = {}, 0
+            try:
+                with open(self.path, 'rb') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            record = json.loads(line)
+                            fingerprints[record['id']] = int(record['simhash'])
+                        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                            # Torn final line from a crash mid-append
+                            print(f"Skipping corrupt record in {self.path.name}")
+                            continue
+                        records += 1
+            except FileNotFoundError:
+                pass
+            self._fingerprints, self._records = fingerprints, records
+        return self._fingerprints
+
+    def get(self, entry_id):
+        with self.lock:
+            return self._loaded().get(entry_id)
+
+    def update(self, fingerprints):
+        """Record {entry id: fingerprint} for entries that were just extracted"""
+        if not fingerprints:
+            return
+        with self.lock:
+            current = self._loaded()
+            current.update(fingerprints)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self._records + len(fingerprints) - len(current) > max(COMPACT_SLACK, len(current)):
+                os.replace(_write_temp(self.path, _lines(current)), self.path)
+                self._records = len(current)
+                return
+            with open(self.path, 'ab') as f:
+                f.write(_lines(fingerprints))
+                f.flush()
+                os.fsync(f.fileno())
+            self._records += len(fingerprints)